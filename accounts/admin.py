@@ -1,7 +1,13 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 
-from .models import User, EmailOTP
+from .forms import StaffImportForm
+from .models import DeferredEmail, User, EmailOTP
+from .provisioning import IMPORTABLE_ROLES, detect_format, import_staff, parse_rows
 
 
 @admin.register(User)
@@ -25,9 +31,63 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    change_list_template = "admin/accounts/user/change_list.html"
+
+    def get_urls(self):
+        urls = [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_staff_view),
+                name="accounts_user_import",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_staff_view(self, request):
+        """استيراد المدربين والموظفين دفعة واحدة (نفس منطق أمر import_staff)."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        result = None
+        if request.method == "POST":
+            form = StaffImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                upload = form.cleaned_data["file"]
+                dry_run = form.cleaned_data["dry_run"]
+                content = upload.read().decode("utf-8-sig", errors="replace")
+                result = import_staff(parse_rows(content, detect_format(upload.name)), dry_run=dry_run)
+
+                if dry_run:
+                    messages.info(request, f"تحقق فقط: سيتم إنشاء {result.created} حساب.")
+                elif result.created:
+                    messages.success(request, f"تم إنشاء {result.created} حساب ✅")
+                if not result.errors and not dry_run:
+                    return redirect("admin:accounts_user_changelist")
+        else:
+            form = StaffImportForm()
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "استيراد المدربين والموظفين",
+            "form": form,
+            "result": result,
+            "importable_roles": sorted(IMPORTABLE_ROLES),
+        }
+        return TemplateResponse(request, "admin/accounts/user/import.html", context)
+
 
 @admin.register(EmailOTP)
 class EmailOTPAdmin(admin.ModelAdmin):
-    list_display = ("user", "code", "is_used", "attempts", "expires_at", "created_at")
-    list_filter = ("is_used",)
+    list_display = ("user", "code", "is_used", "attempts", "delivery_status", "delivery_attempts", "expires_at", "created_at")
+    list_filter = ("is_used", "delivery_status")
     search_fields = ("user__email", "user__phone", "code")
+
+
+@admin.register(DeferredEmail)
+class DeferredEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "from_email", "attempts", "next_attempt_at", "sent_at", "created_at")
+    list_filter = ("sent_at",)
+    search_fields = ("subject", "from_email")
+    exclude = ("raw_message",)
+    readonly_fields = ("from_email", "recipients", "subject", "reason", "attempts", "created_at", "sent_at")
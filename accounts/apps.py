@@ -8,4 +8,10 @@ class AccountsConfig(AppConfig):
 
     def ready(self):
         # ربط الإشارات (auto-assign groups based on role)
-        from . import signals  # noqa: F401
\ No newline at end of file
+        from . import signals  # noqa: F401
+        # إبطال كاش صلاحيات الأدوار عند تعديل المجموعات/الصلاحيات
+        from . import permissions  # noqa: F401
+        # قوالب البريد التشغيلي تُترجم مرة واحدة عند بدء العملية
+        from .transactional import precompile_emails
+
+        precompile_emails()
@@ -7,8 +7,11 @@ from django.apps import apps
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 
-from .models import RESTRICTED_SELF_SIGNUP_ROLES, Role, User
+from .hashing import hash_password, verify_user_password
+from .models import RESTRICTED_SELF_SIGNUP_ROLES, Role, User, normalize_phone
 
 
 def _is_https_url(value: str) -> bool:
@@ -19,6 +22,18 @@ def _is_https_url(value: str) -> bool:
         return False
 
 
+def _profile_lookup(app_label: str, model_name: str, field: str) -> str | None:
+    """مسار البحث من User إلى حقل في ملف الملحق (مثل individual_profile__id_number).
+
+    يرجع None إذا لم يكن تطبيق الملف مثبتًا.
+    """
+    try:
+        Model = apps.get_model(app_label, model_name)
+    except LookupError:
+        return None
+    return f"{Model._meta.get_field('user').related_query_name()}__{field}"
+
+
 def _style_input(
     field: forms.Field,
     *,
@@ -74,13 +89,38 @@ class BaseSignupForm(forms.Form):
         )
 
     def clean_email(self):
-        email = (self.cleaned_data.get("email") or "").strip().lower()
-        if User.objects.filter(email=email).exists():
-            raise ValidationError("هذا البريد مستخدم مسبقًا.")
-        return email
+        return (self.cleaned_data.get("email") or "").strip().lower()
+
+    def get_unique_checks(self) -> dict[str, tuple[str | None, bool, str]]:
+        """حقول يجب ألا تتكرر: حقل النموذج -> (مسار البحث من User، تجاهل حالة الأحرف، رسالة الخطأ)."""
+        return {"email": ("email", False, "هذا البريد مستخدم مسبقًا.")}
+
+    def _validate_uniqueness(self) -> None:
+        """فحص كل الحقول الفريدة باستعلام واحد (بدل exists() لكل حقل)."""
+        checks = []
+        for name, (path, ci, message) in self.get_unique_checks().items():
+            value = self.cleaned_data.get(name)
+            if path and value and name not in self.errors:
+                checks.append((name, path, ci, value, message))
+        if not checks:
+            return
+
+        q = Q()
+        for _, path, ci, value, _ in checks:
+            q |= Q(**{f"{path}__iexact" if ci else path: value})
+        rows = User.objects.filter(q).values_list(*(path for _, path, _, _, _ in checks))[:len(checks)]
+
+        for row in rows:
+            for (name, _, ci, value, message), found in zip(checks, row):
+                if found is None or name in self.errors:
+                    continue
+                if (found.lower() == value.lower()) if ci else (found == value):
+                    self.add_error(name, message)
 
     def clean(self):
         cleaned = super().clean()
+        self._validate_uniqueness()
+
         p1 = cleaned.get("password1")
         p2 = cleaned.get("password2")
 
@@ -93,7 +133,21 @@ class BaseSignupForm(forms.Form):
             raise ValidationError("لا يمكن إنشاء هذا الدور عبر التسجيل الذاتي. سيتم إنشاؤه من مدير النظام.")
         return cleaned
 
-    def save(self) -> User:
+    def save(self) -> User | None:
+        """إنشاء الحساب. القيود الفريدة في القاعدة هي الضمان النهائي ضد التسجيل المتزامن:
+        عند IntegrityError تُعاد الأخطاء إلى حقولها ويرجع None (والنموذج غير صالح).
+        """
+        try:
+            with transaction.atomic():
+                return self._create()
+        except (IntegrityError, ValidationError):
+            # ValidationError: الملفات (مثل IndividualProfile.save) تعيد IntegrityError كأخطاء حقول
+            self._validate_uniqueness()
+            if not self.errors:
+                self.add_error(None, "تعذر إنشاء الحساب حاليًا. حاول مرة أخرى.")
+            return None
+
+    def _create(self) -> User:
         raise NotImplementedError
 
 
@@ -112,28 +166,33 @@ class IndividualSignupForm(BaseSignupForm):
         _style_input(self.fields["phone"], placeholder="05xxxxxxxx", ltr=True, inputmode="numeric", autocomplete="tel")
 
     def clean_phone(self):
-        phone = (self.cleaned_data.get("phone") or "").strip()
+        phone = normalize_phone(self.cleaned_data.get("phone"))
         if not phone.isdigit() or len(phone) != 10:
             raise ValidationError("رقم الجوال يجب أن يكون 10 أرقام فقط.")
-        if User.objects.filter(phone=phone).exists():
-            raise ValidationError("رقم الجوال مستخدم مسبقًا.")
         return phone
 
     def clean_id_number(self):
         val = (self.cleaned_data.get("id_number") or "").strip()
         if not val.isdigit() or not (10 <= len(val) <= 20):
             raise ValidationError("رقم الهوية/الإقامة يجب أن يكون أرقام فقط (10 إلى 20 رقم).")
-
-        IndividualProfile = apps.get_model("individuals", "IndividualProfile")
-        if IndividualProfile.objects.filter(id_number=val).exists():
-            raise ValidationError("هذه الهوية/الإقامة مسجلة مسبقًا.")
         return val
 
-    def save(self) -> User:
+    def get_unique_checks(self):
+        return {
+            **super().get_unique_checks(),
+            "phone": ("phone", False, "رقم الجوال مستخدم مسبقًا."),
+            "id_number": (
+                _profile_lookup("individuals", "IndividualProfile", "id_number"),
+                False,
+                "هذه الهوية/الإقامة مسجلة مسبقًا.",
+            ),
+        }
+
+    def _create(self) -> User:
         data = self.cleaned_data
         user = User.objects.create_user(
             email=data["email"],
-            password=data["password1"],
+            password_hash=hash_password(data["password1"]),
             full_name=data.get("full_name", "").strip(),
             phone=data.get("phone", "").strip(),
             role=self.role,
@@ -194,13 +253,23 @@ class OrganizationSignupForm(BaseSignupForm):
         )
 
     def clean_representative_phone(self):
-        phone = (self.cleaned_data.get("representative_phone") or "").strip()
+        phone = normalize_phone(self.cleaned_data.get("representative_phone"))
         if not phone.isdigit() or len(phone) != 10:
             raise ValidationError("رقم الجوال يجب أن يكون 10 أرقام فقط.")
-        if User.objects.filter(phone=phone).exists():
-            raise ValidationError("رقم الجوال مستخدم مسبقًا.")
         return phone
 
+    def get_unique_checks(self):
+        return {
+            **super().get_unique_checks(),
+            # رقم الممثل يُحفظ في User.phone
+            "representative_phone": ("phone", False, "رقم الجوال مستخدم مسبقًا."),
+            "org_name": (
+                _profile_lookup("organizations", "OrganizationProfile", "org_name"),
+                True,
+                "اسم الجهة مسجل مسبقًا.",
+            ),
+        }
+
     def clean_map_url(self):
         url = (self.cleaned_data.get("map_url") or "").strip()
         if url and not _is_https_url(url):
@@ -222,19 +291,14 @@ class OrganizationSignupForm(BaseSignupForm):
         if not map_url and not desc and not has_coords:
             raise ValidationError("يرجى إدخال رابط الخريطة أو وصف الموقع أو الإحداثيات.")
 
-        OrganizationProfile = apps.get_model("organizations", "OrganizationProfile")
-        org_name = (cleaned.get("org_name") or "").strip()
-        if org_name and OrganizationProfile.objects.filter(org_name__iexact=org_name).exists():
-            raise ValidationError("اسم الجهة مسجل مسبقًا.")
-
         return cleaned
 
-    def save(self) -> User:
+    def _create(self) -> User:
         data = self.cleaned_data
 
         user = User.objects.create_user(
             email=data["email"],
-            password=data["password1"],
+            password_hash=hash_password(data["password1"]),
             full_name=data.get("representative_name", "").strip(),
             phone=data.get("representative_phone", "").strip(),
             role=self.role,
@@ -312,23 +376,17 @@ class EmailLoginForm(forms.Form):
         if not identifier or not password:
             raise ValidationError("الرجاء إدخال بيانات الدخول كاملة.")
 
-        # بريد
-        if "@" in identifier:
-            user = User.objects.filter(email__iexact=identifier).first()
-            if not user or not user.check_password(password):
-                raise ValidationError("بيانات الدخول غير صحيحة.")
-            if not user.is_active:
-                raise ValidationError("الحساب غير مفعل. يرجى تفعيل الحساب عبر رمز التحقق.")
-            self._user = user
-            cleaned["user"] = user
-            return cleaned
-
-        # جوال (10 أرقام)
-        if not identifier.isdigit() or len(identifier) != 10:
+        # جوال (10 أرقام) — نقبل الصيغ الدولية ونطبّعها قبل البحث
+        if "@" not in identifier and len(normalize_phone(identifier)) != 10:
             raise ValidationError("أدخل بريدًا صحيحًا أو رقم جوال من 10 أرقام.")
 
-        user = User.objects.filter(phone=identifier).first()
-        if not user or not user.check_password(password):
+        user = User.objects.get_for_login(identifier)
+        if user is None:
+            # تشغيل hasher على مستخدم وهمي حتى يتساوى زمن الاستجابة
+            # بين المعرّف غير الموجود والموجود (منع تعداد الحسابات عبر التوقيت)
+            hash_password(password)
+            raise ValidationError("بيانات الدخول غير صحيحة.")
+        if not verify_user_password(user, password):
             raise ValidationError("بيانات الدخول غير صحيحة.")
         if not user.is_active:
             raise ValidationError("الحساب غير مفعل. يرجى تفعيل الحساب عبر رمز التحقق.")
@@ -336,3 +394,16 @@ class EmailLoginForm(forms.Form):
         self._user = user
         cleaned["user"] = user
         return cleaned
+
+
+class StaffImportForm(forms.Form):
+    """رفع ملف المدربين/الموظفين من لوحة التحكم (CSV أو JSONL)."""
+
+    file = forms.FileField(label="الملف (CSV / JSONL)")
+    dry_run = forms.BooleanField(label="تحقق فقط بدون إنشاء", required=False)
+
+    def clean_file(self):
+        f = self.cleaned_data["file"]
+        if not f.name.lower().endswith((".csv", ".jsonl", ".ndjson", ".json")):
+            raise ValidationError("الصيغ المدعومة: CSV أو JSONL.")
+        return f
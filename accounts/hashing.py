@@ -0,0 +1,139 @@
+"""خدمة تجزئة كلمات المرور بعدد خيوط ثابت وحد أقصى للطابور.
+
+تجزئة كلمة المرور (PBKDF2 / scrypt) عملية ثقيلة على المعالج. بدل تشغيلها على
+خيط الطلب مباشرة تُرسل إلى مجمّع خيوط ثابت الحجم:
+- إذا امتلأ الطابور (PASSWORD_HASHING_MAX_QUEUE) نرفض فورًا بـ HashingSaturated
+  ويحوّلها HashingBackpressureMiddleware إلى 429 بدل تجويع بقية الطلبات
+- الدوال المرسلة للخيوط لا تلمس قاعدة البيانات (تجزئة فقط)؛ الحفظ يتم على خيط الطلب
+- العروض المتزامنة تستخدم run() والعروض غير المتزامنة تستخدم await arun()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class HashingSaturated(Exception):
+    """الطابور ممتلئ: يجب رفض الطلب (429) بدل الانتظار."""
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+class HashingService:
+    def __init__(self, workers: int, max_queue: int, timeout: float | None = None, samples: int = 1024):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._submitted = 0
+        self._rejected = 0
+        # (زمن الانتظار في الطابور، زمن التنفيذ) بالملي ثانية لآخر N عملية
+        self._samples: deque[tuple[float, float]] = deque(maxlen=samples)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._in_flight >= self.max_queue:
+                self._rejected += 1
+                raise HashingSaturated
+            self._in_flight += 1
+            self._submitted += 1
+
+        queued_at = time.perf_counter()
+
+        def _task():
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._in_flight -= 1
+                    self._samples.append(((started - queued_at) * 1000, (finished - started) * 1000))
+
+        try:
+            return self._executor.submit(_task)
+        except RuntimeError:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+
+    def run(self, fn, *args, **kwargs):
+        return self.submit(fn, *args, **kwargs).result(timeout=self.timeout)
+
+    async def arun(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+            data = {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+            }
+        waits = [w for w, _ in samples]
+        runs = [r for _, r in samples]
+        data.update(
+            {
+                "wait_ms_p50": round(statistics.median(waits), 3) if waits else 0.0,
+                "wait_ms_p99": round(_percentile(waits, 99), 3),
+                "run_ms_p50": round(statistics.median(runs), 3) if runs else 0.0,
+                "run_ms_p99": round(_percentile(runs, 99), 3),
+            }
+        )
+        return data
+
+
+@lru_cache(maxsize=None)
+def get_hashing_service() -> HashingService:
+    workers = int(getattr(settings, "PASSWORD_HASHING_WORKERS", 0) or os.cpu_count() or 2)
+    max_queue = int(getattr(settings, "PASSWORD_HASHING_MAX_QUEUE", 0) or workers * 8)
+    timeout = getattr(settings, "PASSWORD_HASHING_TIMEOUT", None)
+    return HashingService(workers=workers, max_queue=max_queue, timeout=timeout)
+
+
+def hash_password(raw_password: str | None) -> str:
+    """make_password عبر المجمّع."""
+    return get_hashing_service().run(hashers.make_password, raw_password)
+
+
+def _needs_rehash(encoded: str) -> bool:
+    """نفس منطق Django: تغيّر الـ hasher المفضل أو تغيّر عدد التكرارات/المعاملات."""
+    preferred = hashers.get_hasher("default")
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def verify_user_password(user, raw_password: str) -> bool:
+    """بديل user.check_password: التحقق في المجمّع، وإعادة التجزئة بالخوارزمية
+    المفضلة (مثل الانتقال إلى scrypt) بشكل شفاف عند أول دخول ناجح.
+    """
+    encoded = user.password
+    if not get_hashing_service().run(hashers.check_password, raw_password, encoded):
+        return False
+    if _needs_rehash(encoded):
+        user.password = hash_password(raw_password)
+        user.save(update_fields=["password"])
+    return True
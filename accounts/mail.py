@@ -0,0 +1,365 @@
+"""Email backend لكل البريد الصادر: اتصالات SMTP دائمة + مهلات + قاطع دائرة.
+
+    EMAIL_BACKEND = "accounts.mail.PooledSMTPBackend"
+
+- اتصال SMTP واحد لكل خيط (worker thread) يُعاد استخدامه بين الرسائل والطلبات بدل
+  مصافحة SSL + تسجيل دخول لكل رسالة؛ يُفحص بـ NOOP إذا بقي خاملًا، ويُعاد فتحه
+  مرة واحدة تلقائيًا إذا قطعه الخادم
+- EMAIL_TIMEOUT مهلة الاتصال والمصافحة، و EMAIL_SEND_TIMEOUT مهلة كل عملية بعد ذلك،
+  فلا يعلق خيط الطلب إذا توقف المزود
+- قاطع الدائرة (لكل عملية ولكل خادم SMTP): بعد EMAIL_CIRCUIT_FAILURE_THRESHOLD
+  فشلًا متتاليًا يُفتح لمدة EMAIL_CIRCUIT_RESET_SECONDS؛ خلالها يُرفض الإرسال فورًا
+  بـ MailCircuitOpen وتُحفظ الرسالة في DeferredEmail ليعيد إرسالها
+  retry_deferred_emails، ثم تمر محاولة تجريبية واحدة (half-open)
+- يُحسب على القاطع فقط ما يدل على عطل المزود: فشل الاتصال/المهلة وانقطاع الخادم.
+  رفض مستلم أو رسالة بعينها (SMTPRecipientsRefused / SMTPDataError ...) يخص تلك الرسالة
+  فقط: تُكمل باقي الرسائل ثم يُرفع أول خطأ
+- من يملك إعادة المحاولة بنفسه (مثل صندوق OTP) يفتح الاتصال بـ defer=False
+"""
+
+from __future__ import annotations
+
+import logging
+import smtplib
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend
+from django.core.mail.message import sanitize_address
+from django.db import connection as db_connection
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class MailCircuitOpen(smtplib.SMTPException):
+    """قاطع الدائرة مفتوح: لم نحاول الاتصال بخادم SMTP."""
+
+
+# عطل في المزود نفسه: يُحسب على قاطع الدائرة (مع أخطاء الشبكة OSError التي ليست SMTPException،
+# لأن SMTPException نفسها ترث من OSError)
+_PROVIDER_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)
+# رفض يخص رسالة واحدة (عنوان غير صالح، محتوى مرفوض...): الاتصال سليم
+_MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+    smtplib.SMTPNotSupportedError,
+)
+
+
+def _is_provider_error(exc: BaseException) -> bool:
+    return isinstance(exc, _PROVIDER_ERRORS) or not isinstance(exc, smtplib.SMTPException)
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                # محاولة تجريبية واحدة؛ البقية تُرفض حتى تنتهي
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """انتهت المحاولة دون حكم على المزود (مثل رفض تسجيل الدخول): تحرير المحاولة التجريبية."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("SMTP circuit opened after %s consecutive failures", self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self._state, "consecutive_failures": self._failures}
+
+
+_breakers: dict[tuple, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_breaker(host: str, port: int) -> CircuitBreaker:
+    key = (host, port)
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(
+                failure_threshold=int(getattr(settings, "EMAIL_CIRCUIT_FAILURE_THRESHOLD", 5)),
+                reset_timeout=float(getattr(settings, "EMAIL_CIRCUIT_RESET_SECONDS", 60)),
+            )
+        return _breakers[key]
+
+
+def reset_breakers() -> None:
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def _thread_pool() -> dict:
+    pool = getattr(_local, "connections", None)
+    if pool is None:
+        pool = _local.connections = {}
+    return pool
+
+
+def close_pooled_connections() -> None:
+    """إغلاق اتصالات SMTP الدائمة لهذا الخيط (عند إيقاف العامل مثلًا)."""
+    pool = _thread_pool()
+    while pool:
+        _, (conn, _) = pool.popitem()
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.close()
+
+
+class PooledSMTPBackend(EmailBackend):
+    def __init__(self, *args, defer: bool = True, send_timeout: float | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.timeout is None:
+            self.timeout = 10
+        self.send_timeout = (
+            float(getattr(settings, "EMAIL_SEND_TIMEOUT", 30)) if send_timeout is None else send_timeout
+        )
+        self.idle_check = float(getattr(settings, "EMAIL_POOL_IDLE_CHECK_SECONDS", 30))
+        self.defer = defer
+
+    @property
+    def _pool_key(self) -> tuple:
+        return (self.host, self.port, self.username, self.use_ssl, self.use_tls)
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return get_breaker(self.host, self.port)
+
+    def open(self):
+        """يرجع False دائمًا عند النجاح حتى لا يغلق send_messages الاتصال المشترك."""
+        if self.connection:
+            return False
+        pooled = _thread_pool().get(self._pool_key)
+        if pooled is not None:
+            conn, last_used = pooled
+            if time.monotonic() - last_used < self.idle_check or self._is_alive(conn):
+                self.connection = conn
+                return False
+            self._discard(conn)
+
+        opened = super().open()
+        if opened is None:
+            return None
+        if self.connection.sock is not None:
+            self.connection.sock.settimeout(self.send_timeout)
+        _thread_pool()[self._pool_key] = (self.connection, time.monotonic())
+        return False
+
+    @staticmethod
+    def _is_alive(conn) -> bool:
+        try:
+            return conn.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _discard(self, conn=None) -> None:
+        conn = conn or self.connection
+        if conn is None:
+            return
+        pool = _thread_pool()
+        if pool.get(self._pool_key, (None,))[0] is conn:
+            del pool[self._pool_key]
+        try:
+            conn.close()
+        except OSError:
+            pass
+        if conn is self.connection:
+            self.connection = None
+
+    def close(self):
+        # الاتصال يبقى في مجمّع الخيط؛ الإغلاق الفعلي عبر close_pooled_connections
+        self.connection = None
+
+    def send_messages(self, email_messages):
+        email_messages = [m for m in email_messages or () if m.recipients()]
+        if not email_messages:
+            return 0
+        breaker = self.breaker
+        if not breaker.allow():
+            if self.defer:
+                defer_messages(email_messages, reason="SMTP circuit open")
+            if self.fail_silently:
+                return 0
+            raise MailCircuitOpen(f"SMTP circuit open for {self.host}:{self.port}")
+
+        with self._lock:
+            try:
+                sent, errors = self._send_all(email_messages)
+            except OSError as exc:
+                if _is_provider_error(exc):
+                    breaker.record_failure()
+                else:
+                    # رفض على مستوى الجلسة (مثل بيانات الدخول): ليس عطلًا في المزود
+                    breaker.release()
+                self._discard()
+                if self.fail_silently:
+                    return 0
+                raise
+            breaker.record_success()
+            _thread_pool()[self._pool_key] = (self.connection, time.monotonic())
+            self.close()
+        if errors and not self.fail_silently:
+            raise errors[0]
+        return sent
+
+    def _send_all(self, email_messages) -> tuple[int, list]:
+        sent = 0
+        errors = []
+        for message in email_messages:
+            encoding = message.encoding or settings.DEFAULT_CHARSET
+            recipients = [sanitize_address(addr, encoding) for addr in message.recipients()]
+            try:
+                self.send_raw(
+                    sanitize_address(message.from_email, encoding),
+                    recipients,
+                    message.message().as_bytes(linesep="\r\n"),
+                )
+            except _MESSAGE_ERRORS as exc:
+                logger.warning("SMTP rejected message to %s: %s", ", ".join(recipients), exc)
+                errors.append(exc)
+                continue
+            sent += 1
+        return sent, errors
+
+    def send_raw(self, from_email: str, recipients: list[str], raw: bytes) -> None:
+        """إرسال رسالة جاهزة، مع إعادة الاتصال مرة واحدة إذا كان الاتصال المُعاد استخدامه مقطوعًا."""
+        for attempt in (1, 2):
+            reused = self.connection is not None or self._pool_key in _thread_pool()
+            if self.open() is None:
+                raise smtplib.SMTPConnectError(-1, "Could not open SMTP connection")
+            try:
+                self.connection.sendmail(from_email, recipients, raw)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._discard()
+                if not reused or attempt == 2:
+                    raise
+
+
+def defer_messages(email_messages, reason: str = "") -> None:
+    from .models import DeferredEmail
+
+    rows = []
+    for message in email_messages:
+        encoding = message.encoding or settings.DEFAULT_CHARSET
+        rows.append(
+            DeferredEmail(
+                from_email=sanitize_address(message.from_email, encoding),
+                recipients=[sanitize_address(addr, encoding) for addr in message.recipients()],
+                subject=str(message.subject)[:255],
+                raw_message=message.message().as_bytes(linesep="\r\n"),
+                reason=reason,
+            )
+        )
+    DeferredEmail.objects.bulk_create(rows)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(60 * 2 ** max(attempts - 1, 0), 3600))
+
+
+def _claim_deferred(batch_size: int, max_attempts: int) -> list:
+    """حجز دفعة مستحقة بتأجيل next_attempt_at حتى انتهاء مهلة الحجز، في معاملة قصيرة تُثبّت فورًا.
+
+    الإرسال بعدها خارج أي معاملة: بطء SMTP لا يبقي الصفوف مقفلة، وتعطل العامل لا يعيد
+    ما أُرسل (sent_at محفوظ)؛ الرسالة التي توقف عاملها تعود مستحقة بعد مهلة الحجز.
+    """
+    from .models import DeferredEmail
+
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            DeferredEmail.objects.select_for_update(
+                skip_locked=db_connection.features.has_select_for_update_skip_locked
+            )
+            .filter(sent_at__isnull=True, attempts__lt=max_attempts, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        claim = timedelta(seconds=int(getattr(settings, "EMAIL_DEFERRED_CLAIM_SECONDS", 300)))
+        DeferredEmail.objects.filter(pk__in=ids).update(next_attempt_at=now + claim)
+    return list(DeferredEmail.objects.filter(pk__in=ids).order_by("pk"))
+
+
+def retry_deferred(batch_size: int = 50) -> tuple[int, int]:
+    """إعادة إرسال دفعة من الرسائل المؤجلة. يرجع (عدد المرسلة، عدد غير المرسلة).
+
+    يتوقف عند أول رفض من قاطع الدائرة (المزود ما زال متوقفًا) ويعيد باقي الدفعة مستحقة.
+    """
+    from .models import DeferredEmail
+
+    max_attempts = int(getattr(settings, "EMAIL_DEFERRED_MAX_ATTEMPTS", 10))
+    sent = failed = 0
+    backend = PooledSMTPBackend(defer=False)
+    batch = _claim_deferred(batch_size, max_attempts)
+    for index, item in enumerate(batch):
+        if not backend.breaker.allow():
+            DeferredEmail.objects.filter(pk__in=[rest.pk for rest in batch[index:]]).update(
+                next_attempt_at=timezone.now()
+            )
+            break
+        item.attempts += 1
+        try:
+            backend.send_raw(item.from_email, item.recipients, bytes(item.raw_message))
+        except OSError as exc:
+            if isinstance(exc, _MESSAGE_ERRORS):
+                backend.breaker.record_success()
+            elif _is_provider_error(exc):
+                backend.breaker.record_failure()
+            else:
+                backend.breaker.release()
+            logger.warning("Deferred email id=%s failed again: %s", item.pk, exc)
+            item.reason = str(exc)
+            item.next_attempt_at = timezone.now() + _retry_delay(item.attempts)
+            item.save(update_fields=["attempts", "reason", "next_attempt_at"])
+            failed += 1
+            continue
+        backend.breaker.record_success()
+        item.sent_at = timezone.now()
+        item.save(update_fields=["attempts", "sent_at"])
+        sent += 1
+    backend.close()
+    return sent, failed
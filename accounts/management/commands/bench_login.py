@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import itertools
+import random
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from accounts.forms import EmailLoginForm
+from accounts.models import Role, User
+
+
+BENCH_PASSWORD = "Bench!Pass1234"
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _free_phones(taken: set[str]):
+    """أرقام جوال للمستخدمين الوهميين تتخطى الأرقام المسجلة فعلًا (الفهرس الفريد على phone)."""
+    for n in itertools.count():
+        phone = f"05{n:08d}"
+        if phone not in taken:
+            yield phone
+
+
+class _Rollback(Exception):
+    """تُرفع لإلغاء المعاملة بعد القياس حتى لا يبقى أي مستخدم وهمي في القاعدة."""
+
+
+class Command(BaseCommand):
+    help = (
+        "قياس زمن تسجيل الدخول (p50/p99) عبر EmailLoginForm لأحجام مختلفة من المستخدمين. "
+        "يتم إنشاء المستخدمين داخل معاملة ثم التراجع عنها بالكامل."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[10_000, 100_000, 1_000_000],
+            help="أحجام جدول المستخدمين المراد قياسها.",
+        )
+        parser.add_argument("--logins", type=int, default=500, help="عدد محاولات الدخول لكل حجم.")
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument(
+            "--real-hasher",
+            action="store_true",
+            help="استخدام PASSWORD_HASHERS الفعلية (افتراضيًا MD5 لعزل تكلفة البحث عن تكلفة التجزئة).",
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(options["sizes"])
+        logins = options["logins"]
+        batch_size = options["batch_size"]
+
+        hashers = None if options["real_hasher"] else ["django.contrib.auth.hashers.MD5PasswordHasher"]
+        with override_settings(**({"PASSWORD_HASHERS": hashers} if hashers else {})):
+            try:
+                with transaction.atomic():
+                    self._run(sizes, logins, batch_size)
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _run(self, sizes: list[int], logins: int, batch_size: int):
+        password_hash = make_password(BENCH_PASSWORD)
+        created = 0
+        taken = set(User.objects.exclude(phone__isnull=True).values_list("phone", flat=True))
+        phone_source = _free_phones(taken)
+        phones: list[str] = []
+
+        self.stdout.write(f"{'users':>10} {'kind':>8} {'p50 ms':>9} {'p99 ms':>9}")
+        for size in sizes:
+            while created < size:
+                chunk = min(batch_size, size - created)
+                phones.extend(itertools.islice(phone_source, chunk))
+                User.objects.bulk_create(
+                    [
+                        User(
+                            email=f"bench{i}@bench.local",
+                            phone=phones[i],
+                            password=password_hash,
+                            role=Role.IND,
+                            is_active=True,
+                        )
+                        for i in range(created, created + chunk)
+                    ],
+                    batch_size=batch_size,
+                )
+                created += chunk
+
+            for kind in ("email", "phone", "unknown"):
+                samples = []
+                for _ in range(logins):
+                    i = random.randrange(created)
+                    identifier = {
+                        "email": f"BENCH{i}@bench.local",
+                        "phone": phones[i],
+                        "unknown": f"missing{i}@bench.local",
+                    }[kind]
+                    form = EmailLoginForm(data={"identifier": identifier, "password": BENCH_PASSWORD})
+                    start = time.perf_counter()
+                    form.is_valid()
+                    samples.append((time.perf_counter() - start) * 1000)
+
+                self.stdout.write(
+                    f"{size:>10} {kind:>8} {statistics.median(samples):>9.3f} {_percentile(samples, 99):>9.3f}"
+                )
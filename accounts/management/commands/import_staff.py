@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.provisioning import detect_format, import_staff, parse_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "استيراد المدربين والموظفين (مدير إدارة/مشرف/منسق دورات/مدرب) من ملف CSV أو JSONL. "
+        "الأعمدة: email, full_name, phone, role, password"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="مسار الملف.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="يُستنتج من امتداد الملف إن لم يُحدد.")
+        parser.add_argument("--dry-run", action="store_true", help="التحقق فقط بدون إنشاء حسابات.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=4, help="عدد خيوط تجزئة كلمات المرور.")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"الملف غير موجود: {path}")
+
+        fmt = options["format"] or detect_format(path.name)
+        content = path.read_text(encoding="utf-8-sig")
+
+        result = import_staff(
+            parse_rows(content, fmt),
+            dry_run=options["dry_run"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+        )
+
+        for err in result.errors:
+            self.stdout.write(self.style.WARNING(f"⚠️ سطر {err.line} ({err.email or '-'}): {' | '.join(err.errors)}"))
+
+        label = "سيتم إنشاء" if options["dry_run"] else "تم إنشاء"
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {label} {result.created} حساب. Errors: {len(result.errors)}.")
+        )
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import EmailOTP
+
+
+class Command(BaseCommand):
+    help = (
+        "حذف رموز التحقق المنتهية أو المستخدمة على دفعات صغيرة "
+        "(كل دفعة معاملة قصيرة مستقلة حتى لا تطول الأقفال)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="عدد الصفوف المحذوفة في كل دفعة.")
+        parser.add_argument(
+            "--grace-minutes",
+            type=int,
+            default=60,
+            help="إبقاء الرموز المنتهية/المستخدمة حديثًا لهذه المدة (للمراجعة).",
+        )
+        parser.add_argument("--sleep", type=float, default=0.0, help="ثوانٍ الانتظار بين الدفعات.")
+        parser.add_argument("--dry-run", action="store_true", help="عرض العدد فقط بدون حذف.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pause = options["sleep"]
+        cutoff = timezone.now() - timedelta(minutes=options["grace_minutes"])
+
+        stale = EmailOTP.objects.filter(
+            Q(expires_at__lt=cutoff) | Q(is_used=True, created_at__lt=cutoff)
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(f"Stale OTP rows: {stale.count()}")
+            return
+
+        deleted = 0
+        while True:
+            # مفاتيح الدفعة أولًا ثم حذف بالمفتاح الأساسي: يقفل الصفوف المحددة فقط
+            pks = list(stale.order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            count, _ = EmailOTP.objects.filter(pk__in=pks).delete()
+            deleted += count
+            if pause:
+                time.sleep(pause)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Deleted {deleted} OTP rows."))
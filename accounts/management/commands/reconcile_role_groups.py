@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from django.contrib.auth.models import Group
+
+from accounts.models import User
+from accounts.signals import ROLE_GROUP_NAMES, get_role_group_ids
+
+
+class Command(BaseCommand):
+    help = (
+        "مطابقة عضوية مجموعات الأدوار مع User.role مباشرة في قاعدة البيانات "
+        "(إضافة الناقص وحذف الزائد دفعة واحدة) بدون إعادة حفظ المستخدمين."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="عرض الفروقات فقط بدون تعديل.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        batch_size = options["batch_size"]
+
+        Through = User.groups.through
+        total_missing = total_extra = 0
+        if dry_run:
+            # قراءة فقط: get_role_group_ids تنشئ المجموعات الناقصة
+            group_ids = dict(Group.objects.filter(name__in=ROLE_GROUP_NAMES).values_list("name", "id"))
+            for role in sorted(ROLE_GROUP_NAMES - group_ids.keys()):
+                missing_count = User.objects.filter(role=role).count()
+                total_missing += missing_count
+                self.stdout.write(f"{role}: group does not exist (missing={missing_count})")
+        else:
+            group_ids = get_role_group_ids()
+
+        for role, gid in sorted(group_ids.items()):
+            # مستخدمون بهذا الدور وليسوا في مجموعته
+            missing = User.objects.filter(role=role).exclude(
+                Exists(Through.objects.filter(user_id=OuterRef("pk"), group_id=gid))
+            ).values_list("pk", flat=True)
+            # أعضاء في مجموعة هذا الدور ودورهم مختلف
+            extra = Through.objects.filter(group_id=gid).exclude(user__role=role).values_list("pk", flat=True)
+
+            if dry_run:
+                missing_count, extra_count = missing.count(), extra.count()
+            else:
+                missing_count = self._insert_missing(Through, missing, gid, batch_size)
+                extra_count = self._delete_extra(Through, extra, batch_size)
+
+            total_missing += missing_count
+            total_extra += extra_count
+            if missing_count or extra_count:
+                self.stdout.write(f"{role}: missing={missing_count} extra={extra_count}")
+
+        label = "Dry run" if dry_run else "Reconciled"
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {label}: missing={total_missing} extra={total_extra}")
+        )
+
+    @staticmethod
+    def _insert_missing(Through, missing_qs, gid: int, batch_size: int) -> int:
+        inserted = last_pk = 0
+        while True:
+            user_ids = list(missing_qs.filter(pk__gt=last_pk).order_by("pk")[:batch_size])
+            if not user_ids:
+                return inserted
+            last_pk = user_ids[-1]
+            with transaction.atomic():
+                Through.objects.bulk_create(
+                    [Through(user_id=uid, group_id=gid) for uid in user_ids],
+                    ignore_conflicts=True,
+                )
+            inserted += len(user_ids)
+
+    @staticmethod
+    def _delete_extra(Through, extra_qs, batch_size: int) -> int:
+        deleted = last_pk = 0
+        while True:
+            pks = list(extra_qs.filter(pk__gt=last_pk).order_by("pk")[:batch_size])
+            if not pks:
+                return deleted
+            last_pk = pks[-1]
+            count, _ = Through.objects.filter(pk__in=pks).delete()
+            deleted += count
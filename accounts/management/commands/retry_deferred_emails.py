@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.mail import retry_deferred
+
+
+class Command(BaseCommand):
+    help = "عامل إعادة إرسال رسائل البريد المؤجلة (DeferredEmail) بعد فتح قاطع دائرة SMTP. شغّله كعملية مستقلة عن خادم الويب."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="عدد الرسائل في كل دفعة.")
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="العمل بشكل مستمر بدل تنفيذ دفعة واحدة والخروج.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=30.0,
+            help="ثوانٍ الانتظار عند عدم وجود رسائل مستحقة (مع --loop).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        loop = options["loop"]
+        interval = options["interval"]
+
+        while True:
+            sent, failed = retry_deferred(batch_size=batch_size)
+            if sent or failed or not loop:
+                self.stdout.write(f"Deferred emails: sent={sent} failed={failed}")
+            if not loop:
+                return
+            if not (sent or failed):
+                time.sleep(interval)
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "حذف الجلسات المنتهية من django_session على دفعات صغيرة بالمفتاح الأساسي "
+        "(بديل clearsessions الذي يحذف كل شيء في استعلام واحد طويل)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="عدد الجلسات المحذوفة في كل دفعة.")
+        parser.add_argument("--sleep", type=float, default=0.05, help="ثوانٍ الانتظار بين الدفعات.")
+        parser.add_argument("--max-batches", type=int, default=0, help="حد أقصى للدفعات في هذا التشغيل (0 = بلا حد).")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pause = options["sleep"]
+        max_batches = options["max_batches"]
+        now = timezone.now()
+
+        deleted = batches = 0
+        while not max_batches or batches < max_batches:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .order_by("expire_date")
+                .values_list("session_key", flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            count, _ = Session.objects.filter(session_key__in=keys).delete()
+            deleted += count
+            batches += 1
+            if pause:
+                time.sleep(pause)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Deleted {deleted} expired sessions in {batches} batches."))
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import threading
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from .hashing import HashingSaturated
+from .ratelimit import too_many_requests
+from .usercache import get_cached_user, user_cache_enabled
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """مثل AuthenticationMiddleware لكن request.user يُقرأ من كاش قصير (accounts.usercache)."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        if user_cache_enabled():
+            request.user = SimpleLazyObject(lambda: get_cached_user(request))
+
+
+class HashingBackpressureMiddleware:
+    """تحويل HashingSaturated إلى 429 مع Retry-After بدل خطأ 500."""
+
+    retry_after_seconds = 2
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingSaturated):
+            return None
+        return too_many_requests(self.retry_after_seconds)
+
+
+class SessionMetrics:
+    """عدادات الجلسة لهذه العملية: كم طلبًا قرأ الجلسة وكم طلبًا سيكتبها."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.reads = 0
+        self.writes = 0
+
+    def record(self, accessed: bool, modified: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.reads += int(accessed)
+            self.writes += int(modified)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            requests = self.requests or 1
+            return {
+                "engine": settings.SESSION_ENGINE,
+                "requests": self.requests,
+                "session_reads": self.reads,
+                "session_writes": self.writes,
+                "reads_per_request": round(self.reads / requests, 4),
+                "writes_per_request": round(self.writes / requests, 4),
+            }
+
+
+session_metrics = SessionMetrics()
+
+
+class SessionMetricsMiddleware:
+    """يسجّل لكل طلب هل قُرئت الجلسة وهل ستُكتب.
+
+    يجب أن يأتي بعد SessionMiddleware في MIDDLEWARE حتى تُقرأ الحالة قبل الحفظ.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, "session", None)
+        if session is not None:
+            modified = session.modified or (
+                settings.SESSION_SAVE_EVERY_REQUEST and not session.is_empty()
+            )
+            session_metrics.record(session.accessed, modified)
+            if settings.DEBUG:
+                response["X-Session-Activity"] = f"read={int(session.accessed)}; write={int(modified)}"
+        return response
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:18
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def normalize_identifiers(apps, schema_editor):
+    """تخزين البريد بأحرف صغيرة وتحويل الجوال الفارغ إلى NULL قبل إضافة القيد الفريد."""
+    User = apps.get_model("accounts", "User")
+    User.objects.filter(phone="").update(phone=None)
+    User.objects.exclude(email=Lower("email")).update(email=Lower("email"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_role_and_permissions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='phone',
+            field=models.CharField(blank=True, help_text='10 أرقام فقط بدون +966', max_length=10, null=True, validators=[django.core.validators.RegexValidator(message='رقم الجوال يجب أن يكون 10 أرقام فقط.', regex='^\\d{10}$')], verbose_name='رقم الجوال'),
+        ),
+        migrations.RunPython(normalize_identifiers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='phone',
+            field=models.CharField(blank=True, help_text='10 أرقام فقط بدون +966', max_length=10, null=True, unique=True, validators=[django.core.validators.RegexValidator(message='رقم الجوال يجب أن يكون 10 أرقام فقط.', regex='^\\d{10}$')], verbose_name='رقم الجوال'),
+        ),
+    ]
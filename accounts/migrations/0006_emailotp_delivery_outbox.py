@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_normalized_login_lookup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailotp',
+            name='delivery_attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='محاولات الإرسال'),
+        ),
+        migrations.AddField(
+            model_name='emailotp',
+            name='delivery_error',
+            field=models.TextField(blank=True, default='', verbose_name='خطأ الإرسال'),
+        ),
+        migrations.AddField(
+            model_name='emailotp',
+            name='delivery_status',
+            field=models.CharField(choices=[('PENDING', 'بانتظار الإرسال'), ('SENT', 'تم الإرسال'), ('FAILED', 'فشل الإرسال'), ('SKIPPED', 'أُلغي (منتهي/مستخدم)')], default='PENDING', max_length=10, verbose_name='حالة الإرسال'),
+        ),
+        migrations.AddField(
+            model_name='emailotp',
+            name='next_delivery_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='موعد المحاولة التالية'),
+        ),
+        migrations.AddField(
+            model_name='emailotp',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإرسال'),
+        ),
+        migrations.AddIndex(
+            model_name='emailotp',
+            index=models.Index(fields=['delivery_status', 'next_delivery_at'], name='accounts_em_deliver_629377_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+ROLE_NAMES = [
+    "SYSTEM_ADMIN",
+    "DEPT_MANAGER",
+    "SUPERVISOR",
+    "COURSE_COORDINATOR",
+    "TRAINER",
+    "ORG",
+    "IND",
+]
+
+
+def create_role_groups(apps, schema_editor):
+    """مجموعات الأدوار جزء ثابت من النظام؛ إنشاؤها هنا يجعل معرفاتها مستقرة
+    فتستطيع إشارة مزامنة الأدوار الاعتماد على كاش المعرفات داخل العملية.
+    صلاحياتها الافتراضية تُسند عبر: python manage.py bootstrap_roles
+    """
+    Group = apps.get_model("auth", "Group")
+    for name in ROLE_NAMES:
+        Group.objects.get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0006_emailotp_delivery_outbox"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_role_groups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:24
+
+from django.db import migrations, models
+
+
+ROLE_NAMES = [
+    "SYSTEM_ADMIN",
+    "DEPT_MANAGER",
+    "SUPERVISOR",
+    "COURSE_COORDINATOR",
+    "TRAINER",
+    "ORG",
+    "IND",
+]
+
+
+def flag_custom_permissions(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    custom = set(User.user_permissions.through.objects.values_list("user_id", flat=True))
+    custom |= set(
+        User.groups.through.objects.exclude(group__name__in=ROLE_NAMES).values_list("user_id", flat=True)
+    )
+    if custom:
+        User.objects.filter(pk__in=custom).update(has_custom_permissions=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_seed_role_groups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='has_custom_permissions',
+            field=models.BooleanField(default=False, editable=False, verbose_name='صلاحيات خاصة'),
+        ),
+        migrations.RunPython(flag_custom_permissions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_user_has_custom_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeferredEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_email', models.CharField(max_length=255, verbose_name='المرسل')),
+                ('recipients', models.JSONField(default=list, verbose_name='المستلمون')),
+                ('subject', models.CharField(blank=True, default='', max_length=255, verbose_name='العنوان')),
+                ('raw_message', models.BinaryField(verbose_name='الرسالة')),
+                ('reason', models.TextField(blank=True, default='', verbose_name='سبب التأجيل')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='محاولات الإرسال')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='موعد المحاولة التالية')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإرسال')),
+            ],
+            options={
+                'verbose_name': 'رسالة بريد مؤجلة',
+                'verbose_name_plural': 'رسائل البريد المؤجلة',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['sent_at', 'next_attempt_at'], name='accounts_de_sent_at_9b165c_idx')],
+            },
+        ),
+    ]
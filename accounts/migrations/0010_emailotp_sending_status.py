@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_deferredemail'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailotp',
+            name='delivery_status',
+            field=models.CharField(choices=[('PENDING', 'بانتظار الإرسال'), ('SENDING', 'قيد الإرسال'), ('SENT', 'تم الإرسال'), ('FAILED', 'فشل الإرسال'), ('SKIPPED', 'أُلغي (منتهي/مستخدم)')], default='PENDING', max_length=10, verbose_name='حالة الإرسال'),
+        ),
+    ]
@@ -63,15 +63,45 @@ phone_validator = RegexValidator(
 )
 
 
+def normalize_email(value: str | None) -> str:
+    """تطبيع البريد للتخزين والبحث: بدون مسافات وبأحرف صغيرة."""
+    return (value or "").strip().lower()
+
+
+def normalize_phone(value: str | None) -> str:
+    """تطبيع رقم الجوال إلى الصيغة المحلية (05xxxxxxxx).
+
+    - يحذف المسافات والشرطات وأي رموز غير رقمية
+    - يحوّل الصيغ الدولية (+9665xxxxxxxx / 009665xxxxxxxx / 9665xxxxxxxx) إلى 05xxxxxxxx
+    - لا يتحقق من الطول؛ التحقق مسؤولية phone_validator
+    """
+    digits = "".join(ch for ch in (value or "") if ch.isdigit())
+    if digits.startswith("00966"):
+        digits = "0" + digits[5:]
+    elif digits.startswith("966") and len(digits) == 12:
+        digits = "0" + digits[3:]
+    return digits
+
+
 class UserManager(BaseUserManager):
-    def create_user(self, email: str, password: str | None = None, **extra_fields):
+    def create_user(
+        self,
+        email: str,
+        password: str | None = None,
+        *,
+        password_hash: str | None = None,
+        **extra_fields,
+    ):
+        """password_hash: قيمة مجزأة مسبقًا (مثلًا عبر accounts.hashing) بدل التجزئة هنا."""
         if not email:
             raise ValueError("البريد الإلكتروني مطلوب.")
-        email = self.normalize_email(email).lower().strip()
+        email = normalize_email(self.normalize_email(email))
 
         user = self.model(email=email, **extra_fields)
 
-        if password:
+        if password_hash:
+            user.password = password_hash
+        elif password:
             user.set_password(password)
         else:
             user.set_unusable_password()
@@ -96,15 +126,36 @@ class UserManager(BaseUserManager):
 
         return self.create_user(email=email, password=password, **extra_fields)
 
+    def get_for_login(self, identifier: str) -> "User | None":
+        """جلب المستخدم عبر البريد أو الجوال باستخدام الفهارس الفريدة مباشرةً.
+
+        القيم مخزنة مطبّعة (بريد بأحرف صغيرة / جوال 05xxxxxxxx)،
+        لذلك البحث مطابقة تامة بدل iexact ويخدمه الفهرس الفريد.
+        """
+        identifier = (identifier or "").strip()
+        if not identifier:
+            return None
+        if "@" in identifier:
+            lookup = {"email": normalize_email(identifier)}
+        else:
+            phone = normalize_phone(identifier)
+            if len(phone) != 10:
+                return None
+            lookup = {"phone": phone}
+        return self.filter(**lookup).first()
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField("البريد الإلكتروني", unique=True)
     full_name = models.CharField("الاسم الكامل", max_length=200, blank=True)
 
+    # NULL بدل "" للحسابات بدون جوال حتى لا يتعارض القيد الفريد بينها
     phone = models.CharField(
         "رقم الجوال",
         max_length=10,
         blank=True,
+        null=True,
+        unique=True,
         validators=[phone_validator],
         help_text="10 أرقام فقط بدون +966",
     )
@@ -132,6 +183,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField("مفعل", default=False)
     is_staff = models.BooleanField("موظف إداري", default=False)
 
+    # يُحدَّث تلقائيًا (accounts.permissions) عند وجود صلاحيات خاصة بالمستخدم
+    # أو عضوية في مجموعات غير مجموعات الأدوار؛ بدونها تكفي صلاحيات الدور المخزنة في الذاكرة
+    has_custom_permissions = models.BooleanField("صلاحيات خاصة", default=False, editable=False)
+
     date_joined = models.DateTimeField("تاريخ الانضمام", default=timezone.now)
 
     objects = UserManager()
@@ -158,8 +213,20 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self) -> str:
         return self.email
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # الدور كما قُرئ من القاعدة: تستخدمه إشارة مزامنة المجموعات لتجاهل الحفظ الذي لا يغيّر الدور
+        # (None إذا كان الحقل مؤجلًا عبر only/defer)
+        instance._loaded_role = instance.__dict__.get("role")
+        # حالة التفعيل كما قُرئت: تستخدمها عدّادات المنصة (pages.counters) لحساب الفرق عند الحفظ
+        instance._loaded_is_active = instance.__dict__.get("is_active")
+        return instance
+
     def save(self, *args, **kwargs):
-        """مزامنة user_type و is_staff مع الدور."""
+        """تطبيع البريد/الجوال ومزامنة user_type و is_staff مع الدور."""
+        self.email = normalize_email(self.email)
+        self.phone = normalize_phone(self.phone) or None
         if self.role:
             self.user_type = ROLE_TO_USER_TYPE.get(self.role, self.user_type)
         # الوصول إلى Django Admin: مقصور على مدير النظام
@@ -202,29 +269,42 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.role == Role.IND
 
     # ====== Permission gates (role-first, then Django perms) ======
+    def _has_perm_fast(self, perm: str) -> bool:
+        from .permissions import user_has_perm
+
+        return user_has_perm(self, perm)
+
     def can_manage_users(self) -> bool:
-        return self.is_system_admin or self.has_perm("accounts.manage_users")
+        return self.is_system_admin or self._has_perm_fast("accounts.manage_users")
 
     def can_view_all_data(self) -> bool:
         if self.is_system_admin:
             return True
         if self.role in {Role.DEPT_MANAGER, Role.SUPERVISOR}:
             return True
-        return self.has_perm("accounts.view_all_data")
+        return self._has_perm_fast("accounts.view_all_data")
 
     def can_manage_courses(self) -> bool:
         if self.is_system_admin:
             return True
         if self.role in {Role.DEPT_MANAGER, Role.SUPERVISOR, Role.COURSE_COORDINATOR}:
             return True
-        return self.has_perm("accounts.manage_courses")
+        return self._has_perm_fast("accounts.manage_courses")
 
     def can_approve_courses(self) -> bool:
         if self.is_system_admin:
             return True
         if self.role in {Role.DEPT_MANAGER, Role.SUPERVISOR}:
             return True
-        return self.has_perm("accounts.approve_courses")
+        return self._has_perm_fast("accounts.approve_courses")
+
+
+class OTPDeliveryStatus(models.TextChoices):
+    PENDING = "PENDING", "بانتظار الإرسال"
+    SENDING = "SENDING", "قيد الإرسال"
+    SENT = "SENT", "تم الإرسال"
+    FAILED = "FAILED", "فشل الإرسال"
+    SKIPPED = "SKIPPED", "أُلغي (منتهي/مستخدم)"
 
 
 class EmailOTP(models.Model):
@@ -233,6 +313,8 @@ class EmailOTP(models.Model):
     - 6 أرقام
     - صلاحية افتراضية 10 دقائق
     - تتبع المحاولات
+    - يعمل كصندوق صادر (outbox): يُنشأ بحالة PENDING داخل معاملة إنشاء الحساب
+      ثم يرسله عامل منفصل (deliver_otp_emails) مع تتبع الحالة وعدد المحاولات
     """
     user = models.ForeignKey(
         "accounts.User",
@@ -246,6 +328,17 @@ class EmailOTP(models.Model):
     attempts = models.PositiveSmallIntegerField("عدد المحاولات", default=0)
     is_used = models.BooleanField("تم استخدامه؟", default=False)
 
+    delivery_status = models.CharField(
+        "حالة الإرسال",
+        max_length=10,
+        choices=OTPDeliveryStatus.choices,
+        default=OTPDeliveryStatus.PENDING,
+    )
+    delivery_attempts = models.PositiveSmallIntegerField("محاولات الإرسال", default=0)
+    next_delivery_at = models.DateTimeField("موعد المحاولة التالية", default=timezone.now)
+    sent_at = models.DateTimeField("تاريخ الإرسال", null=True, blank=True)
+    delivery_error = models.TextField("خطأ الإرسال", blank=True, default="")
+
     class Meta:
         verbose_name = "رمز تحقق بريد"
         verbose_name_plural = "رموز تحقق البريد"
@@ -253,6 +346,7 @@ class EmailOTP(models.Model):
         indexes = [
             models.Index(fields=["user", "is_used"]),
             models.Index(fields=["expires_at"]),
+            models.Index(fields=["delivery_status", "next_delivery_at"]),
         ]
 
     @staticmethod
@@ -267,6 +361,7 @@ class EmailOTP(models.Model):
             code=cls.generate_code(),
             created_at=now,
             expires_at=now + timedelta(minutes=ttl_minutes),
+            next_delivery_at=now,
         )
 
     def is_expired(self) -> bool:
@@ -274,3 +369,32 @@ class EmailOTP(models.Model):
 
     def __str__(self) -> str:
         return f"OTP({self.user_id}) used={self.is_used}"
+
+
+class DeferredEmail(models.Model):
+    """
+    رسالة بريد لم تُرسل لأن قاطع دائرة SMTP مفتوح (accounts.mail)
+    - تُخزن الرسالة كاملة (MIME) كما كانت ستُرسل
+    - يعيد العامل retry_deferred_emails إرسالها بعد عودة مزود البريد
+    """
+    from_email = models.CharField("المرسل", max_length=255)
+    recipients = models.JSONField("المستلمون", default=list)
+    subject = models.CharField("العنوان", max_length=255, blank=True, default="")
+    raw_message = models.BinaryField("الرسالة")
+
+    reason = models.TextField("سبب التأجيل", blank=True, default="")
+    attempts = models.PositiveSmallIntegerField("محاولات الإرسال", default=0)
+    next_attempt_at = models.DateTimeField("موعد المحاولة التالية", default=timezone.now)
+    created_at = models.DateTimeField("تاريخ الإنشاء", auto_now_add=True)
+    sent_at = models.DateTimeField("تاريخ الإرسال", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "رسالة بريد مؤجلة"
+        verbose_name_plural = "رسائل البريد المؤجلة"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["sent_at", "next_attempt_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.subject} -> {', '.join(self.recipients)}"
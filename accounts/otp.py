@@ -0,0 +1,120 @@
+"""مخازن رموز التحقق (OTP) القابلة للتبديل.
+
+- DatabaseOTPStore (الافتراضي): يعتمد على جدول EmailOTP مع عدّاد محاولات ذري (F expression)
+- CacheOTPStore: يحفظ الرمز والعداد في الـ cache مع TTL وزيادة ذرية (cache.incr)
+
+في الحالتين يبقى صف EmailOTP هو سجل صندوق الصادر الذي يرسله العامل (accounts.outbox).
+يتم اختيار المخزن عبر الإعداد OTP_STORE.
+"""
+
+from __future__ import annotations
+
+import enum
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+
+from .models import EmailOTP, User
+
+
+class OTPResult(enum.Enum):
+    OK = "ok"
+    INVALID = "invalid"
+    EXPIRED = "expired"
+    MISSING = "missing"
+    LOCKED = "locked"
+
+
+def otp_max_attempts() -> int:
+    return int(getattr(settings, "OTP_MAX_ATTEMPTS", 5))
+
+
+def otp_ttl_minutes() -> int:
+    return int(getattr(settings, "OTP_TTL_MINUTES", 10))
+
+
+class BaseOTPStore:
+    def issue(self, user: User) -> EmailOTP:
+        """إنشاء رمز جديد للمستخدم (ويصبح الرمز السابق غير صالح)."""
+        raise NotImplementedError
+
+    def verify(self, user: User, code: str) -> OTPResult:
+        """التحقق من الرمز واحتساب المحاولة بشكل ذري."""
+        raise NotImplementedError
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    def issue(self, user: User) -> EmailOTP:
+        return EmailOTP.create_for_user(user, ttl_minutes=otp_ttl_minutes())
+
+    def verify(self, user: User, code: str) -> OTPResult:
+        max_attempts = otp_max_attempts()
+        otp = (
+            EmailOTP.objects.filter(user=user, is_used=False)
+            .only("id", "code", "expires_at", "attempts")
+            .order_by("-created_at")
+            .first()
+        )
+        if not otp:
+            return OTPResult.MISSING
+        if otp.is_expired():
+            return OTPResult.EXPIRED
+        if otp.attempts >= max_attempts:
+            return OTPResult.LOCKED
+
+        # تحديث مشروط: لا يمكن لمحاولات متزامنة تجاوز الحد الأقصى
+        live = EmailOTP.objects.filter(pk=otp.pk, is_used=False, attempts__lt=max_attempts)
+        if not constant_time_compare(otp.code, code):
+            updated = live.update(attempts=F("attempts") + 1)
+            return OTPResult.INVALID if updated else OTPResult.LOCKED
+
+        return OTPResult.OK if live.update(is_used=True) else OTPResult.LOCKED
+
+
+class CacheOTPStore(BaseOTPStore):
+    """الرمز وعداد المحاولات في الـ cache (Redis/Memcached) مع انتهاء تلقائي عبر TTL."""
+
+    key_prefix = "otp"
+
+    def _keys(self, user: User) -> tuple[str, str]:
+        return f"{self.key_prefix}:code:{user.pk}", f"{self.key_prefix}:attempts:{user.pk}"
+
+    def issue(self, user: User) -> EmailOTP:
+        ttl_minutes = otp_ttl_minutes()
+        otp = EmailOTP.create_for_user(user, ttl_minutes=ttl_minutes)
+        code_key, attempts_key = self._keys(user)
+        cache.set_many({code_key: otp.code, attempts_key: 0}, timeout=ttl_minutes * 60)
+        return otp
+
+    def verify(self, user: User, code: str) -> OTPResult:
+        code_key, attempts_key = self._keys(user)
+        expected = cache.get(code_key)
+        if expected is None:
+            return OTPResult.EXPIRED
+
+        try:
+            attempts = cache.incr(attempts_key)
+        except ValueError:
+            # انتهى العداد قبل الرمز بلحظات
+            return OTPResult.EXPIRED
+        if attempts > otp_max_attempts():
+            return OTPResult.LOCKED
+        if not constant_time_compare(expected, code):
+            return OTPResult.INVALID
+
+        # delete يرجع False إذا سبقنا طلب متزامن لاستخدام نفس الرمز
+        if not cache.delete(code_key):
+            return OTPResult.MISSING
+        cache.delete(attempts_key)
+        EmailOTP.objects.filter(user=user, is_used=False).update(is_used=True)
+        return OTPResult.OK
+
+
+@lru_cache(maxsize=None)
+def get_otp_store() -> BaseOTPStore:
+    path = getattr(settings, "OTP_STORE", "accounts.otp.DatabaseOTPStore")
+    return import_string(path)()
@@ -0,0 +1,124 @@
+"""صندوق صادر لرسائل OTP.
+
+- الطلب (التسجيل/إعادة الإرسال) ينشئ EmailOTP بحالة PENDING فقط داخل نفس المعاملة
+- عامل منفصل (manage.py deliver_otp_emails) يرسل الرسائل المستحقة ويحدّث الحالة
+- عند الفشل: إعادة المحاولة بتأخير تصاعدي حتى OTP_DELIVERY_MAX_ATTEMPTS
+- الدفعة تُحجز أولًا (SENDING + مهلة حجز) في معاملة قصيرة تُثبّت فورًا، ثم يُرسل كل رمز
+  خارج أي معاملة: بطء SMTP لا يبقي الصفوف مقفلة، وتعطل العامل في منتصف الدفعة لا
+  يعيد ما أُرسل إلى PENDING. الحجز الذي انتهت مهلته (عامل توقف) يُستعاد تلقائيًا
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmailOTP, OTPDeliveryStatus
+from .transactional import build_email
+
+logger = logging.getLogger(__name__)
+
+OTP_EMAIL_SUBJECT = "رمز تفعيل حسابك | بوابة ثقف"
+
+
+def _max_attempts() -> int:
+    return int(getattr(settings, "OTP_DELIVERY_MAX_ATTEMPTS", 5))
+
+
+def _claim_seconds() -> int:
+    return int(getattr(settings, "OTP_DELIVERY_CLAIM_SECONDS", 300))
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    # 30ث، 1د، 2د، 4د ... بحد أقصى 10 دقائق (مدة صلاحية الرمز)
+    return timedelta(seconds=min(30 * 2 ** max(attempts - 1, 0), 600))
+
+
+def build_otp_message(otp: EmailOTP) -> EmailMultiAlternatives:
+    """تجهيز رسالة OTP (نص + HTML)."""
+    ttl_minutes = max(1, round((otp.expires_at - otp.created_at).total_seconds() / 60))
+    ctx = {
+        "user": otp.user,
+        "code": otp.code,
+        "ttl_minutes": ttl_minutes,
+        "year": timezone.now().year,
+    }
+    return build_email("otp", ctx, subject=OTP_EMAIL_SUBJECT, to=[otp.user.email])
+
+
+def deliver_otp(otp: EmailOTP, mail_connection=None) -> bool:
+    """إرسال رمز واحد وتحديث حالته. يرجع True عند النجاح."""
+    now = timezone.now()
+
+    if otp.is_used or otp.is_expired():
+        otp.delivery_status = OTPDeliveryStatus.SKIPPED
+        otp.save(update_fields=["delivery_status"])
+        return False
+
+    otp.delivery_attempts += 1
+    try:
+        message = build_otp_message(otp)
+        # الصندوق يعيد المحاولة بنفسه: لا نريد نسخة ثانية في DeferredEmail عند فتح قاطع الدائرة
+        message.connection = mail_connection or get_connection(defer=False)
+        message.send(fail_silently=False)
+    except Exception as exc:
+        logger.exception("Failed to deliver activation OTP id=%s", otp.pk)
+        otp.delivery_error = str(exc)
+        if otp.delivery_attempts >= _max_attempts():
+            otp.delivery_status = OTPDeliveryStatus.FAILED
+        else:
+            otp.delivery_status = OTPDeliveryStatus.PENDING
+            otp.next_delivery_at = now + _retry_delay(otp.delivery_attempts)
+        otp.save(update_fields=["delivery_attempts", "delivery_error", "delivery_status", "next_delivery_at"])
+        return False
+
+    otp.delivery_status = OTPDeliveryStatus.SENT
+    otp.sent_at = now
+    otp.delivery_error = ""
+    otp.save(update_fields=["delivery_attempts", "delivery_error", "delivery_status", "sent_at"])
+    return True
+
+
+def claim_pending(batch_size: int = 50) -> list[EmailOTP]:
+    """حجز دفعة من الرموز المستحقة (SENDING حتى انتهاء مهلة الحجز) وتثبيت الحجز فورًا.
+
+    الصفوف تُقفل بـ SKIP LOCKED (إن دعمته القاعدة) أثناء الحجز فقط، حتى يعمل أكثر
+    من عامل بالتوازي دون حجز نفس الرمز مرتين.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailOTP.objects.select_for_update(
+                skip_locked=connection.features.has_select_for_update_skip_locked,
+            )
+            .filter(
+                # SENDING مستحق = حجز انتهت مهلته (العامل توقف قبل تحديث الحالة)
+                Q(delivery_status=OTPDeliveryStatus.PENDING) | Q(delivery_status=OTPDeliveryStatus.SENDING),
+                next_delivery_at__lte=now,
+            )
+            .order_by("next_delivery_at")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        EmailOTP.objects.filter(pk__in=ids).update(
+            delivery_status=OTPDeliveryStatus.SENDING,
+            next_delivery_at=now + timedelta(seconds=_claim_seconds()),
+        )
+    return list(EmailOTP.objects.select_related("user").filter(pk__in=ids).order_by("pk"))
+
+
+def deliver_pending(batch_size: int = 50) -> tuple[int, int]:
+    """إرسال دفعة من الرموز المستحقة. يرجع (عدد المرسلة، عدد غير المرسلة)."""
+    sent = failed = 0
+    mail_connection = get_connection(defer=False)
+    for otp in claim_pending(batch_size):
+        if deliver_otp(otp, mail_connection=mail_connection):
+            sent += 1
+        else:
+            failed += 1
+    return sent, failed
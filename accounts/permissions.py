@@ -0,0 +1,145 @@
+"""محلّل صلاحيات الأدوار (role -> permissions) مع كاش على مستوى العملية.
+
+- تُبنى خريطة صلاحيات مجموعات الأدوار (التي ينشئها bootstrap_roles) باستعلام واحد
+  وتبقى في ذاكرة العملية
+- أي تعديل على صلاحيات مجموعة يرفع رقم إصدار في الـ cache المشترك، فتعيد كل
+  العمليات (gunicorn workers / خوادم متعددة) بناء الخريطة عند أول فحص بعده؛ بدون
+  كاش مشترك تنتهي الخريطة كل LOCAL_VERSION_FALLBACK_TTL ثانية (accounts.versioning)
+- صلاحيات المستخدم الخاصة (user_permissions أو مجموعات غير مجموعات الأدوار)
+  لا تُجلب إلا إذا كان User.has_custom_permissions = True
+"""
+
+from __future__ import annotations
+
+import threading
+
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Role, User
+from .signals import get_role_group_ids
+from .usercache import invalidate_cached_users
+from .versioning import bump_version, current_version
+
+ROLE_GROUP_NAMES = {r.value for r in Role}
+
+PERMS_VERSION_KEY = "accounts:role_perms:version"
+
+_lock = threading.Lock()
+_state: dict = {"version": None, "perms": {}}
+
+
+def bump_role_perms_version() -> None:
+    """إبطال خريطة الصلاحيات في كل العمليات."""
+    bump_version(PERMS_VERSION_KEY)
+    _state["version"] = None
+
+
+def _build_role_perms() -> dict[str, frozenset[str]]:
+    rows = Group.permissions.through.objects.filter(group__name__in=ROLE_GROUP_NAMES).values_list(
+        "group__name",
+        "permission__content_type__app_label",
+        "permission__codename",
+    )
+    perms: dict[str, set[str]] = {}
+    for group_name, app_label, codename in rows:
+        perms.setdefault(group_name, set()).add(f"{app_label}.{codename}")
+    return {name: frozenset(p) for name, p in perms.items()}
+
+
+def get_role_perms(role: str) -> frozenset[str]:
+    version = current_version(PERMS_VERSION_KEY)
+    if _state["version"] != version:
+        with _lock:
+            if _state["version"] != version:
+                _state["perms"] = _build_role_perms()
+                _state["version"] = version
+    return _state["perms"].get(role, frozenset())
+
+
+def user_has_perm(user: User, perm: str) -> bool:
+    """بديل has_perm لبوابات User.can_*: بدون استعلامات في الحالة المعتادة."""
+    if not user.is_active:
+        return False
+    if user.is_superuser:
+        return True
+    if perm in get_role_perms(user.role):
+        return True
+    if user.has_custom_permissions:
+        # صلاحيات خاصة بالمستخدم: المسار الكامل لـ Django (مع كاشه على الكائن)
+        return user.has_perm(perm)
+    return False
+
+
+def refresh_custom_permission_flags(user_ids) -> set[int]:
+    """إعادة حساب User.has_custom_permissions لمجموعة مستخدمين.
+
+    يرجع معرفات من لديهم صلاحيات خاصة منهم.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return set()
+    custom = set(
+        User.user_permissions.through.objects.filter(user_id__in=user_ids).values_list("user_id", flat=True)
+    )
+    custom |= set(
+        User.groups.through.objects.filter(user_id__in=user_ids)
+        .exclude(group__name__in=ROLE_GROUP_NAMES)
+        .values_list("user_id", flat=True)
+    )
+    User.objects.filter(pk__in=user_ids & custom, has_custom_permissions=False).update(has_custom_permissions=True)
+    User.objects.filter(pk__in=user_ids - custom, has_custom_permissions=True).update(has_custom_permissions=False)
+    invalidate_cached_users(user_ids)
+    return custom
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_on_group_permissions_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        # permission.group_set.add(...) — قد تكون أي مجموعة
+        bump_role_perms_version()
+    elif instance.name in ROLE_GROUP_NAMES:
+        bump_role_perms_version()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_on_group_change(sender, instance, **kwargs):
+    if sender is Permission or instance.name in ROLE_GROUP_NAMES:
+        bump_role_perms_version()
+
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def track_user_permission_overrides(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in {"post_add", "post_remove", "post_clear"}:
+        return
+    if reverse:
+        # permission.user_set.*: post_clear لا يحمل pk_set
+        refresh_custom_permission_flags(
+            pk_set if pk_set is not None else User.objects.filter(has_custom_permissions=True).values_list("pk", flat=True)
+        )
+    else:
+        instance.has_custom_permissions = instance.pk in refresh_custom_permission_flags([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def track_custom_group_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in {"post_add", "post_remove", "post_clear"}:
+        return
+    if reverse:
+        # group.user_set.*
+        if instance.name in ROLE_GROUP_NAMES:
+            return
+        refresh_custom_permission_flags(
+            pk_set if pk_set is not None else User.objects.filter(has_custom_permissions=True).values_list("pk", flat=True)
+        )
+        return
+
+    # user.groups.* — مزامنة مجموعات الأدوار (signals.sync_role_group) لا تغيّر شيئًا هنا
+    if pk_set is not None and pk_set <= set(get_role_group_ids().values()):
+        return
+    instance.has_custom_permissions = instance.pk in refresh_custom_permission_flags([instance.pk])
@@ -0,0 +1,244 @@
+"""إنشاء حسابات المدربين والموظفين دفعة واحدة (CSV / JSONL).
+
+هذه الأدوار لا تُنشأ عبر التسجيل الذاتي (RESTRICTED_SELF_SIGNUP_ROLES)،
+لذلك يستوردها مدير النظام من ملف عبر:
+- python manage.py import_staff users.csv
+- أو صفحة الاستيراد في لوحة التحكم (المستخدمون ← استيراد)
+
+الإنشاء يتم بـ bulk_create بدل User.save لكل صف، وإسناد مجموعات الأدوار
+بإدخال واحد في جدول الربط، وتجزئة كلمات المرور بالتوازي.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import (
+    RESTRICTED_SELF_SIGNUP_ROLES,
+    ROLE_TO_USER_TYPE,
+    Role,
+    User,
+    normalize_email,
+    normalize_phone,
+)
+from .signals import get_role_group_ids
+
+# مدير النظام يُنشأ يدويًا فقط (createsuperuser / لوحة التحكم)
+IMPORTABLE_ROLES = {r.value for r in RESTRICTED_SELF_SIGNUP_ROLES} - {Role.SYSTEM_ADMIN.value}
+
+IMPORT_FIELDS = ("email", "full_name", "phone", "role", "password")
+
+
+@dataclass
+class RowError:
+    line: int
+    email: str
+    errors: list[str]
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    errors: list[RowError] = field(default_factory=list)
+
+
+def parse_rows(content: str, fmt: str) -> Iterator[tuple[int, dict]]:
+    """قراءة الصفوف مع رقم السطر. fmt: csv أو jsonl."""
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(content))
+        for row in reader:
+            yield reader.line_num, {k: (row.get(k) or "").strip() for k in IMPORT_FIELDS}
+        return
+
+    if fmt == "jsonl":
+        for line_no, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_no, {"__error__": "سطر JSON غير صالح."}
+                continue
+            if not isinstance(row, dict):
+                yield line_no, {"__error__": "كل سطر يجب أن يكون كائن JSON."}
+                continue
+            yield line_no, {k: str(row.get(k) or "").strip() for k in IMPORT_FIELDS}
+        return
+
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def detect_format(filename: str) -> str:
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def _validate_row(row: dict) -> tuple[dict, list[str]]:
+    if "__error__" in row:
+        return row, [row["__error__"]]
+
+    errors: list[str] = []
+    email = normalize_email(row.get("email"))
+    phone = normalize_phone(row.get("phone"))
+    role = (row.get("role") or "").upper()
+
+    try:
+        validate_email(email)
+    except ValidationError:
+        errors.append("البريد الإلكتروني غير صالح.")
+    if phone and len(phone) != 10:
+        errors.append("رقم الجوال يجب أن يكون 10 أرقام فقط.")
+    if len(row.get("full_name") or "") > 200:
+        errors.append("الاسم الكامل أطول من 200 حرف.")
+    if role not in IMPORTABLE_ROLES:
+        errors.append(f"الدور غير مسموح للاستيراد: {role or '-'}")
+    # كلمة المرور الفارغة تعني حسابًا بلا كلمة مرور صالحة (يعيّنها المستخدم لاحقًا)
+    if row.get("password"):
+        try:
+            validate_password(row["password"], user=User(email=email, full_name=row.get("full_name") or "", phone=phone))
+        except ValidationError as exc:
+            errors.extend(exc.messages)
+
+    return {**row, "email": email, "phone": phone or None, "role": role}, errors
+
+
+def import_staff(
+    rows: Iterable[tuple[int, dict]],
+    *,
+    dry_run: bool = False,
+    batch_size: int = 1000,
+    workers: int = 4,
+) -> ImportResult:
+    """التحقق من الصفوف ثم إنشاء الصالح منها دفعة واحدة.
+
+    الصفوف ذات الأخطاء لا تمنع إنشاء البقية؛ تُعاد في ImportResult.errors.
+    """
+    result = ImportResult()
+    valid: list[tuple[int, dict]] = []
+    seen_emails: set[str] = set()
+    seen_phones: set[str] = set()
+
+    for line, raw in rows:
+        row, errors = _validate_row(raw)
+        if not errors:
+            if row["email"] in seen_emails:
+                errors.append("البريد مكرر داخل الملف.")
+            if row["phone"] and row["phone"] in seen_phones:
+                errors.append("رقم الجوال مكرر داخل الملف.")
+        if errors:
+            result.errors.append(RowError(line, row.get("email", ""), errors))
+            continue
+        seen_emails.add(row["email"])
+        if row["phone"]:
+            seen_phones.add(row["phone"])
+        valid.append((line, row))
+
+    lines = {row["email"]: line for line, row in valid}
+    conflicts = _conflicts([row for _, row in valid], batch_size)
+    to_create: list[dict] = []
+    for line, row in valid:
+        if row["email"] in conflicts:
+            result.errors.append(RowError(line, row["email"], conflicts[row["email"]]))
+        else:
+            to_create.append(row)
+
+    if dry_run or not to_create:
+        result.errors.sort(key=lambda e: e.line)
+        # في dry-run يمثل created عدد الحسابات التي كانت ستُنشأ
+        result.created = len(to_create) if dry_run else 0
+        return result
+
+    # PBKDF2 في hashlib يحرر الـ GIL، لذلك تعمل الخيوط بالتوازي فعليًا
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        hashes = list(pool.map(lambda r: make_password(r["password"] or None), to_create))
+
+    users = [
+        User(
+            email=row["email"],
+            full_name=row["full_name"],
+            phone=row["phone"],
+            role=row["role"],
+            user_type=ROLE_TO_USER_TYPE[row["role"]],
+            password=password_hash,
+            is_active=True,
+            is_staff=False,
+        )
+        for row, password_hash in zip(to_create, hashes)
+    ]
+
+    # حساب أُنشئ بالتوازي بعد الفحص المسبق (استيراد آخر / تسجيل): القيد الفريد يرفض الدفعة
+    # كاملة، فتُسجل الصفوف المتعارضة أخطاءً ويُعاد إنشاء البقية
+    while users:
+        try:
+            _create_users(users, batch_size)
+            break
+        except IntegrityError:
+            for u in users:
+                u.pk = None
+            conflicts = _conflicts([{"email": u.email, "phone": u.phone} for u in users], batch_size)
+            if not conflicts:
+                result.errors.extend(
+                    RowError(lines[u.email], u.email, ["تعذر إنشاء الحساب بسبب تعارض في قاعدة البيانات؛ أعد الاستيراد."])
+                    for u in users
+                )
+                users = []
+                break
+            result.errors.extend(RowError(lines[email], email, errors) for email, errors in conflicts.items())
+            users = [u for u in users if u.email not in conflicts]
+
+    result.errors.sort(key=lambda e: e.line)
+    result.created = len(users)
+    return result
+
+
+def _conflicts(rows: list[dict], batch_size: int) -> dict[str, list[str]]:
+    """التعارض مع الحسابات الموجودة (البريد -> الأخطاء): استعلام واحد لكل دفعة."""
+    taken_emails: set[str] = set()
+    taken_phones: set[str] = set()
+    for start in range(0, len(rows), batch_size):
+        chunk = rows[start:start + batch_size]
+        emails = [r["email"] for r in chunk]
+        phones = [r["phone"] for r in chunk if r["phone"]]
+        for email, phone in User.objects.filter(Q(email__in=emails) | Q(phone__in=phones)).values_list("email", "phone"):
+            taken_emails.add(email)
+            if phone:
+                taken_phones.add(phone)
+
+    conflicts = {}
+    for row in rows:
+        errors = []
+        if row["email"] in taken_emails:
+            errors.append("هذا البريد مستخدم مسبقًا.")
+        if row["phone"] and row["phone"] in taken_phones:
+            errors.append("رقم الجوال مستخدم مسبقًا.")
+        if errors:
+            conflicts[row["email"]] = errors
+    return conflicts
+
+
+def _create_users(users: list[User], batch_size: int) -> None:
+    group_ids = get_role_group_ids()
+    Through = User.groups.through
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+        if any(u.pk is None for u in users):
+            # قواعد لا ترجع المعرفات من bulk_create (مثل MySQL)
+            ids = dict(User.objects.filter(email__in=[u.email for u in users]).values_list("email", "id"))
+            for u in users:
+                u.pk = ids[u.email]
+        Through.objects.bulk_create(
+            [Through(user_id=u.pk, group_id=group_ids[u.role]) for u in users],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
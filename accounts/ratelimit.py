@@ -0,0 +1,127 @@
+"""محدد معدل الطلبات (sliding window) على الـ cache المشترك.
+
+يُستخدم كـ decorator على العروض ويرفض الطلب بـ 429 قبل أي تجزئة كلمة مرور
+أو استعلام قاعدة بيانات:
+
+    @ratelimit("login", key="ip", rate="20/m")
+    @ratelimit("login", key="post:identifier", rate="5/5m")
+    def login_view(request): ...
+
+النافذة المنزلقة تقريبية بنافذتين ثابتتين (الحالية + السابقة بوزن الجزء المتبقي منها)،
+وكل نافذة عدّاد ذري واحد في الـ cache (cache.incr)، فلا قفل ولا قراءة-ثم-كتابة.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .models import normalize_email, normalize_phone
+
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([smhd])\s*$")
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """'5/m' -> (5, 60) و '10/15m' -> (10, 900)."""
+    match = _RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f"Invalid rate: {rate!r}")
+    limit, multiplier, unit = match.groups()
+    return int(limit), int(multiplier or 1) * _UNIT_SECONDS[unit]
+
+
+def too_many_requests(retry_after: int) -> HttpResponse:
+    response = HttpResponse(
+        "الخدمة مشغولة حاليًا بسبب كثرة الطلبات. يرجى المحاولة بعد لحظات.",
+        status=429,
+        content_type="text/plain; charset=utf-8",
+    )
+    response["Retry-After"] = str(max(1, retry_after))
+    return response
+
+
+def client_ip(request) -> str:
+    """عنوان العميل. خلف Proxy موثوق: المدخل رقم RATELIMIT_TRUSTED_PROXY_COUNT من يمين X-Forwarded-For.
+
+    كل Proxy يضيف العنوان الذي اتصل منه في آخر الترويسة، أما ما قبله فيرسله العميل
+    كما يشاء؛ لذلك لا يُؤخذ المدخل الأيسر أبدًا.
+    """
+    if getattr(settings, "RATELIMIT_TRUST_X_FORWARDED_FOR", False):
+        proxies = max(int(getattr(settings, "RATELIMIT_TRUSTED_PROXY_COUNT", 1)), 1)
+        entries = [e.strip() for e in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if e.strip()]
+        if len(entries) >= proxies:
+            return entries[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _normalize_identifier(value: str) -> str:
+    """نفس تطبيع البحث عند الدخول: صيغ الجوال (+9665 / 9665 / 05) والبريد لمفتاح واحد."""
+    if "@" in value:
+        return normalize_email(value)
+    phone = normalize_phone(value)
+    return phone if len(phone) == 10 else value.strip().lower()
+
+
+def resolve_key(request, key: str) -> str | None:
+    """ip | post:<field> | session:<key>. يرجع None إذا لم تتوفر القيمة (لا يُطبق القيد)."""
+    if key == "ip":
+        value = client_ip(request)
+    elif key.startswith("post:"):
+        value = _normalize_identifier(request.POST.get(key[5:]) or "")
+    elif key.startswith("session:"):
+        value = request.session.get(key[8:])
+    else:
+        raise ValueError(f"Unknown ratelimit key: {key!r}")
+    if value in (None, ""):
+        return None
+    # لا نخزن البريد/الجوال كما هو في مفاتيح الـ cache
+    return hashlib.blake2b(str(value).encode(), digest_size=12).hexdigest()
+
+
+def hit(scope: str, ident: str, limit: int, window: int, now: float | None = None) -> tuple[bool, int]:
+    """تسجيل طلب والتحقق من الحد. يرجع (مسموح؟، ثوانٍ حتى إعادة المحاولة)."""
+    now = time.time() if now is None else now
+    index = int(now // window)
+    elapsed = (now % window) / window
+    current_key = f"rl:{scope}:{ident}:{index}"
+
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # أول طلب في النافذة (أو سباق مع طلب آخر أنشأ العداد للتو)
+        if cache.add(current_key, 1, timeout=window * 2):
+            current = 1
+        else:
+            current = cache.incr(current_key)
+
+    previous = cache.get(f"rl:{scope}:{ident}:{index - 1}", 0) if current <= limit else 0
+    estimated = previous * (1 - elapsed) + current
+    if estimated <= limit:
+        return True, 0
+    return False, int(window * (1 - elapsed)) + 1
+
+
+def ratelimit(scope: str, *, key: str, rate: str, methods: tuple[str, ...] = ("POST",)):
+    limit, window = parse_rate(rate)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if getattr(settings, "RATELIMIT_ENABLE", True) and request.method in methods:
+                ident = resolve_key(request, key)
+                if ident is not None:
+                    allowed, retry_after = hit(f"{scope}:{key}", ident, limit, window)
+                    if not allowed:
+                        return too_many_requests(retry_after)
+            return view(request, *args, **kwargs)
+
+        return wrapped
+
+    return decorator
@@ -2,43 +2,84 @@ from __future__ import annotations
 
 import logging
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import Group
 
 from .models import User, Role
+from .usercache import invalidate_cached_users
 
 logger = logging.getLogger(__name__)
 
 
 ROLE_GROUP_NAMES = {r.value for r in Role}
 
+# كاش على مستوى العملية: اسم الدور -> group_id
+# يُفرّغ عند حفظ/حذف مجموعة دور أو عند فشل المزامنة (قد يكون المعرف قديمًا).
+_ROLE_GROUP_IDS: dict[str, int] = {}
+
+
+def get_role_group_ids() -> dict[str, int]:
+    """معرفات مجموعات الأدوار (تُنشأ الناقصة منها مرة واحدة لكل عملية)."""
+    if len(_ROLE_GROUP_IDS) < len(ROLE_GROUP_NAMES):
+        ids = dict(Group.objects.filter(name__in=ROLE_GROUP_NAMES).values_list("name", "id"))
+        for name in ROLE_GROUP_NAMES - ids.keys():
+            # Ensure role group exists (safe in concurrent creates)
+            ids[name] = Group.objects.get_or_create(name=name)[0].pk
+        _ROLE_GROUP_IDS.update(ids)
+    return _ROLE_GROUP_IDS
+
+
+def clear_role_group_cache() -> None:
+    _ROLE_GROUP_IDS.clear()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_role_group_cache(sender, instance: Group, **kwargs):
+    if instance.name in ROLE_GROUP_NAMES:
+        clear_role_group_cache()
+
 
 @receiver(post_save, sender=User)
-def sync_role_group(sender, instance: User, created: bool, **kwargs):
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance: User, **kwargs):
+    """أي حفظ للمستخدم (دور، تفعيل، كلمة مرور...) يبطل نسخته المخزنة للمصادقة."""
+    invalidate_cached_users([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def sync_role_group(sender, instance: User, created: bool, update_fields=None, **kwargs):
     """مزامنة مجموعة (Group) الدور مع حقل role.
 
     - نضيف المستخدم إلى مجموعة تحمل اسم role (مثل: SYSTEM_ADMIN)
     - نزيله من مجموعات الأدوار الأخرى فقط (ولا نمس المجموعات المخصصة الأخرى)
+    - لا نفعل شيئًا إذا لم يتغير الدور (مثل تحديث last_login عند الدخول
+      أو is_active عند التفعيل)، فلا تكلف هذه العمليات أي استعلام على المجموعات
 
     هذا يسمح لاحقًا لمدير النظام بضبط صلاحيات كل مجموعة من لوحة Django Admin
     (أو أي واجهة إدارة نضيفها لاحقًا).
     """
-    try:
-        role_name = instance.role
-        if not role_name:
-            return
+    role_name = instance.role
+    if not role_name:
+        return
+    if update_fields is not None and "role" not in update_fields:
+        return
+    if not created and getattr(instance, "_loaded_role", None) == role_name:
+        return
 
-        # Ensure role group exists (safe in concurrent creates)
-        role_group, _ = Group.objects.get_or_create(name=role_name)
+    try:
+        group_ids = get_role_group_ids()
 
         # Remove from other role groups
-        other_role_groups = Group.objects.filter(name__in=(ROLE_GROUP_NAMES - {role_name}))
-        instance.groups.remove(*other_role_groups)
+        instance.groups.remove(*(gid for name, gid in group_ids.items() if name != role_name))
 
         # Add to the correct role group
-        instance.groups.add(role_group)
+        instance.groups.add(group_ids[role_name])
+
+        instance._loaded_role = role_name
 
     except Exception:
         # لا نكسر عملية الحفظ بسبب خطأ في مزامنة المجموعات
+        clear_role_group_cache()
         logger.exception("Failed to sync role group for user_id=%s", instance.pk)
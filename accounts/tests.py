@@ -1,11 +1,32 @@
 from __future__ import annotations
 
-from django.test import TestCase
-from django.contrib.auth.models import Group
+import smtplib
+import socket
+import socketserver
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from unittest import mock
+
+from django.test import RequestFactory, TestCase, override_settings
+from django.contrib.auth.models import Group, Permission
+from django.core import mail
+from django.core.cache import cache
 from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
 
-from .models import User, Role, UserType
-from .forms import IndividualSignupForm
+from .models import DeferredEmail, EmailOTP, OTPDeliveryStatus, User, Role, UserType
+from .otp import CacheOTPStore, DatabaseOTPStore, OTPResult
+from .outbox import deliver_pending
+from .provisioning import import_staff, parse_rows
+from .transactional import EMAIL_TEMPLATES, CompiledEmailTemplate, get_email_template, inline_css, render_email
+from .ratelimit import client_ip, hit, parse_rate, resolve_key
+from .forms import EmailLoginForm, IndividualSignupForm, OrganizationSignupForm
+from .hashing import HashingSaturated, HashingService
+from .mail import MailCircuitOpen, PooledSMTPBackend, close_pooled_connections, reset_breakers, retry_deferred
 
 
 class RoleAndSignupTests(TestCase):
@@ -14,6 +35,7 @@ class RoleAndSignupTests(TestCase):
             data={
                 "email": "test@example.com",
                 "full_name": "Test User",
+                "id_number": "1000000000",
                 "phone": "0500000000",
                 "password1": "Str0ngPass!234",
                 "password2": "Str0ngPass!234",
@@ -50,3 +72,683 @@ class RoleAndSignupTests(TestCase):
         call_command("bootstrap_roles")
         for role in Role.values:
             self.assertTrue(Group.objects.filter(name=role).exists())
+
+
+class LoginLookupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="Login@Example.com",
+            password="Str0ngPass!234",
+            phone="0551234567",
+            is_active=True,
+        )
+
+    def test_identifiers_are_stored_normalized(self):
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, "login@example.com")
+        other = User.objects.create_user(email="nophone@example.com", password="Str0ngPass!234", phone="")
+        other.refresh_from_db()
+        self.assertIsNone(other.phone)
+
+    def test_login_by_email_and_phone(self):
+        for identifier in ("LOGIN@example.com", "0551234567", "+966551234567"):
+            form = EmailLoginForm(data={"identifier": identifier, "password": "Str0ngPass!234"})
+            self.assertTrue(form.is_valid(), identifier)
+            self.assertEqual(form.get_user(), self.user)
+
+    def test_unknown_identifier_is_rejected(self):
+        form = EmailLoginForm(data={"identifier": "missing@example.com", "password": "Str0ngPass!234"})
+        self.assertFalse(form.is_valid())
+        self.assertIsNone(form.get_user())
+
+
+class OTPOutboxTests(TestCase):
+    def test_signup_queues_otp_without_sending(self):
+        res = self.client.post(
+            reverse("accounts:register_individual"),
+            {
+                "email": "queued@example.com",
+                "full_name": "Queued User",
+                "id_number": "1000000001",
+                "phone": "0500000001",
+                "password1": "Str0ngPass!234",
+                "password2": "Str0ngPass!234",
+            },
+        )
+        self.assertRedirects(res, reverse("accounts:verify_otp"), fetch_redirect_response=False)
+        otp = EmailOTP.objects.get(user__email="queued@example.com")
+        self.assertEqual(otp.delivery_status, OTPDeliveryStatus.PENDING)
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(deliver_pending(), (1, 0))
+        otp.refresh_from_db()
+        self.assertEqual(otp.delivery_status, OTPDeliveryStatus.SENT)
+        self.assertEqual(otp.delivery_attempts, 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(otp.code, mail.outbox[0].body)
+
+        # لا يُعاد إرسال نفس الرمز
+        self.assertEqual(deliver_pending(), (0, 0))
+
+
+    def test_sent_rows_survive_a_crash_mid_batch(self):
+        users = [User.objects.create_user(email=f"b{i}@example.com", password="Str0ngPass!234") for i in range(2)]
+        otps = [EmailOTP.create_for_user(user) for user in users]
+        calls = []
+
+        def send(message, fail_silently=False):
+            calls.append(message)
+            if len(calls) == 2:
+                raise SystemExit("worker killed")
+            return 1
+
+        with mock.patch("django.core.mail.EmailMultiAlternatives.send", send), self.assertRaises(SystemExit):
+            deliver_pending()
+
+        first, second = (EmailOTP.objects.get(pk=otp.pk) for otp in otps)
+        # ما أُرسل قبل التعطل يبقى SENT ولا يعود إلى PENDING
+        self.assertEqual(first.delivery_status, OTPDeliveryStatus.SENT)
+        # الرمز الذي كان قيد الإرسال محجوز حتى انتهاء المهلة ثم يُستعاد
+        self.assertEqual(second.delivery_status, OTPDeliveryStatus.SENDING)
+        self.assertEqual(deliver_pending(), (0, 0))
+        EmailOTP.objects.filter(pk=second.pk).update(next_delivery_at=timezone.now())
+        self.assertEqual(deliver_pending(), (1, 0))
+
+
+class OTPStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="otp@example.com", password="Str0ngPass!234")
+
+    def _assert_store_semantics(self, store):
+        otp = store.issue(self.user)
+        wrong = "000000" if otp.code != "000000" else "111111"
+        for _ in range(5):
+            self.assertEqual(store.verify(self.user, wrong), OTPResult.INVALID)
+        self.assertEqual(store.verify(self.user, otp.code), OTPResult.LOCKED)
+
+        otp = store.issue(self.user)
+        self.assertEqual(store.verify(self.user, otp.code), OTPResult.OK)
+        # لا يمكن استخدام نفس الرمز مرتين
+        self.assertNotEqual(store.verify(self.user, otp.code), OTPResult.OK)
+
+    def test_database_store(self):
+        self._assert_store_semantics(DatabaseOTPStore())
+
+    def test_cache_store(self):
+        self._assert_store_semantics(CacheOTPStore())
+        self.assertFalse(EmailOTP.objects.filter(user=self.user, is_used=False).exists())
+
+    def test_purge_deletes_stale_rows_only(self):
+        store = DatabaseOTPStore()
+        fresh = store.issue(self.user)
+        stale = store.issue(self.user)
+        EmailOTP.objects.filter(pk=stale.pk).update(
+            expires_at=stale.expires_at - timedelta(days=1),
+            created_at=stale.created_at - timedelta(days=1),
+        )
+        call_command("purge_email_otps", batch_size=1, stdout=StringIO())
+        self.assertEqual(list(EmailOTP.objects.values_list("pk", flat=True)), [fresh.pk])
+
+
+class RoleGroupSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="sync@example.com", password="Str0ngPass!234", is_active=True)
+
+    def _group_names(self, user):
+        return set(user.groups.values_list("name", flat=True))
+
+    def test_save_without_role_change_skips_group_queries(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            user.save(update_fields=["last_login"])
+        with self.assertNumQueries(1):
+            user.full_name = "Renamed"
+            user.save()
+
+    def test_role_change_moves_user_between_role_groups(self):
+        self.assertEqual(self._group_names(self.user), {Role.IND})
+        user = User.objects.get(pk=self.user.pk)
+        user.role = Role.TRAINER
+        user.save()
+        self.assertEqual(self._group_names(user), {Role.TRAINER})
+
+
+class StaffImportTests(TestCase):
+    def test_import_creates_users_with_role_groups_and_reports_errors(self):
+        User.objects.create_user(email="taken@example.com", password="Str0ngPass!234")
+        content = (
+            "email,full_name,phone,role,password\n"
+            "Trainer1@example.com,Trainer One,0511111111,TRAINER,Str0ngPass!234\n"
+            "coord@example.com,Coordinator,,COURSE_COORDINATOR,\n"
+            "taken@example.com,Dup,,TRAINER,\n"
+            "admin@example.com,Admin,,SYSTEM_ADMIN,\n"
+            "bad-email,Bad,,TRAINER,\n"
+        )
+        result = import_staff(parse_rows(content, "csv"))
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([e.line for e in result.errors], [4, 5, 6])
+
+        trainer = User.objects.get(email="trainer1@example.com")
+        self.assertTrue(trainer.check_password("Str0ngPass!234"))
+        self.assertEqual(trainer.user_type, UserType.TRAINER)
+        self.assertEqual(list(trainer.groups.values_list("name", flat=True)), [Role.TRAINER])
+        coord = User.objects.get(email="coord@example.com")
+        self.assertFalse(coord.has_usable_password())
+        self.assertEqual(list(coord.groups.values_list("name", flat=True)), [Role.COURSE_COORDINATOR])
+
+    def test_concurrent_insert_is_reported_as_a_row_error(self):
+        from . import provisioning
+
+        real_conflicts = provisioning._conflicts
+
+        def precheck_then_race(rows, batch_size):
+            conflicts = real_conflicts(rows, batch_size)
+            if not User.objects.filter(email="race@example.com").exists():
+                # حساب أُنشئ بعد الفحص المسبق وقبل bulk_create
+                User.objects.create_user(email="race@example.com", password="Str0ngPass!234")
+            return conflicts
+
+        content = (
+            "email,full_name,phone,role,password\n"
+            "race@example.com,Race,,TRAINER,\n"
+            "calm@example.com,Calm,,TRAINER,\n"
+        )
+        with mock.patch.object(provisioning, "_conflicts", side_effect=precheck_then_race):
+            result = import_staff(parse_rows(content, "csv"))
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([(e.line, e.errors) for e in result.errors], [(2, ["هذا البريد مستخدم مسبقًا."])])
+        self.assertTrue(User.objects.filter(email="calm@example.com", groups__name=Role.TRAINER).exists())
+
+    def test_weak_passwords_are_reported_per_row(self):
+        content = (
+            "email,full_name,phone,role,password\n"
+            "weak@example.com,Weak,,TRAINER,12345678\n"
+            "similar@example.com,Similar,,TRAINER,similar@example.com\n"
+            "ok@example.com,Ok,,TRAINER,Str0ngPass!234\n"
+        )
+        result = import_staff(parse_rows(content, "csv"))
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([e.line for e in result.errors], [2, 3])
+        self.assertTrue(result.errors[0].errors)
+        self.assertFalse(User.objects.filter(email__in=["weak@example.com", "similar@example.com"]).exists())
+
+
+@override_settings(SHARED_CACHE=True)
+class PermissionResolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        call_command("bootstrap_roles", stdout=StringIO())
+        self.trainer = User.objects.create_user(
+            email="trainer@example.com", password="Str0ngPass!234", role=Role.TRAINER, is_active=True
+        )
+        self.perm = Permission.objects.get(content_type__app_label="accounts", codename="manage_courses")
+
+    def test_role_group_permissions_are_cached_and_invalidated(self):
+        trainer = User.objects.get(pk=self.trainer.pk)
+        self.assertFalse(trainer.can_manage_courses())
+        with self.assertNumQueries(0):
+            self.assertFalse(trainer.can_manage_courses())
+
+        Group.objects.get(name=Role.TRAINER).permissions.add(self.perm)
+        self.assertTrue(trainer.can_manage_courses())
+        with self.assertNumQueries(0):
+            self.assertTrue(trainer.can_manage_courses())
+
+    @override_settings(SHARED_CACHE=False, LOCAL_VERSION_FALLBACK_TTL=5)
+    def test_process_local_cache_expires_without_a_shared_cache(self):
+        trainer = User.objects.get(pk=self.trainer.pk)
+        with mock.patch("accounts.versioning.time.monotonic", return_value=100.0):
+            self.assertFalse(trainer.can_manage_courses())
+            # عملية أخرى عدّلت الصلاحيات: رفع الإصدار في LocMemCache لا يصلنا
+            Group.permissions.through.objects.create(
+                group=Group.objects.get(name=Role.TRAINER), permission=self.perm
+            )
+            with self.assertNumQueries(0):
+                self.assertFalse(trainer.can_manage_courses())
+        with mock.patch("accounts.versioning.time.monotonic", return_value=106.0):
+            self.assertTrue(trainer.can_manage_courses())
+
+    def test_per_user_override_is_detected(self):
+        self.trainer.user_permissions.add(self.perm)
+        self.assertTrue(self.trainer.has_custom_permissions)
+        trainer = User.objects.get(pk=self.trainer.pk)
+        self.assertTrue(trainer.has_custom_permissions)
+        self.assertTrue(trainer.can_manage_courses())
+
+        trainer.user_permissions.clear()
+        self.assertFalse(User.objects.get(pk=trainer.pk).has_custom_permissions)
+
+
+class SignupUniquenessTests(TestCase):
+    def _data(self, **overrides):
+        data = {
+            "email": "new@example.com",
+            "full_name": "New User",
+            "id_number": "1234567890",
+            "phone": "0599999999",
+            "password1": "Str0ngPass!234",
+            "password2": "Str0ngPass!234",
+        }
+        data.update(overrides)
+        return data
+
+    def test_all_unique_fields_checked_in_one_query(self):
+        existing = IndividualSignupForm(data=self._data())
+        self.assertTrue(existing.is_valid())
+        existing.save()
+
+        form = IndividualSignupForm(data=self._data(email="NEW@example.com"))
+        with self.assertNumQueries(1):
+            self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {"email", "phone", "id_number"})
+
+    def test_integrity_error_is_mapped_to_field_errors(self):
+        first = IndividualSignupForm(data=self._data())
+        second = IndividualSignupForm(data=self._data(email="other@example.com", phone="0588888888"))
+        # كلا النموذجين يمر بالتحقق قبل أن يُحفظ أي منهما (تسجيل متزامن)
+        self.assertTrue(first.is_valid())
+        self.assertTrue(second.is_valid())
+        self.assertIsNotNone(first.save())
+
+        self.assertIsNone(second.save())
+        self.assertIn("id_number", second.errors)
+        self.assertEqual(User.objects.filter(email="other@example.com").count(), 0)
+
+
+    def _org_data(self, **overrides):
+        data = {
+            "email": "org@example.com",
+            "category": "GOV",
+            "org_name": "جهة جديدة",
+            "representative_name": "Rep",
+            "representative_phone": "0599999999",
+            "location_description": "الرياض",
+            "password1": "Str0ngPass!234",
+            "password2": "Str0ngPass!234",
+        }
+        data.update(overrides)
+        return data
+
+    def test_organization_duplicate_phone_is_a_field_error(self):
+        User.objects.create_user(email="taken@example.com", password="Str0ngPass!234", phone="0599999999")
+        form = OrganizationSignupForm(data=self._org_data())
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["representative_phone"], ["رقم الجوال مستخدم مسبقًا."])
+
+    def test_organization_duplicate_name_is_case_insensitive(self):
+        User.objects.create_user(email="taken@example.com", password="Str0ngPass!234", full_name="Org Name")
+        # تطبيق organizations غير مثبت هنا: حقل في User يقوم مقام organization_profile__org_name
+        with mock.patch("accounts.forms._profile_lookup", return_value="full_name"):
+            form = OrganizationSignupForm(data=self._org_data(org_name="ORG name"))
+            self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["org_name"], ["اسم الجهة مسجل مسبقًا."])
+
+
+class HashingServiceTests(TestCase):
+    def test_rejects_when_queue_is_full(self):
+        service = HashingService(workers=1, max_queue=1)
+        release = threading.Event()
+        blocked = service.submit(release.wait)
+        with self.assertRaises(HashingSaturated):
+            service.submit(len, "x")
+        release.set()
+        blocked.result(timeout=5)
+        self.assertEqual(service.stats()["rejected"], 1)
+        self.assertEqual(service.run(len, "abc"), 3)
+
+    def test_login_returns_429_when_saturated(self):
+        cache.clear()
+        with mock.patch("accounts.hashing.HashingService.submit", side_effect=HashingSaturated):
+            res = self.client.post(
+                reverse("accounts:login"), {"identifier": "a@example.com", "password": "x"}
+            )
+        self.assertEqual(res.status_code, 429)
+        self.assertIn("Retry-After", res)
+
+    def test_password_is_rehashed_with_preferred_hasher_on_login(self):
+        user = User.objects.create_user(email="rehash@example.com", password="Str0ngPass!234", is_active=True)
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$"))
+
+        with override_settings(PASSWORD_HASHERS=[
+            "django.contrib.auth.hashers.MD5PasswordHasher",
+            "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        ]):
+            form = EmailLoginForm(data={"identifier": user.email, "password": "Str0ngPass!234"})
+            self.assertTrue(form.is_valid())
+
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith("md5$"))
+            self.assertTrue(user.check_password("Str0ngPass!234"))
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("5/m"), (5, 60))
+        self.assertEqual(parse_rate("10/15m"), (10, 900))
+
+    def test_sliding_window_weights_previous_window(self):
+        for _ in range(10):
+            self.assertTrue(hit("t", "k", 10, 60, now=30.0)[0])
+        self.assertFalse(hit("t", "k", 10, 60, now=59.0)[0])
+        # منتصف النافذة التالية: نصف عدّاد السابقة (~5.5) ما زال محسوبًا
+        for _ in range(4):
+            self.assertTrue(hit("t", "k", 10, 60, now=90.0)[0])
+        self.assertFalse(hit("t", "k", 10, 60, now=90.0)[0])
+
+    def test_login_is_limited_per_identifier_before_hashing(self):
+        url = reverse("accounts:login")
+        for _ in range(10):
+            self.client.post(url, {"identifier": "victim@example.com", "password": "wrong"})
+        with mock.patch("accounts.hashing.HashingService.submit") as submit:
+            res = self.client.post(url, {"identifier": "Victim@example.com", "password": "wrong"})
+        self.assertEqual(res.status_code, 429)
+        submit.assert_not_called()
+
+    def test_phone_formats_share_one_bucket(self):
+        factory = RequestFactory()
+        keys = {
+            resolve_key(factory.post("/", {"identifier": identifier}), "post:identifier")
+            for identifier in ("+966512345678", "966512345678", "0512345678", " 05 1234 5678 ")
+        }
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(
+            resolve_key(factory.post("/", {"identifier": " Victim@Example.com"}), "post:identifier"),
+            resolve_key(factory.post("/", {"identifier": "victim@example.com"}), "post:identifier"),
+        )
+
+    def test_client_ip_ignores_spoofed_forwarded_entries(self):
+        request = RequestFactory().get("/", HTTP_X_FORWARDED_FOR="6.6.6.6, 203.0.113.7", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(client_ip(request), "10.0.0.1")
+        with self.settings(RATELIMIT_TRUST_X_FORWARDED_FOR=True, RATELIMIT_TRUSTED_PROXY_COUNT=1):
+            self.assertEqual(client_ip(request), "203.0.113.7")
+        with self.settings(RATELIMIT_TRUST_X_FORWARDED_FOR=True, RATELIMIT_TRUSTED_PROXY_COUNT=2):
+            self.assertEqual(client_ip(request), "6.6.6.6")
+        with self.settings(RATELIMIT_TRUST_X_FORWARDED_FOR=True, RATELIMIT_TRUSTED_PROXY_COUNT=3):
+            self.assertEqual(client_ip(request), "10.0.0.1")
+
+
+def _load_settings(**environ) -> dict:
+    """تقييم thqaf/settings.py من جديد بمتغيرات بيئة معينة (بدون المساس بالإعدادات الحالية)."""
+    import os
+    import runpy
+
+    from django.conf import settings as django_settings
+
+    clean = {k: v for k, v in os.environ.items() if not k.startswith("THQAF_")}
+    with mock.patch.dict(os.environ, {**clean, **environ}, clear=True):
+        return runpy.run_path(str(django_settings.BASE_DIR / "thqaf" / "settings.py"))
+
+
+class SessionStorageTests(TestCase):
+    def test_cached_session_engines_require_shared_cache(self):
+        self.assertEqual(_load_settings()["SESSION_ENGINE"], "django.contrib.sessions.backends.db")
+        for store in ("cache", "cached_db"):
+            loaded = _load_settings(THQAF_SESSION_STORE=store)
+            self.assertEqual(loaded["SESSION_ENGINE"], "django.contrib.sessions.backends.db")
+
+        redis = {"THQAF_REDIS_URL": "redis://127.0.0.1:6379/1"}
+        self.assertEqual(_load_settings(**redis)["SESSION_ENGINE"], "django.contrib.sessions.backends.cached_db")
+        self.assertEqual(
+            _load_settings(THQAF_SESSION_STORE="cache", **redis)["SESSION_ENGINE"],
+            "django.contrib.sessions.backends.cache",
+        )
+
+    def test_sweep_sessions_deletes_only_expired(self):
+        from django.contrib.sessions.models import Session
+        from django.utils import timezone
+
+        now = timezone.now()
+        Session.objects.create(session_key="expired1", session_data="", expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key="expired2", session_data="", expire_date=now - timedelta(days=2))
+        Session.objects.create(session_key="live", session_data="", expire_date=now + timedelta(days=1))
+
+        call_command("sweep_sessions", batch_size=1, sleep=0, stdout=StringIO())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["live"])
+
+    def test_session_metrics_count_reads_and_writes(self):
+        from .middleware import session_metrics
+
+        before = session_metrics.snapshot()
+        self.client.get(reverse("accounts:register_choice"))
+        self.client.get(reverse("accounts:resend_otp"))  # تكتب رسالة/تقرأ الجلسة
+        after = session_metrics.snapshot()
+        self.assertEqual(after["requests"] - before["requests"], 2)
+        self.assertGreaterEqual(after["session_reads"] - before["session_reads"], 1)
+
+
+@override_settings(SHARED_CACHE=True)
+class CachedAuthUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="cached@example.com", password="Str0ngPass!234", is_active=True)
+        self.client.force_login(self.user)
+        self.url = reverse("individuals:dashboard")
+
+    def _user_selects(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        return [q for q in ctx.captured_queries if 'FROM "accounts_user"' in q["sql"]]
+
+    def test_user_is_served_from_cache_after_first_request(self):
+        self.assertEqual(len(self._user_selects()), 1)
+        self.assertEqual(self._user_selects(), [])
+
+    @override_settings(SHARED_CACHE=False)
+    def test_process_local_cache_reads_user_every_request(self):
+        self.assertEqual(len(self._user_selects()), 1)
+        self.assertEqual(len(self._user_selects()), 1)
+
+    def test_deactivation_takes_effect_on_next_request(self):
+        self.client.get(self.url)
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 302)
+        self.assertIn(reverse("accounts:login"), res["Location"])
+
+
+class ReconcileRoleGroupsTests(TestCase):
+    def test_fixes_memberships_after_queryset_update(self):
+        users = [
+            User.objects.create_user(email=f"r{i}@example.com", password="Str0ngPass!234")
+            for i in range(3)
+        ]
+        # تحديث جماعي يتجاوز إشارة post_save
+        User.objects.filter(pk__in=[u.pk for u in users[:2]]).update(role=Role.TRAINER)
+
+        out = StringIO()
+        call_command("reconcile_role_groups", dry_run=True, stdout=out)
+        self.assertIn("missing=2 extra=2", out.getvalue())
+        self.assertEqual(set(users[0].groups.values_list("name", flat=True)), {Role.IND})
+
+        call_command("reconcile_role_groups", batch_size=1, stdout=StringIO())
+        for user, role in zip(users, [Role.TRAINER, Role.TRAINER, Role.IND]):
+            self.assertEqual(set(user.groups.values_list("name", flat=True)), {role})
+
+        out = StringIO()
+        call_command("reconcile_role_groups", dry_run=True, stdout=out)
+        self.assertIn("missing=0 extra=0", out.getvalue())
+
+    def test_dry_run_does_not_create_missing_groups(self):
+        User.objects.create_user(email="nogroup@example.com", password="Str0ngPass!234", role=Role.TRAINER)
+        Group.objects.filter(name=Role.TRAINER).delete()
+
+        out = StringIO()
+        call_command("reconcile_role_groups", dry_run=True, stdout=out)
+        self.assertIn(f"{Role.TRAINER}: group does not exist (missing=1)", out.getvalue())
+        self.assertFalse(Group.objects.filter(name=Role.TRAINER).exists())
+
+
+class _SMTPStandIn(socketserver.ThreadingTCPServer):
+    """خادم SMTP محلي بسيط للاختبارات: يعد الاتصالات والرسائل."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        self.connections = 0
+        self.messages: list[bytes] = []
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.connections += 1
+        self.wfile.write(b"220 localhost ESMTP\r\n")
+        while line := self.rfile.readline():
+            command = line[:4].upper()
+            if command == b"RCPT" and b"bad@" in line:
+                self.wfile.write(b"550 no such user\r\n")
+            elif command == b"DATA":
+                self.wfile.write(b"354 go ahead\r\n")
+                body = b""
+                while (chunk := self.rfile.readline()) not in (b".\r\n", b""):
+                    body += chunk
+                self.server.messages.append(body)
+                self.wfile.write(b"250 queued\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@override_settings(
+    EMAIL_BACKEND="accounts.mail.PooledSMTPBackend",
+    EMAIL_HOST="127.0.0.1",
+    EMAIL_HOST_USER="",
+    EMAIL_HOST_PASSWORD="",
+    EMAIL_USE_SSL=False,
+    EMAIL_USE_TLS=False,
+    EMAIL_CIRCUIT_FAILURE_THRESHOLD=2,
+    EMAIL_CIRCUIT_RESET_SECONDS=0,
+)
+class PooledSMTPBackendTests(TestCase):
+    def setUp(self):
+        reset_breakers()
+        self.server = _SMTPStandIn()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        close_pooled_connections()
+        self.server.shutdown()
+        self.server.server_close()
+        reset_breakers()
+
+    def test_connection_is_reused_across_sends(self):
+        with self.settings(EMAIL_PORT=self.server.port):
+            for i in range(3):
+                mail.send_mail(f"s{i}", "body", "from@example.com", ["to@example.com"])
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_breaker_opens_defers_and_retries(self):
+        down_port = _free_port()
+        with self.settings(EMAIL_PORT=down_port, EMAIL_CIRCUIT_RESET_SECONDS=3600):
+            for _ in range(2):
+                with self.assertRaises(OSError):
+                    mail.send_mail("down", "body", "from@example.com", ["to@example.com"])
+            with self.assertRaises(MailCircuitOpen):
+                mail.send_mail("deferred", "body", "from@example.com", ["to@example.com"])
+            # من يعيد المحاولة بنفسه لا تُنشأ له نسخة مؤجلة
+            with self.assertRaises(MailCircuitOpen):
+                PooledSMTPBackend(defer=False).send_messages([mail.EmailMessage("x", "y", "a@b.c", ["d@e.f"])])
+
+        self.assertEqual(DeferredEmail.objects.count(), 1)
+        with self.settings(EMAIL_PORT=self.server.port):
+            self.assertEqual(retry_deferred(), (1, 0))
+        self.assertIsNotNone(DeferredEmail.objects.get().sent_at)
+        self.assertIn(b"Subject: deferred", self.server.messages[0])
+
+
+    def test_recipient_rejections_do_not_open_the_breaker(self):
+        with self.settings(EMAIL_PORT=self.server.port):
+            for _ in range(3):
+                with self.assertRaises(smtplib.SMTPRecipientsRefused):
+                    mail.send_mail("bad", "body", "from@example.com", ["bad@example.com"])
+            messages = [
+                mail.EmailMessage("rejected", "y", "from@example.com", ["bad@example.com"]),
+                mail.EmailMessage("delivered", "y", "from@example.com", ["good@example.com"]),
+            ]
+            with self.assertRaises(smtplib.SMTPRecipientsRefused):
+                mail.get_connection().send_messages(messages)
+            self.assertEqual(mail.get_connection(fail_silently=True).send_messages(messages), 1)
+            self.assertEqual(PooledSMTPBackend().breaker.state, "closed")
+
+        self.assertEqual(len(self.server.messages), 2)
+        self.assertIn(b"Subject: delivered", self.server.messages[0])
+        self.assertEqual(DeferredEmail.objects.count(), 0)
+
+        for i, rcpt in enumerate(["bad@example.com", "bad@example.com", "good@example.com"]):
+            DeferredEmail.objects.create(from_email="a@b.c", recipients=[rcpt], subject=f"d{i}", raw_message=b"x")
+        reset_breakers()
+        with self.settings(EMAIL_PORT=self.server.port, EMAIL_CIRCUIT_RESET_SECONDS=3600):
+            self.assertEqual(retry_deferred(), (1, 2))
+        self.assertEqual(PooledSMTPBackend().breaker.state, "closed")
+
+    def test_retry_sends_outside_the_claim_transaction(self):
+        for i in range(2):
+            DeferredEmail.objects.create(from_email="a@b.c", recipients=["d@e.f"], subject=f"m{i}", raw_message=b"x")
+        calls = []
+
+        def send_raw(backend, from_email, recipients, raw):
+            calls.append(raw)
+            if len(calls) == 2:
+                raise SystemExit("worker killed")
+
+        with mock.patch.object(PooledSMTPBackend, "send_raw", send_raw), self.assertRaises(SystemExit):
+            retry_deferred()
+
+        first, second = DeferredEmail.objects.order_by("pk")
+        self.assertIsNotNone(first.sent_at)
+        # المحجوزة لا تُلتقط مجددًا قبل انتهاء مهلة الحجز
+        self.assertIsNone(second.sent_at)
+        self.assertGreater(second.next_attempt_at, timezone.now())
+        with self.settings(EMAIL_PORT=self.server.port):
+            self.assertEqual(retry_deferred(), (0, 0))
+
+
+class TransactionalEmailTests(TestCase):
+    def test_precompiled_output_matches_template_engine(self):
+        user = User(email="mail@example.com", full_name="<b>سارة & علي</b>")
+        ctx = {"user": user, "code": "012345", "ttl_minutes": 10, "year": 2026}
+        text, html = render_email("otp", ctx)
+        self.assertEqual(text, render_to_string("accounts/emails/otp.txt", ctx))
+        self.assertEqual(html, render_to_string("accounts/emails/otp.html", ctx))
+        self.assertIn("&lt;b&gt;", html)
+
+    def test_registered_templates_skip_the_engine(self):
+        for names in EMAIL_TEMPLATES.values():
+            for name in names:
+                self.assertIsInstance(get_email_template(name), CompiledEmailTemplate)
+
+    def test_inline_css_keeps_media_queries_and_existing_styles_win(self):
+        html = inline_css(
+            "<style>p, .lead { color: red } @media (max-width:600px){.lead{font-size:12px}}</style>"
+            '<p class="lead" style="margin:0">x</p><td>y</td>'
+        )
+        self.assertIn('<p class="lead" style="color: red;margin:0">', html)
+        self.assertIn("@media (max-width:600px){.lead{font-size:12px}}", html)
+        self.assertIn("<td>y</td>", html)
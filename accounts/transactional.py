@@ -0,0 +1,142 @@
+"""قوالب البريد التشغيلي (OTP / تواصل معنا) مترجمة مسبقًا.
+
+- عند أول استخدام (ويُستدعى precompile_emails في AccountsConfig.ready) يُقرأ مصدر
+  القالب مرة واحدة، وتُدمج قواعد <style> البسيطة داخل style="" (البريد لا يدعم
+  CSS الخارجي جيدًا)، ثم يُقسم إلى أجزاء ثابتة + متغيرات {{ ... }}
+- الإرسال بعد ذلك: حل المتغيرات (بنفس فلاتر Django والـ autoescape) ودمجها مع
+  الأجزاء الثابتة، بدون محرك القوالب الكامل
+- القوالب التي تحتوي وسوم {% ... %} تبقى على المسار العادي للمحرك
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+from django.core.mail import EmailMultiAlternatives
+from django.template import Context, engines
+from django.template.base import FilterExpression, Lexer, Parser, TokenType, render_value_in_context
+
+# الاسم -> (قالب النص، قالب HTML)
+EMAIL_TEMPLATES: dict[str, tuple[str, str]] = {
+    "otp": ("accounts/emails/otp.txt", "accounts/emails/otp.html"),
+    "contact_message": ("pages/emails/contact_message.txt", "pages/emails/contact_message.html"),
+}
+
+_STYLE_BLOCK_RE = re.compile(r"<style\b[^>]*>(.*?)</style\s*>", re.IGNORECASE | re.DOTALL)
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_AT_RULE_RE = re.compile(r"@[^{;]+\{(?:[^{}]*\{[^{}]*\})*[^{}]*\}")
+_RULE_RE = re.compile(r"([^{}@]+)\{([^{}]*)\}")
+_START_TAG_RE = re.compile(r"<([a-zA-Z][a-zA-Z0-9]*)(\s[^<>]*?)?(/?)>")
+_ATTR_RE = r'\b{}\s*=\s*"([^"]*)"'
+_SIMPLE_SELECTOR_RE = re.compile(r"^([a-zA-Z][a-zA-Z0-9]*)?(?:#([\w-]+))?((?:\.[\w-]+)*)$")
+
+
+def _parse_rules(css: str) -> tuple[list[tuple[tuple, str]], str]:
+    """يفصل القواعد البسيطة (وسم/‎.class/‎#id) عن الباقي (@media ومحددات مركبة) الذي يبقى في <style>."""
+    css = _CSS_COMMENT_RE.sub("", css)
+    # @media وغيرها: لا يمكن دمجها في style="" فتبقى كما هي
+    leftover = _AT_RULE_RE.findall(css)
+    rules = []
+    for match in _RULE_RE.finditer(_AT_RULE_RE.sub("", css)):
+        declarations = match.group(2).strip().rstrip(";")
+        kept = []
+        for selector in (s.strip() for s in match.group(1).split(",")):
+            parsed = _SIMPLE_SELECTOR_RE.match(selector)
+            if parsed and selector:
+                tag, id_, classes = parsed.groups()
+                rules.append(((tag and tag.lower(), id_, frozenset(c for c in classes.split(".") if c)), declarations))
+            else:
+                kept.append(selector)
+        if kept:
+            leftover.append(f"{', '.join(kept)}{{{match.group(2)}}}")
+    return rules, "\n".join(leftover)
+
+
+def inline_css(html: str) -> str:
+    """دمج قواعد <style> البسيطة في style="" لكل عنصر مطابق (الـ style الموجود له الأولوية)."""
+    rules: list = []
+
+    def _collect(match: re.Match) -> str:
+        parsed, leftover = _parse_rules(match.group(1))
+        rules.extend(parsed)
+        return f"<style>{leftover}</style>" if leftover.strip() else ""
+
+    html = _STYLE_BLOCK_RE.sub(_collect, html)
+    if not rules:
+        return html
+
+    def _apply(match: re.Match) -> str:
+        tag, attrs, closing = match.group(1), match.group(2) or "", match.group(3)
+        id_match = re.search(_ATTR_RE.format("id"), attrs)
+        class_match = re.search(_ATTR_RE.format("class"), attrs)
+        classes = set(class_match.group(1).split()) if class_match else set()
+        declarations = list(dict.fromkeys(
+            decl
+            for (r_tag, r_id, r_classes), decl in rules
+            if (r_tag is None or r_tag == tag.lower())
+            and (r_id is None or (id_match and id_match.group(1) == r_id))
+            and r_classes <= classes
+        ))
+        if not declarations:
+            return match.group(0)
+        style_match = re.search(_ATTR_RE.format("style"), attrs)
+        if style_match:
+            merged = ";".join([*declarations, style_match.group(1)])
+            attrs = attrs[: style_match.start(1)] + merged + attrs[style_match.end(1) :]
+        else:
+            attrs = f'{attrs} style="{";".join(declarations)}"'
+        return f"<{tag}{attrs}{closing}>"
+
+    return _START_TAG_RE.sub(_apply, html)
+
+
+class CompiledEmailTemplate:
+    def __init__(self, parts: list):
+        self.parts = parts
+
+    def render(self, context: dict) -> str:
+        ctx = Context(context, autoescape=True)
+        return "".join(
+            part if isinstance(part, str) else render_value_in_context(part.resolve(ctx), ctx) for part in self.parts
+        )
+
+
+@lru_cache(maxsize=None)
+def get_email_template(template_name: str):
+    """قالب مترجم مسبقًا، أو قالب Django العادي إذا احتوى وسوم {% %}."""
+    engine = engines["django"]
+    template = engine.get_template(template_name)
+    source = template.template.source
+    if template_name.endswith(".html"):
+        source = inline_css(source)
+
+    parser = Parser([], libraries=engine.engine.template_libraries, builtins=engine.engine.template_builtins)
+    parts: list = []
+    for token in Lexer(source).tokenize():
+        if token.token_type == TokenType.TEXT:
+            parts.append(token.contents)
+        elif token.token_type == TokenType.VAR:
+            parts.append(FilterExpression(token.contents, parser))
+        elif token.token_type == TokenType.BLOCK:
+            return template
+    return CompiledEmailTemplate(parts)
+
+
+def precompile_emails() -> None:
+    for names in EMAIL_TEMPLATES.values():
+        for template_name in names:
+            get_email_template(template_name)
+
+
+def render_email(name: str, context: dict) -> tuple[str, str]:
+    """(النص، HTML) لرسالة مسجلة في EMAIL_TEMPLATES."""
+    text_name, html_name = EMAIL_TEMPLATES[name]
+    return get_email_template(text_name).render(context), get_email_template(html_name).render(context)
+
+
+def build_email(name: str, context: dict, *, subject: str, to: list[str], **kwargs) -> EmailMultiAlternatives:
+    text_body, html_body = render_email(name, context)
+    email = EmailMultiAlternatives(subject=subject, body=text_body, to=to, **kwargs)
+    email.attach_alternative(html_body, "text/html")
+    return email
@@ -11,4 +11,6 @@ urlpatterns = [
     path("resend-otp/", views.resend_otp, name="resend_otp"),
     path("login/", views.login_view, name="login"),
     path("logout/", views.logout_view, name="logout"),
+    path("metrics/hashing/", views.hashing_metrics, name="hashing_metrics"),
+    path("metrics/sessions/", views.session_metrics_view, name="session_metrics"),
 ]
@@ -0,0 +1,64 @@
+"""كاش قصير للمستخدم المسجل دخوله بدل SELECT على accounts_user في كل طلب.
+
+- المفتاح: auth:user:<id> والقيمة (session auth hash, user)
+- لا يُستخدم الكائن المخزن إلا إذا طابق hash الجلسة المخزن hash الجلسة الحالية،
+  والإدخال لا يُنشأ إلا بعد مرور المستخدم بالتحقق الكامل لـ Django (get_user)
+- أي User.save()/حذف يبطل الإدخال فورًا (accounts.signals)، لذلك تغيّر الدور أو
+  إيقاف الحساب أو تغيير كلمة المرور يسري من الطلب التالي مباشرة
+- التحديثات الجماعية (QuerySet.update) يجب أن تستدعي invalidate_cached_users
+- يعمل فقط مع كاش مشترك (SHARED_CACHE / Redis): مع LocMemCache يبطل الحفظ الإدخال في
+  عملية الكاتب فقط، فيبقى مستخدم موقوف أو دور قديم في باقي الـ workers حتى انتهاء
+  المدة؛ بدونه السلوك مطابق لـ AuthenticationMiddleware (SELECT في كل طلب)
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+
+def _cache_key(user_id) -> str:
+    return f"auth:user:{user_id}"
+
+
+def _ttl() -> int:
+    if not getattr(settings, "SHARED_CACHE", False):
+        return 0
+    return int(getattr(settings, "AUTH_USER_CACHE_TTL", 60))
+
+
+def user_cache_enabled() -> bool:
+    return _ttl() > 0
+
+
+def invalidate_cached_users(user_ids) -> None:
+    cache.delete_many([_cache_key(uid) for uid in user_ids])
+
+
+def get_cached_user(request):
+    """بديل django.contrib.auth.get_user يقرأ المستخدم من الكاش أولًا."""
+    session = request.session
+    user_id = session.get(SESSION_KEY)
+    session_hash = session.get(HASH_SESSION_KEY)
+    backend_path = session.get(BACKEND_SESSION_KEY)
+    if not (user_id and session_hash and backend_path in settings.AUTHENTICATION_BACKENDS) or _ttl() <= 0:
+        return auth.get_user(request)
+
+    key = _cache_key(user_id)
+    cached = cache.get(key)
+    if cached is not None:
+        cached_hash, user = cached
+        if constant_time_compare(cached_hash, session_hash):
+            user.backend = backend_path
+            return user
+
+    # المسار الكامل: SELECT + التحقق من hash الجلسة (قد يفرغ الجلسة)
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        current_hash = request.session.get(HASH_SESSION_KEY)
+        if current_hash:
+            cache.set(key, (current_hash, user), timeout=_ttl())
+    return user
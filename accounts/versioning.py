@@ -0,0 +1,40 @@
+"""أرقام إصدار في الـ cache المشترك لإبطال نسخ محفوظة في ذاكرة العملية.
+
+- الوحدة تحفظ القيمة في ذاكرتها مع رقم الإصدار الذي بُنيت عليه، وتقارنه مع
+  current_version(key) في كل قراءة (بدون استعلام قاعدة بيانات)
+- bump_version(key) يرفع الإصدار فتعيد كل العمليات (gunicorn workers / خوادم
+  متعددة) البناء عند أول قراءة بعده
+- بدون كاش مشترك (SHARED_CACHE) لا يصل الرفع إلا لعملية الكاتب، لذلك يُضاف للإصدار
+  رقم نافذة زمنية (LOCAL_VERSION_FALLBACK_TTL ثانية): تعيد كل عملية البناء مرة كل
+  نافذة على الأكثر، فيبقى أقصى تأخر للتعديل هو هذه المدة
+- المستخدمون: accounts.permissions (خريطة صلاحيات الأدوار) و pages.sitesettings
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def current_version(key: str) -> int | tuple[int, int]:
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    if getattr(settings, "SHARED_CACHE", False):
+        return version
+    ttl = int(getattr(settings, "LOCAL_VERSION_FALLBACK_TTL", 5))
+    if ttl <= 0:
+        # بدون نسخة محلية: كل قراءة تعيد البناء
+        return version, time.monotonic_ns()
+    return version, int(time.monotonic() // ttl)
+
+
+def bump_version(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        # المفتاح غير موجود (أول رفع أو أُفرغ الـ cache)
+        cache.set(key, 1, timeout=None)
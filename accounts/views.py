@@ -4,12 +4,16 @@ import logging
 
 from django.contrib import messages
 from django.contrib.auth import login, logout
-from django.core.mail import EmailMultiAlternatives
+from django.contrib.auth.decorators import user_passes_test
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import redirect, render
-from django.template.loader import render_to_string
 from django.urls import NoReverseMatch, reverse
 from django.utils import timezone
 
+from .hashing import get_hashing_service
+from .middleware import session_metrics
+from .ratelimit import ratelimit
 from .forms import (
     EmailLoginForm,
     IndividualSignupForm,
@@ -17,11 +21,19 @@ from .forms import (
     OTPVerifyForm,
 )
 from .models import EmailOTP, Role, User
+from .otp import OTPResult, get_otp_store
 
 logger = logging.getLogger(__name__)
 
 PENDING_USER_SESSION_KEY = "pending_activation_user_id"
 
+OTP_ERROR_MESSAGES = {
+    OTPResult.MISSING: "لا يوجد رمز تحقق صالح. اضغط إعادة إرسال للحصول على رمز جديد.",
+    OTPResult.EXPIRED: "انتهت صلاحية الرمز. اضغط إعادة إرسال للحصول على رمز جديد.",
+    OTPResult.LOCKED: "تجاوزت عدد المحاولات. اضغط إعادة إرسال للحصول على رمز جديد.",
+    OTPResult.INVALID: "رمز غير صحيح.",
+}
+
 
 def _safe_redirect_landing():
     """
@@ -72,11 +84,15 @@ def register_individual(request):
     if request.method == "POST":
         form = IndividualSignupForm(request.POST)
         if form.is_valid():
-            user = form.save()
-            _send_activation_otp(request, user)
-            request.session[PENDING_USER_SESSION_KEY] = user.id
-            messages.success(request, "تم إنشاء الحساب ✅ أرسلنا رمز التحقق إلى بريدك الإلكتروني.")
-            return redirect("accounts:verify_otp")
+            with transaction.atomic():
+                # None: خسر سباق تسجيل متزامن وأصبحت الأخطاء على حقول النموذج
+                user = form.save()
+                if user is not None:
+                    _queue_activation_otp(user)
+            if user is not None:
+                request.session[PENDING_USER_SESSION_KEY] = user.id
+                messages.success(request, "تم إنشاء الحساب ✅ أرسلنا رمز التحقق إلى بريدك الإلكتروني.")
+                return redirect("accounts:verify_otp")
         messages.error(request, "تحقق من البيانات المدخلة.")
     else:
         form = IndividualSignupForm()
@@ -92,11 +108,15 @@ def register_organization(request):
     if request.method == "POST":
         form = OrganizationSignupForm(request.POST)
         if form.is_valid():
-            user = form.save()
-            _send_activation_otp(request, user)
-            request.session[PENDING_USER_SESSION_KEY] = user.id
-            messages.success(request, "تم إنشاء حساب الجهة ✅ أرسلنا رمز التحقق إلى بريدك الإلكتروني.")
-            return redirect("accounts:verify_otp")
+            with transaction.atomic():
+                # None: خسر سباق تسجيل متزامن وأصبحت الأخطاء على حقول النموذج
+                user = form.save()
+                if user is not None:
+                    _queue_activation_otp(user)
+            if user is not None:
+                request.session[PENDING_USER_SESSION_KEY] = user.id
+                messages.success(request, "تم إنشاء حساب الجهة ✅ أرسلنا رمز التحقق إلى بريدك الإلكتروني.")
+                return redirect("accounts:verify_otp")
         messages.error(request, "تحقق من البيانات المدخلة.")
     else:
         form = OrganizationSignupForm()
@@ -108,6 +128,8 @@ def register_organization(request):
     )
 
 
+@ratelimit("verify_otp", key="ip", rate="30/10m")
+@ratelimit("verify_otp", key=f"session:{PENDING_USER_SESSION_KEY}", rate="10/10m")
 def verify_otp(request):
     user_id = request.session.get(PENDING_USER_SESSION_KEY)
     if not user_id:
@@ -126,33 +148,12 @@ def verify_otp(request):
         if form.is_valid():
             code = form.cleaned_data["code"]
 
-            otp = (
-                EmailOTP.objects.filter(user=user, is_used=False)
-                .order_by("-created_at")
-                .first()
-            )
-            if not otp:
-                messages.error(request, "لا يوجد رمز تحقق صالح. اضغط إعادة إرسال للحصول على رمز جديد.")
-                return redirect("accounts:verify_otp")
-
-            if otp.is_expired():
-                messages.error(request, "انتهت صلاحية الرمز. اضغط إعادة إرسال للحصول على رمز جديد.")
-                return redirect("accounts:verify_otp")
-
-            if otp.attempts >= 5:
-                messages.error(request, "تجاوزت عدد المحاولات. اضغط إعادة إرسال للحصول على رمز جديد.")
-                return redirect("accounts:verify_otp")
-
-            if otp.code != code:
-                otp.attempts += 1
-                otp.save(update_fields=["attempts"])
-                messages.error(request, "رمز غير صحيح.")
+            result = get_otp_store().verify(user, code)
+            if result is not OTPResult.OK:
+                messages.error(request, OTP_ERROR_MESSAGES[result])
                 return redirect("accounts:verify_otp")
 
             # نجاح
-            otp.is_used = True
-            otp.save(update_fields=["is_used"])
-
             user.is_active = True
             # ملاحظة: لا نرفع is_staff هنا لأن الأفراد/الجهات ليسوا واجهة إدارة
             user.save(update_fields=["is_active"])
@@ -178,6 +179,8 @@ def verify_otp(request):
     return render(request, "accounts/verify_otp.html", {"form": form, "user": user})
 
 
+@ratelimit("resend_otp", key="ip", rate="10/h", methods=("GET", "POST"))
+@ratelimit("resend_otp", key=f"session:{PENDING_USER_SESSION_KEY}", rate="5/h", methods=("GET", "POST"))
 def resend_otp(request):
     """إعادة إرسال رمز التفعيل للحساب المعلق في الجلسة.
     حماية بسيطة: حد أدنى 60 ثانية بين كل إرسال.
@@ -201,12 +204,14 @@ def resend_otp(request):
         messages.error(request, "لم نتمكن من العثور على الحساب.")
         return redirect("accounts:login")
 
-    _send_activation_otp(request, user)
+    _queue_activation_otp(user)
     request.session[cooldown_key] = now_ts
     messages.success(request, "تم إرسال رمز جديد إلى بريدك الإلكتروني.")
     return redirect("accounts:verify_otp")
 
 
+@ratelimit("login", key="ip", rate="30/5m")
+@ratelimit("login", key="post:identifier", rate="10/15m")
 def login_view(request):
     if request.method == "POST":
         form = EmailLoginForm(request.POST)
@@ -248,29 +253,22 @@ def logout_view(request):
     return _safe_redirect_landing()
 
 
-def _send_activation_otp(request, user: User):
-    """إرسال OTP التفعيل عبر البريد مع تسجيل الأخطاء."""
-    try:
-        otp = EmailOTP.create_for_user(user)
-
-        ctx = {
-            "user": user,
-            "code": otp.code,
-            "ttl_minutes": 10,
-            "year": timezone.now().year,
-        }
-        subject = "رمز تفعيل حسابك | بوابة ثقف"
-        text_body = render_to_string("accounts/emails/otp.txt", ctx)
-        html_body = render_to_string("accounts/emails/otp.html", ctx)
-
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_body,
-            to=[user.email],
-        )
-        email.attach_alternative(html_body, "text/html")
-        email.send(fail_silently=False)
-
-    except Exception:
-        logger.exception("Failed to send activation OTP")
-        messages.warning(request, "تم إنشاء الحساب ✅ لكن تعذر إرسال رمز التفعيل حاليًا. جرّب إعادة الإرسال.")
+@user_passes_test(lambda u: u.is_authenticated and u.is_system_admin)
+def hashing_metrics(request):
+    """مؤشرات طابور تجزئة كلمات المرور لهذه العملية (زمن الانتظار/التنفيذ، المرفوض)."""
+    return JsonResponse(get_hashing_service().stats())
+
+
+@user_passes_test(lambda u: u.is_authenticated and u.is_system_admin)
+def session_metrics_view(request):
+    """عدد قراءات/كتابات الجلسة لكل طلب في هذه العملية."""
+    return JsonResponse(session_metrics.snapshot())
+
+
+def _queue_activation_otp(user: User) -> EmailOTP:
+    """إضافة OTP التفعيل إلى صندوق الصادر.
+
+    لا يوجد أي اتصال SMTP هنا: الإرسال يتم عبر العامل `deliver_otp_emails`،
+    لذلك يعود الطلب فورًا حتى لو كان خادم البريد بطيئًا أو متوقفًا.
+    """
+    return get_otp_store().issue(user)
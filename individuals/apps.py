@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class IndividualsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'individuals'
+
+    def ready(self):
+        # نماذج عدّادات لوحة الفرد تُحل مرة واحدة (بدل البحث عنها في كل زيارة)
+        from .metrics import resolve_metrics
+
+        resolve_metrics()
@@ -0,0 +1,129 @@
+"""عدّادات لوحة الفرد (الدورات / الشهادات).
+
+- النماذج تُحل مرة واحدة عند بدء العملية (IndividualsConfig.ready): لكل عدّاد أول
+  نموذج موجود من المرشحين في METRIC_CANDIDATES ويحتوي حقل المستخدم المذكور
+- كل العدّادات لمستخدم تُجلب باستعلام واحد (subquery لكل عدّاد على صف المستخدم)
+  وتُخزن في الكاش لكل مستخدم؛ حفظ/حذف سجل في نموذج عدّاد يبطل كاش صاحبه (والمالك
+  السابق إذا نُقل السجل إلى مستخدم آخر)
+- التخزين فقط مع كاش مشترك (SHARED_CACHE): مع LocMemCache لا يصل الإبطال إلا لعملية
+  الكاتب، فتُحسب العدّادات باستعلامها الواحد في كل زيارة
+- العدّاد الذي لم يُحل نموذجه (تطبيق غير مثبت بعد) قيمته 0 دون أي استعلام
+"""
+
+from __future__ import annotations
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_init, post_save
+
+CACHE_KEY = "individuals:dashboard_metrics:{user_id}"
+CACHE_TIMEOUT = 300
+
+# اسم العدّاد -> [(النموذج، حقل المستخدم)] بالترتيب؛ يُستخدم أول مرشح موجود
+METRIC_CANDIDATES: dict[str, list[tuple[str, str]]] = {
+    "courses": [
+        ("courses.Enrollment", "user"),
+        ("courses.Registration", "user"),
+        ("courses.CourseRegistration", "user"),
+        ("courses.Participant", "user"),
+    ],
+    "certificates": [
+        ("certificates.Certificate", "user"),
+        ("certificates.UserCertificate", "user"),
+        ("certificates.IssuedCertificate", "user"),
+    ],
+}
+
+# اسم العدّاد -> (النموذج، حقل المستخدم) بعد الحل
+_resolved: dict[str, tuple] = {}
+
+
+def _resolve(candidates: list[tuple[str, str]]):
+    for label, user_field in candidates:
+        try:
+            model = apps.get_model(label)
+            model._meta.get_field(user_field)
+        except (LookupError, ValueError, FieldDoesNotExist):
+            continue
+        return model, user_field
+    return None
+
+
+def resolve_metrics(candidates: dict[str, list[tuple[str, str]]] | None = None) -> dict[str, tuple]:
+    """يحل نماذج العدّادات ويربط إشارات الإبطال. يُستدعى من IndividualsConfig.ready."""
+    _resolved.clear()
+    for name, options in (candidates or METRIC_CANDIDATES).items():
+        found = _resolve(options)
+        if found is None:
+            continue
+        _resolved[name] = found
+        model, _ = found
+        label = model._meta.label
+        post_init.connect(_remember_owner, sender=model, weak=False, dispatch_uid=f"dashboard_metrics:{label}:init")
+        post_save.connect(_invalidate, sender=model, weak=False, dispatch_uid=f"dashboard_metrics:{label}:save")
+        post_delete.connect(_invalidate, sender=model, weak=False, dispatch_uid=f"dashboard_metrics:{label}:delete")
+    return dict(_resolved)
+
+
+def _user_field(sender):
+    for model, user_field in _resolved.values():
+        if model is sender:
+            return user_field
+    return None
+
+
+def _remember_owner(sender, instance, **kwargs):
+    """المالك كما حُمّل: إذا نُقل السجل لمستخدم آخر يُبطل كاش الاثنين."""
+    user_field = _user_field(sender)
+    if user_field is not None:
+        instance.__dict__["_dashboard_owner_id"] = instance.__dict__.get(f"{user_field}_id")
+
+
+def _invalidate(sender, instance, **kwargs):
+    user_field = _user_field(sender)
+    if user_field is None:
+        return
+    current = getattr(instance, f"{user_field}_id", None)
+    keys = {CACHE_KEY.format(user_id=uid) for uid in (instance.__dict__.get("_dashboard_owner_id"), current) if uid}
+    instance.__dict__["_dashboard_owner_id"] = current
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _cache_enabled() -> bool:
+    return getattr(settings, "SHARED_CACHE", False)
+
+
+def get_dashboard_counts(user_id: int) -> dict[str, int]:
+    counts = {name: 0 for name in METRIC_CANDIDATES}
+    if not _resolved:
+        return counts
+    key = CACHE_KEY.format(user_id=user_id)
+    cached = cache.get(key) if _cache_enabled() else None
+    if cached is not None:
+        return {**counts, **cached}
+
+    annotations = {
+        name: Coalesce(
+            Subquery(
+                model._default_manager.filter(**{user_field: OuterRef("pk")})
+                .order_by()
+                .values(user_field)
+                .annotate(n=Count("pk"))
+                .values("n")[:1]
+            ),
+            0,
+        )
+        for name, (model, user_field) in _resolved.items()
+    }
+    row = get_user_model()._default_manager.filter(pk=user_id).values(**annotations).first() or {}
+    values = {name: row.get(name, 0) for name in _resolved}
+    if _cache_enabled():
+        cache.set(key, values, CACHE_TIMEOUT)
+    return {**counts, **values}
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:08
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('individuals', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='individualprofile',
+            name='id_number',
+            field=models.CharField(error_messages={'unique': 'هذه الهوية/الإقامة مسجلة مسبقًا.'}, max_length=20, unique=True, validators=[django.core.validators.RegexValidator(message='رقم الهوية/الإقامة يجب أن يكون أرقام فقط (10 إلى 20 رقم).', regex='^\\d{10,20}$')], verbose_name='الهوية الوطنية / الإقامة'),
+        ),
+        migrations.AlterField(
+            model_name='individualprofile',
+            name='user',
+            field=models.OneToOneField(error_messages={'unique': 'لهذا المستخدم ملف فرد مسبقًا.'}, on_delete=django.db.models.deletion.CASCADE, related_name='individual_profile', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم'),
+        ),
+    ]
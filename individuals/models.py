@@ -3,7 +3,7 @@ from __future__ import annotations
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
 from django.db.models import Q
 
 
@@ -13,12 +13,71 @@ id_number_validator = RegexValidator(
 )
 
 
+class IndividualProfileQuerySet(models.QuerySet):
+    def bulk_create_validated(self, profiles, batch_size: int = 1000) -> list:
+        """إنشاء دفعة كبيرة بنفس ضمانات save(): تحقق سريع لكل سجل + كشف التكرار داخل
+        الدفعة في الذاكرة، ثم bulk_create داخل معاملة واحدة.
+
+        الأخطاء تُجمع في ValidationError واحد بمفاتيح "<رقم السجل>.<الحقل>".
+        """
+        profiles = list(profiles)
+        errors: dict[str, list] = {}
+        seen: dict[str, dict] = {"id_number": {}, "user": {}}
+        for index, profile in enumerate(profiles):
+            try:
+                profile.validate_fast()
+            except ValidationError as exc:
+                for field, messages in exc.message_dict.items():
+                    errors[f"{index}.{field}"] = messages
+                continue
+            for field, value in (("id_number", profile.id_number), ("user", profile.user_id)):
+                if value in seen[field]:
+                    errors[f"{index}.{field}"] = [f"مكرر في الدفعة (السجل {seen[field][value]})."]
+                else:
+                    seen[field][value] = index
+        if errors:
+            raise ValidationError(errors)
+
+        try:
+            with transaction.atomic(using=self.db):
+                created = self.bulk_create(profiles, batch_size=batch_size)
+        except IntegrityError:
+            errors = self._conflicts(profiles)
+            if not errors:
+                raise
+            raise ValidationError(errors) from None
+
+        # bulk_create لا يرسل post_save: إبطال ETag لوحات أصحاب الملفات يدويًا
+        # (individuals.IndividualProfile ضمن CONDITIONAL_USER_TAG_MODELS)
+        from pages.cache import invalidate_page_cache
+
+        tags = [f"user:{profile.user_id}" for profile in created]
+        transaction.on_commit(lambda: invalidate_page_cache(*tags), using=self.db)
+        return created
+
+    def _conflicts(self, profiles: list) -> dict[str, list]:
+        """تحديد السجلات المتعارضة مع القاعدة (مسار الفشل فقط: استعلامان)."""
+        taken_ids = set(self.filter(id_number__in=[p.id_number for p in profiles]).values_list("id_number", flat=True))
+        taken_users = set(self.filter(user_id__in=[p.user_id for p in profiles]).values_list("user_id", flat=True))
+        errors = {}
+        for index, profile in enumerate(profiles):
+            if profile.id_number in taken_ids:
+                errors[f"{index}.id_number"] = [IndividualProfile.DUPLICATE_ID_NUMBER]
+            if profile.user_id in taken_users:
+                errors[f"{index}.user"] = [IndividualProfile.DUPLICATE_USER]
+        return errors
+
+
 class IndividualProfile(models.Model):
+    DUPLICATE_ID_NUMBER = "هذه الهوية/الإقامة مسجلة مسبقًا."
+    DUPLICATE_USER = "لهذا المستخدم ملف فرد مسبقًا."
+
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="individual_profile",
         verbose_name="المستخدم",
+        error_messages={"unique": DUPLICATE_USER},
     )
 
     id_number = models.CharField(
@@ -26,10 +85,13 @@ class IndividualProfile(models.Model):
         max_length=20,
         unique=True,
         validators=[id_number_validator],
+        error_messages={"unique": DUPLICATE_ID_NUMBER},
     )
 
     created_at = models.DateTimeField("تاريخ الإنشاء", auto_now_add=True)
 
+    objects = IndividualProfileQuerySet.as_manager()
+
     class Meta:
         verbose_name = "ملف فرد"
         verbose_name_plural = "ملفات الأفراد"
@@ -53,9 +115,30 @@ class IndividualProfile(models.Model):
         if not self.id_number:
             raise ValidationError({"id_number": "رقم الهوية/الإقامة مطلوب."})
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        return super().save(*args, **kwargs)
+    def validate_fast(self):
+        """التطبيع وفحوص الحقول في الذاكرة فقط (بدون استعلامات).
+
+        يُستثنى حقل user وحده: تحقق العلاقة يستعلم عن وجود المستخدم ويضمنه قيد FK.
+        فحوص التفرد (validate_unique) والقيود (validate_constraints) لا تمر عبر
+        clean_fields أصلًا وتضمنها القاعدة؛ save() تعيد IntegrityError كأخطاء حقول.
+        """
+        self.clean()
+        self.clean_fields(exclude=["user"])
+
+    def save(self, *args, full_validation: bool = False, **kwargs):
+        if full_validation:
+            self.full_clean()
+            return super().save(*args, **kwargs)
+
+        self.validate_fast()
+        try:
+            # savepoint: فشل القيد لا يفسد المعاملة الخارجية (مثل معاملة التسجيل)
+            with transaction.atomic(using=kwargs.get("using") or router.db_for_write(type(self), instance=self)):
+                return super().save(*args, **kwargs)
+        except IntegrityError:
+            # مسار الفشل فقط: التحقق الكامل يحدد الحقل المتعارض
+            self.full_clean()
+            raise
 
     def __str__(self) -> str:
         return f"{self.user.email} ({self.id_number})"
@@ -1,3 +1,140 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import EmailOTP, Role, User
+from pages.cache import tag_versions
+
+from .metrics import get_dashboard_counts, resolve_metrics
+from .models import IndividualProfile
+
+
+@override_settings(SHARED_CACHE=True)
+class IndividualDashboardConditionalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="dash@example.com", password="Str0ngPass!234", role=Role.IND, is_active=True
+        )
+        self.client.force_login(self.user)
+        self.url = reverse("individuals:dashboard")
+
+    def test_revalidation_returns_304_until_user_data_changes(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.user.full_name = "اسم جديد"
+        self.user.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(SHARED_CACHE=True)
+class DashboardMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # نموذج موجود في هذا المشروع يقوم مقام نموذج التسجيل في الدورات
+        resolve_metrics({"courses": [("courses.Enrollment", "user"), ("accounts.EmailOTP", "user")]})
+        self.addCleanup(resolve_metrics)
+        self.user = User.objects.create_user(
+            email="metrics@example.com", password="Str0ngPass!234", role=Role.IND, is_active=True
+        )
+        for _ in range(2):
+            self._add_row()
+
+    def _add_row(self):
+        EmailOTP.objects.create(user=self.user, code="123456", expires_at=timezone.now() + timedelta(minutes=10))
+
+    def test_single_query_then_cached_until_source_rows_change(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_dashboard_counts(self.user.pk), {"courses": 2, "certificates": 0})
+        with self.assertNumQueries(0):
+            get_dashboard_counts(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add_row()
+        self.assertEqual(get_dashboard_counts(self.user.pk)["courses"], 3)
+
+    def test_moving_a_row_invalidates_both_owners(self):
+        other = User.objects.create_user(email="other@example.com", password="Str0ngPass!234", role=Role.IND)
+        self.assertEqual(get_dashboard_counts(self.user.pk)["courses"], 2)
+        self.assertEqual(get_dashboard_counts(other.pk)["courses"], 0)
+
+        row = EmailOTP.objects.filter(user=self.user).first()
+        row.user = other
+        with self.captureOnCommitCallbacks(execute=True):
+            row.save()
+        self.assertEqual(get_dashboard_counts(self.user.pk)["courses"], 1)
+        self.assertEqual(get_dashboard_counts(other.pk)["courses"], 1)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_process_local_cache_is_not_used(self):
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                get_dashboard_counts(self.user.pk)
+
+    def test_unresolved_metrics_cost_no_queries(self):
+        resolve_metrics({"courses": [("courses.Enrollment", "user")]})
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dashboard_counts(self.user.pk), {"courses": 0, "certificates": 0})
+
+
+class IndividualProfileSaveTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(email=f"p{i}@example.com", password="Str0ngPass!234", role=Role.IND)
+            for i in range(3)
+        ]
+
+    def test_save_validates_in_python_without_select_queries(self):
+        profile = IndividualProfile(user=self.users[0], id_number=" 1234567890 ")
+        with CaptureQueriesContext(connection) as ctx:
+            profile.save()
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].lstrip().upper().startswith("SELECT")])
+        self.assertEqual(profile.id_number, "1234567890")
+
+        with self.assertNumQueries(0), self.assertRaises(ValidationError):
+            IndividualProfile(user=self.users[1], id_number="12ab").save()
+
+    def test_integrity_error_is_mapped_to_field_errors(self):
+        IndividualProfile.objects.create(user=self.users[0], id_number="1234567890")
+        with self.assertRaises(ValidationError) as ctx:
+            IndividualProfile.objects.create(user=self.users[1], id_number="1234567890")
+        self.assertEqual(ctx.exception.message_dict["id_number"], [IndividualProfile.DUPLICATE_ID_NUMBER])
+        # الـ savepoint يبقي المعاملة الخارجية صالحة
+        self.assertEqual(IndividualProfile.objects.count(), 1)
+
+    def test_bulk_create_validated(self):
+        IndividualProfile.objects.create(user=self.users[0], id_number="1000000000")
+        with self.assertRaises(ValidationError) as ctx:
+            IndividualProfile.objects.bulk_create_validated(
+                [
+                    IndividualProfile(user=self.users[1], id_number="2000000000"),
+                    IndividualProfile(user=self.users[2], id_number="2000000000"),
+                    IndividualProfile(user=self.users[2], id_number="bad"),
+                ]
+            )
+        self.assertEqual(set(ctx.exception.message_dict), {"1.id_number", "2.id_number"})
+
+        with self.assertRaises(ValidationError) as ctx:
+            IndividualProfile.objects.bulk_create_validated(
+                [IndividualProfile(user=self.users[1], id_number="1000000000")]
+            )
+        self.assertEqual(ctx.exception.message_dict, {"0.id_number": [IndividualProfile.DUPLICATE_ID_NUMBER]})
+
+        before = tag_versions((f"user:{self.users[1].pk}",))
+        with self.captureOnCommitCallbacks(execute=True):
+            created = IndividualProfile.objects.bulk_create_validated(
+                [
+                    IndividualProfile(user=self.users[1], id_number=" 2000000000"),
+                    IndividualProfile(user=self.users[2], id_number="3000000000"),
+                ]
+            )
+        self.assertEqual(len(created), 2)
+        self.assertNotEqual(tag_versions((f"user:{self.users[1].pk}",)), before)
+        self.assertTrue(IndividualProfile.objects.filter(id_number="2000000000").exists())
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ContactMessage, SiteSetting
+from .models import ContactMessage, PlatformCounter, SiteSetting
 
 
 @admin.register(ContactMessage)
@@ -17,3 +17,13 @@ class SiteSettingAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         # يمنع إضافة أكثر من سجل (Singleton)
         return not SiteSetting.objects.exists()
+
+
+@admin.register(PlatformCounter)
+class PlatformCounterAdmin(admin.ModelAdmin):
+    # القيم تُدار عبر الإشارات و reconcile_counters فقط
+    list_display = ("name", "value", "updated_at")
+    readonly_fields = ("name", "value", "updated_at")
+
+    def has_add_permission(self, request):
+        return False
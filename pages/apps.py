@@ -6,3 +6,21 @@ class PagesConfig(AppConfig):
     name = "pages"
     verbose_name = "الصفحات العامة"
 
+    def ready(self):
+        # إبطال نسخة SiteSetting المخزنة في ذاكرة العمليات عند حفظها
+        from . import sitesettings  # noqa: F401
+
+        # إبطال كاش الصفحات العامة عند تغيّر بيانات الدورات/المحتوى
+        from .cache import connect_invalidation_signals
+
+        connect_invalidation_signals()
+
+        # ETag لوحات المستخدم: حفظ بياناته يبطل وسم "user:<id>"
+        from .conditional import connect_user_tag_signals
+
+        connect_user_tag_signals()
+
+        # عدّادات المنصة (الصفحة الرئيسية) تُحدّث تدريجيًا مع حفظ/حذف السجلات المصدر
+        from .counters import connect_counter_signals
+
+        connect_counter_signals()
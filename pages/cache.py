@@ -0,0 +1,119 @@
+"""كاش الصفحات العامة الكاملة (landing / public_courses) للزوار.
+
+- المفتاح يتغير حسب: المسار + اللغة (LocaleMiddleware) + حالة الدخول + إصدارات الوسوم
+- المستخدم المسجل لا يُخدم من الكاش (الهيدر يعرض اسمه)، ولا الزائر الذي لديه
+  رسائل flash معلقة (تُعرض مرة واحدة في base.html)
+- الإبطال بالوسوم: invalidate_page_cache("catalog") يرفع إصدار الوسم فتصبح كل
+  الصفحات الموسومة به قديمة في كل العمليات دون البحث عن مفاتيحها
+- ربط الإبطال بالنماذج: PAGE_CACHE_TAG_MODELS في الإعدادات (يُسجَّل في PagesConfig.ready)
+"""
+
+from __future__ import annotations
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.messages.storage.session import SessionStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+
+TAG_KEY_PREFIX = "pagecache:tag:"
+PAGE_KEY_PREFIX = "pagecache:page:"
+
+
+def _timeout() -> int:
+    return int(getattr(settings, "PAGE_CACHE_TIMEOUT", 600))
+
+
+def invalidate_page_cache(*tags: str) -> None:
+    """إبطال كل الصفحات الموسومة بأي من هذه الوسوم."""
+    for tag in tags:
+        key = f"{TAG_KEY_PREFIX}{tag}"
+        try:
+            cache.incr(key)
+        except ValueError:
+            # لا يوجد إصدار بعد: أي قيمة جديدة تكفي لتغيير المفاتيح
+            cache.set(key, 2, timeout=None)
+
+
+def tag_versions(tags: tuple[str, ...]) -> str:
+    keys = [f"{TAG_KEY_PREFIX}{t}" for t in tags]
+    versions = cache.get_many(keys)
+    return ".".join(str(versions.get(k, 1)) for k in keys)
+
+
+def _has_pending_messages(request) -> bool:
+    if request.COOKIES.get(CookieStorage.cookie_name):
+        return True
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return SessionStorage.session_key in request.session
+    return False
+
+
+def page_cache_key(request, tags: tuple[str, ...]) -> str:
+    auth_state = "auth" if request.user.is_authenticated else "anon"
+    raw = f"{request.get_full_path()}|{translation.get_language()}|{auth_state}|{tag_versions(tags)}"
+    return PAGE_KEY_PREFIX + hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def cache_public_page(*tags: str, timeout: int | None = None):
+    """Decorator لعروض GET العامة. tags: وسوم الإبطال (مثل "catalog" و "cms")."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            cacheable = (
+                getattr(settings, "PAGE_CACHE_ENABLE", True)
+                and request.method in ("GET", "HEAD")
+                and not request.user.is_authenticated
+                and not _has_pending_messages(request)
+            )
+            if not cacheable:
+                return view(request, *args, **kwargs)
+
+            key = page_cache_key(request, tags)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response["X-Page-Cache"] = "HIT"
+            else:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, "render") and callable(response.render):
+                    response = response.render()
+                if response.status_code == 200 and not response.streaming and not response.cookies:
+                    cache.set(key, (response.content, response["Content-Type"]), timeout or _timeout())
+                response["X-Page-Cache"] = "MISS"
+
+            patch_vary_headers(response, ("Cookie", "Accept-Language"))
+            return response
+
+        return wrapped
+
+    return decorator
+
+
+def connect_invalidation_signals() -> None:
+    """ربط حفظ/حذف النماذج المذكورة في PAGE_CACHE_TAG_MODELS بإبطال وسومها.
+
+    النماذج غير الموجودة (تطبيق غير مثبت بعد) تُتجاهل.
+    """
+    from django.apps import apps
+    from django.db.models.signals import post_delete, post_save
+
+    for tag, model_labels in getattr(settings, "PAGE_CACHE_TAG_MODELS", {}).items():
+        for label in model_labels:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError):
+                continue
+
+            def _invalidate(sender, _tag=tag, **kwargs):
+                invalidate_page_cache(_tag)
+
+            post_save.connect(_invalidate, sender=model, weak=False, dispatch_uid=f"pagecache:{tag}:{label}:save")
+            post_delete.connect(_invalidate, sender=model, weak=False, dispatch_uid=f"pagecache:{tag}:{label}:delete")
@@ -0,0 +1,201 @@
+"""ضغط الاستجابات (zstd / brotli / gzip) مع حد أدنى للحجم واستثناءات BREACH.
+
+- التفاوض حسب Accept-Encoding (مع قيم q)، وتفضيل الخادم: zstd ثم br ثم gzip.
+  zstd و br اختياريان: يعملان فقط إذا كانت حزمتا zstandard / brotli مثبتتين
+- لا يُضغط: ما هو أصغر من COMPRESSION_MIN_SIZE، أو ما له Content-Encoding، أو
+  الأنواع غير النصية (صور/خطوط woff2/ملفات مضغوطة...)
+- الاستجابات المتدفقة (StreamingHttpResponse متزامنة أو غير متزامنة) تُضغط قطعة
+  بقطعة مع flush بعد كل قطعة، فلا تُجمع في الذاكرة ولا يتأخر وصولها للعميل
+- BREACH: لا نضغط أي استجابة عُرض فيها رمز CSRF (كوكي csrftoken في الاستجابة) ولا المسارات في
+  COMPRESSION_EXCLUDE_PATHS (نماذج الدخول/التسجيل/OTP في accounts) لأنها تجمع سرًا
+  مع مدخلات المستخدم في نفس الصفحة
+- مستوى الضغط قابل للضبط (المعالج مقابل البايتات): COMPRESSION_GZIP_LEVEL /
+  COMPRESSION_BROTLI_QUALITY / COMPRESSION_ZSTD_LEVEL
+"""
+
+from __future__ import annotations
+
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # اختياري
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # اختياري
+    zstandard = None
+
+_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/xhtml+xml",
+    "application/manifest+json",
+    "image/svg+xml",
+)
+
+_Q_RE = re.compile(r";\s*q\s*=\s*([0-9.]+)")
+
+
+class _GzipCodec:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        # wbits=31: ترويسة gzip كاملة
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+class _BrotliCodec:
+    name = "br"
+
+    def __init__(self, quality: int):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.process(data) + self._obj.finish()
+
+
+class _ZstdCodec:
+    name = "zstd"
+
+    def __init__(self, level: int):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+def available_encodings() -> list[str]:
+    """الترميزات المدعومة بترتيب تفضيل الخادم."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return [e for e in encodings if e in getattr(settings, "COMPRESSION_ENCODINGS", encodings)]
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        coding = item.split(";", 1)[0].strip().lower()
+        if not coding:
+            continue
+        match = _Q_RE.search(item)
+        try:
+            accepted[coding] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            accepted[coding] = 0.0
+    return accepted
+
+
+def negotiate(header: str) -> str | None:
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def new_codec(encoding: str):
+    if encoding == "zstd":
+        return _ZstdCodec(int(getattr(settings, "COMPRESSION_ZSTD_LEVEL", 3)))
+    if encoding == "br":
+        return _BrotliCodec(int(getattr(settings, "COMPRESSION_BROTLI_QUALITY", 5)))
+    return _GzipCodec(int(getattr(settings, "COMPRESSION_GZIP_LEVEL", 6)))
+
+
+class CompressionMiddleware:
+    """يجب أن يأتي مبكرًا في MIDDLEWARE (بعد SecurityMiddleware) حتى يرى الاستجابة النهائية."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def _excluded(self, request, response) -> bool:
+        if not getattr(settings, "COMPRESSION_ENABLE", True):
+            return True
+        if response.has_header("Content-Encoding") or response.status_code in (204, 206, 304):
+            return True
+        content_type = response.get("Content-Type", "").split(";", 1)[0].strip().lower()
+        if not content_type.startswith(_COMPRESSIBLE_TYPES):
+            return True
+        # BREACH: صفحة عُرض فيها رمز CSRF (CsrfViewMiddleware يضع الكوكي كلما استُدعي get_token)
+        if settings.CSRF_COOKIE_NAME in response.cookies:
+            return True
+        return request.path.startswith(tuple(getattr(settings, "COMPRESSION_EXCLUDE_PATHS", ())))
+
+    def process_response(self, request, response):
+        if self._excluded(request, response):
+            return response
+        if not response.streaming and len(response.content) < int(getattr(settings, "COMPRESSION_MIN_SIZE", 860)):
+            return response
+
+        # حتى الاستجابات غير المضغوطة لهذا العميل تختلف حسب Accept-Encoding
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        codec = new_codec(encoding)
+        if response.streaming:
+            if response.is_async:
+                original = response.streaming_content
+
+                async def compressed():
+                    async for chunk in original:
+                        if chunk:
+                            yield codec.chunk(chunk)
+                    yield codec.finish()
+
+                response.streaming_content = compressed()
+            else:
+                original = response.streaming_content
+
+                def compressed():
+                    for chunk in original:
+                        if chunk:
+                            yield codec.chunk(chunk)
+                    yield codec.finish()
+
+                response.streaming_content = compressed()
+            del response["Content-Length"]
+        else:
+            body = codec.finish(response.content)
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response.headers["Content-Length"] = str(len(body))
+
+        # المحتوى تغيّر بايتًا ببايت: ETag القوي يصبح ضعيفًا (مثل GZipMiddleware)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
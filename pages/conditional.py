@@ -0,0 +1,96 @@
+"""طلبات GET المشروطة (ETag / 304) للصفحات العامة ولوحة الفرد.
+
+- الـ ETag يُحسب من إصدارات البيانات فقط (وسوم pages.cache، نفسها التي تدخل في مفتاح
+  cache_public_page) مع المسار واللغة والمستخدم وإصدار النشر، دون عرض الصفحة؛
+  أي قيمة لا تبطل كاش الصفحة لا تدخل في الـ ETag (وإلا يُرسل جسم قديم بـ ETag جديد)
+- يعمل فقط مع كاش مشترك (SHARED_CACHE): مع LocMemCache يرفع الإبطال إصدار الوسم في
+  عملية الكاتب وحدها، فتبقى بقية العمليات ترد 304 لصفحات قديمة
+- إذا طابق If-None-Match يرجع 304 قبل تنفيذ جسم العرض (django.views.decorators.http.condition)
+- وسوم المستخدم: "user:{user_id}" يُبطلها حفظ/حذف النماذج في CONDITIONAL_USER_TAG_MODELS
+- لا ETag إذا كانت هناك رسائل flash معلقة (تُعرض مرة واحدة)
+- لا يُستخدم مع صفحات فيها نماذج CSRF (تواصل معنا / الدخول / التسجيل)
+- Last-Modified لا يُرسل: نفس الرابط يختلف باللغة وحالة الدخول، والتاريخ وحده لا
+  يميّز ذلك (قد يرجع 304 لمحتوى مختلف)، أما الـ ETag فيتضمنها
+"""
+
+from __future__ import annotations
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils import translation
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .cache import _has_pending_messages, invalidate_page_cache, tag_versions
+
+
+def page_etag(request, tags: tuple[str, ...]) -> str | None:
+    if _has_pending_messages(request):
+        return None
+    user = request.user
+    raw = "|".join(
+        [
+            str(getattr(settings, "TEMPLATE_FRAGMENT_CACHE_VERSION", "1")),
+            request.get_full_path(),
+            translation.get_language() or "",
+            str(user.pk) if user.is_authenticated else "anon",
+            tag_versions(tags),
+        ]
+    )
+    return f'W/"{hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def _enabled() -> bool:
+    return getattr(settings, "CONDITIONAL_PAGES_ENABLE", True) and getattr(settings, "SHARED_CACHE", False)
+
+
+def conditional_page(*tags: str):
+    """Decorator لعروض GET. tags: وسوم الإبطال ("user:{user_id}" لوسم المستخدم الحالي، ويُتجاهل للزائر)."""
+
+    def decorator(view):
+        def etag_func(request, *args, **kwargs):
+            # وسم المستخدم لا معنى له للزائر (الـ ETag يتضمن "anon" أصلًا)
+            authenticated = request.user.is_authenticated
+            resolved = tuple(
+                tag.format(user_id=request.user.pk) for tag in tags if authenticated or "{user_id}" not in tag
+            )
+            return page_etag(request, resolved)
+
+        conditioned = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or not _enabled():
+                return view(request, *args, **kwargs)
+            response = conditioned(request, *args, **kwargs)
+            # المتصفح يعيد التحقق في كل تنقل (304 رخيص) بدل عرض نسخة قديمة
+            patch_cache_control(response, no_cache=True, private=request.user.is_authenticated)
+            patch_vary_headers(response, ("Cookie", "Accept-Language"))
+            return response
+
+        return wrapped
+
+    return decorator
+
+
+def connect_user_tag_signals() -> None:
+    """حفظ/حذف بيانات المستخدم يبطل وسم "user:<id>" الخاص به."""
+    from django.apps import apps
+    from django.db.models.signals import post_delete, post_save
+
+    for label in getattr(settings, "CONDITIONAL_USER_TAG_MODELS", ()):
+        try:
+            model = apps.get_model(label)
+        except (LookupError, ValueError):
+            continue
+        user_attr = "pk" if label == settings.AUTH_USER_MODEL else "user_id"
+
+        def _invalidate(sender, instance, _attr=user_attr, **kwargs):
+            user_id = getattr(instance, _attr, None)
+            if user_id is not None:
+                invalidate_page_cache(f"user:{user_id}")
+
+        post_save.connect(_invalidate, sender=model, weak=False, dispatch_uid=f"conditional:user:{label}:save")
+        post_delete.connect(_invalidate, sender=model, weak=False, dispatch_uid=f"conditional:user:{label}:delete")
@@ -0,0 +1,21 @@
+"""سياق التنقل في base.html (مفاتيح fragment cache).
+
+nav_role / nav_active مع اللغة هي كل ما يتغير به شريط التنقل، لذلك تُستخدم
+مفاتيح لـ {% cache %} في base.html: الشريط والتذييل يُعرضان مرة واحدة لكل
+تركيبة ثم يُقرآن من الـ cache
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+
+
+def navigation(request) -> dict:
+    user = getattr(request, "user", None)
+    role = user.role if user is not None and user.is_authenticated else "anon"
+    return {
+        "nav_role": role,
+        "nav_active": "contact" if request.path.startswith("/contact/") else "",
+        "fragment_cache_timeout": int(getattr(settings, "TEMPLATE_FRAGMENT_CACHE_TIMEOUT", 3600)),
+        "fragment_cache_version": getattr(settings, "TEMPLATE_FRAGMENT_CACHE_VERSION", "1"),
+    }
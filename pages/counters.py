@@ -0,0 +1,141 @@
+"""عدّادات المنصة (الدورات / المستفيدون / الشهادات) للصفحة الرئيسية.
+
+- كل عدّاد صف في PlatformCounter يُحدّث بـ F("value") + delta عند إنشاء/حذف/تغيّر
+  السجلات المصدر (إشارات post_save / post_delete) بدل COUNT(*) في كل زيارة
+- قراءة الصفحة الرئيسية: استعلام واحد على الفهرس الفريد name، ومخزن في الكاش
+- reconcile_counters يعيد الحساب من الجداول الأصلية ويصحح أي انحراف
+  (تحديثات جماعية أو استيراد مباشر لا تمر بالإشارات)
+"""
+
+from __future__ import annotations
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .cache import invalidate_page_cache
+from .models import PlatformCounter
+
+STATS_CACHE_KEY = "pages:platform_counters"
+STATS_CACHE_TIMEOUT = 60
+
+# اسم العدّاد -> (النموذج المصدر، شروط السجل المحسوب)
+# النماذج غير الموجودة بعد (تطبيق غير مثبت) يبقى عدّادها 0
+COUNTER_SOURCES: dict[str, tuple[str, dict]] = {
+    "courses": ("courses.Course", {}),
+    "beneficiaries": (settings.AUTH_USER_MODEL, {"role": "IND", "is_active": True}),
+    "certificates": ("certificates.Certificate", {}),
+}
+
+
+def _get_model(label: str):
+    try:
+        return apps.get_model(label)
+    except (LookupError, ValueError):
+        return None
+
+
+def _matches(instance, filters: dict) -> bool:
+    return all(getattr(instance, field, None) == value for field, value in filters.items())
+
+
+def _matched_before(instance, name: str, filters: dict) -> bool | None:
+    """هل كان السجل محسوبًا قبل هذا الحفظ؟ None إذا تعذر المعرفة."""
+    state_attr = f"_counted_{name}"
+    if state_attr in instance.__dict__:
+        return instance.__dict__[state_attr]
+    loaded = {}
+    for field in filters:
+        if not hasattr(instance, f"_loaded_{field}"):
+            return None
+        loaded[field] = getattr(instance, f"_loaded_{field}")
+    return all(loaded[field] == value for field, value in filters.items())
+
+
+def increment(name: str, delta: int) -> None:
+    if not PlatformCounter.objects.filter(name=name).update(value=F("value") + delta):
+        PlatformCounter.objects.get_or_create(name=name)
+        PlatformCounter.objects.filter(name=name).update(value=F("value") + delta)
+    _invalidate_stats()
+
+
+def _invalidate_stats() -> None:
+    # كاش القيم + وسم "stats" لصفحات cache_public_page (الصفحة الرئيسية للزوار)؛
+    # الوسم بعد الـ commit حتى لا تُخزن الصفحة بالقيم القديمة تحت الإصدار الجديد
+    cache.delete(STATS_CACHE_KEY)
+    transaction.on_commit(lambda: invalidate_page_cache("stats"))
+
+
+def get_platform_stats() -> dict[str, int]:
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        stats = dict.fromkeys(COUNTER_SOURCES, 0)
+        stats.update(PlatformCounter.objects.filter(name__in=COUNTER_SOURCES).values_list("name", "value"))
+        cache.set(STATS_CACHE_KEY, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def compute_actual(name: str) -> int:
+    label, filters = COUNTER_SOURCES[name]
+    model = _get_model(label)
+    return model.objects.filter(**filters).count() if model is not None else 0
+
+
+def reconcile_counters() -> list[tuple[str, int, int]]:
+    """إعادة حساب كل العدّادات. يرجع (الاسم، القيمة المخزنة، القيمة الفعلية)."""
+    stored = dict(PlatformCounter.objects.values_list("name", "value"))
+    report = []
+    drifted = False
+    for name in COUNTER_SOURCES:
+        actual = compute_actual(name)
+        current = stored.get(name)
+        if current is None:
+            PlatformCounter.objects.create(name=name, value=actual)
+        elif current != actual:
+            PlatformCounter.objects.filter(name=name).update(value=actual)
+        drifted = drifted or current != actual
+        report.append((name, current or 0, actual))
+    if drifted:
+        _invalidate_stats()
+    return report
+
+
+def connect_counter_signals() -> None:
+    for name, (label, filters) in COUNTER_SOURCES.items():
+        model = _get_model(label)
+        if model is None:
+            continue
+
+        def _before_save(sender, instance, update_fields=None, _name=name, _filters=filters, **kwargs):
+            # اللقطة قبل الحفظ: معالجات post_save الأخرى (مثل مزامنة مجموعات الأدوار التي
+            # تحدّث _loaded_role) قد تسبقنا وتجعل الحالة "السابقة" هي الجديدة
+            if instance._state.adding:
+                return
+            if update_fields is not None and not set(_filters) & set(update_fields):
+                return
+            instance.__dict__[f"_counter_before_{_name}"] = _matched_before(instance, _name, _filters)
+
+        def _on_save(sender, instance, created, update_fields=None, _name=name, _filters=filters, **kwargs):
+            if created:
+                before = False
+            else:
+                if update_fields is not None and not set(_filters) & set(update_fields):
+                    return
+                before = instance.__dict__.pop(f"_counter_before_{_name}", None)
+                if before is None:
+                    return
+            now = _matches(instance, _filters)
+            instance.__dict__[f"_counted_{_name}"] = now
+            if now != before:
+                increment(_name, 1 if now else -1)
+
+        def _on_delete(sender, instance, _name=name, _filters=filters, **kwargs):
+            if _matches(instance, _filters):
+                increment(_name, -1)
+
+        pre_save.connect(_before_save, sender=model, weak=False, dispatch_uid=f"counters:{name}:pre_save")
+        post_save.connect(_on_save, sender=model, weak=False, dispatch_uid=f"counters:{name}:save")
+        post_delete.connect(_on_delete, sender=model, weak=False, dispatch_uid=f"counters:{name}:delete")
@@ -0,0 +1,71 @@
+"""Template loader يزيل المسافات غير المهمة وتعليقات HTML وقت ترجمة القالب.
+
+    "loaders": [("pages.loaders.MinifyingLoader", [...loaders...])]
+
+- يعمل على مصدر القالب قبل الترجمة، فمع cached loader يتم مرة واحدة لكل عملية
+  ولا يضيف أي تكلفة على الطلب
+- ملفات .html فقط (قوالب البريد النصية .txt تبقى كما هي)
+- لا يلمس <pre> و <textarea> و <script> و <style>
+- المسافة البادئة وأسطر الفراغ تُختصر إلى سطر جديد واحد (لا تُحذف بالكامل حتى
+  لا تلتصق العناصر inline ببعضها)
+- تعليقات HTML التي تحتوي وسوم قوالب ({% ... %}) أو تعليقات IE الشرطية تبقى
+"""
+
+from __future__ import annotations
+
+import re
+
+from django.template.loaders.base import Loader as BaseLoader
+
+_PROTECTED_RE = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_INDENT_RE = re.compile(r"[ \t\r]*\n\s*")
+_SPACES_RE = re.compile(r"[ \t]{2,}")
+
+
+def _strip_comment(match: re.Match) -> str:
+    comment = match.group(0)
+    if comment.startswith("<!--[if") or "{%" in comment:
+        return comment
+    return ""
+
+
+def _minify_markup(text: str) -> str:
+    text = _COMMENT_RE.sub(_strip_comment, text)
+    text = _INDENT_RE.sub("\n", text)
+    return _SPACES_RE.sub(" ", text)
+
+
+def minify_html(source: str) -> str:
+    parts = _PROTECTED_RE.split(source)
+    out = []
+    # split مع مجموعتين: [نص، كتلة محمية، اسم الوسم، نص، ...]
+    for i in range(0, len(parts), 3):
+        out.append(_minify_markup(parts[i]))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return "".join(out).strip()
+
+
+class MinifyingLoader(BaseLoader):
+    def __init__(self, engine, loaders):
+        super().__init__(engine)
+        self.loaders = engine.get_template_loaders(loaders)
+
+    def get_template_sources(self, template_name):
+        for loader in self.loaders:
+            for origin in loader.get_template_sources(template_name):
+                # cached.Loader يقرأ المصدر عبر origin.loader: يجب أن يمر بنا
+                origin.inner_loader = origin.loader
+                origin.loader = self
+                yield origin
+
+    def get_contents(self, origin):
+        contents = origin.inner_loader.get_contents(origin)
+        if origin.template_name and origin.template_name.endswith(".html"):
+            return minify_html(contents)
+        return contents
+
+    def reset(self):
+        for loader in self.loaders:
+            loader.reset()
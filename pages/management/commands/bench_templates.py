@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from accounts.models import Role, User
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _templates_setting(cached_loader: bool) -> list[dict]:
+    base = settings.TEMPLATES[0]
+    loaders = base["OPTIONS"]["loaders"]
+    if loaders and isinstance(loaders[0], tuple) and loaders[0][0] == "django.template.loaders.cached.Loader":
+        loaders = loaders[0][1]
+    options = {
+        **base["OPTIONS"],
+        "loaders": [("django.template.loaders.cached.Loader", loaders)] if cached_loader else loaders,
+    }
+    return [{**base, "APP_DIRS": False, "OPTIONS": options}]
+
+
+# كاش خاص بالقياس: cache.clear() على الكاش الافتراضي (Redis في الإنتاج) يمسح الجلسات
+# وحدود المعدل وأرقام الإصدار ورموز OTP
+BENCH_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench_templates"},
+}
+
+# (الاسم، cached loader؟، fragment cache؟)
+SCENARIOS = (
+    ("before", False, False),
+    ("cached_loader", True, False),
+    ("after", True, True),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "قياس زمن عرض القوالب (p50/p99) قبل وبعد cached loader و fragment cache "
+        "لشريط التنقل والتذييل في base.html، للزائر وللمستخدم المسجل."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--templates",
+            nargs="+",
+            default=["pages/landing.html", "pages/contact.html"],
+            help="القوالب المراد قياسها.",
+        )
+        parser.add_argument("--renders", type=int, default=300, help="عدد مرات العرض لكل حالة.")
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        users = {
+            "anon": AnonymousUser(),
+            "auth": User(email="bench@bench.local", role=Role.SYSTEM_ADMIN, is_active=True),
+        }
+
+        self.stdout.write(f"{'template':<24} {'user':>5} {'scenario':>14} {'p50 ms':>9} {'p99 ms':>9}")
+        for template_name in options["templates"]:
+            for user_kind, user in users.items():
+                for scenario, cached_loader, fragments in SCENARIOS:
+                    with override_settings(
+                        TEMPLATES=_templates_setting(cached_loader),
+                        TEMPLATE_FRAGMENT_CACHE_TIMEOUT=3600 if fragments else 0,
+                        CACHES=BENCH_CACHES,
+                    ):
+                        caches["default"].clear()
+                        samples = self._measure(factory, user, template_name, options["renders"])
+                    self.stdout.write(
+                        f"{template_name:<24} {user_kind:>5} {scenario:>14} "
+                        f"{statistics.median(samples):>9.3f} {_percentile(samples, 99):>9.3f}"
+                    )
+
+    @staticmethod
+    def _measure(factory, user, template_name: str, renders: int) -> list[float]:
+        request = factory.get("/")
+        request.user = user
+        request.session = {}
+        context = {"stats": {"courses": 0, "beneficiaries": 0, "certificates": 0}}
+        # العرض الأول (ترجمة القالب وملء الـ cache) لا يُحسب
+        render_to_string(template_name, context, request)
+        samples = []
+        for _ in range(renders):
+            start = time.perf_counter()
+            render_to_string(template_name, context, request)
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from pages.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "إعادة حساب عدّادات المنصة (الدورات / المستفيدون / الشهادات) من الجداول الأصلية "
+        "وتصحيح أي انحراف عن القيم المحدثة تدريجيًا. يُشغّل دوريًا (cron)."
+    )
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for name, stored, actual in reconcile_counters():
+            if stored != actual:
+                drifted += 1
+                self.stdout.write(f"{name}: {stored} -> {actual}")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Reconciled counters: drifted={drifted}"))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    PlatformCounter = apps.get_model("pages", "PlatformCounter")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    values = {
+        "courses": 0,
+        "beneficiaries": User.objects.filter(role="IND", is_active=True).count(),
+        "certificates": 0,
+    }
+    for name, value in values.items():
+        PlatformCounter.objects.update_or_create(name=name, defaults={"value": value})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0006_alter_contactmessage_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='اسم العدّاد')),
+                ('value', models.BigIntegerField(default=0, verbose_name='القيمة')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+            ],
+            options={
+                'verbose_name': 'عدّاد المنصة',
+                'verbose_name_plural': 'عدّادات المنصة',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -45,3 +45,23 @@ class SiteSetting(models.Model):
     def get_solo(cls) -> "SiteSetting":
         obj, _ = cls.objects.get_or_create(pk=1)
         return obj
+
+
+class PlatformCounter(models.Model):
+    """
+    عدّادات المنصة المعروضة في الصفحة الرئيسية (صف لكل عدّاد)
+    - تُحدّث تدريجيًا عبر الإشارات بـ F("value") + delta (pages.counters)
+    - reconcile_counters يصحح أي انحراف دوريًا من الجداول الأصلية
+    """
+
+    name = models.CharField("اسم العدّاد", max_length=50, unique=True)
+    value = models.BigIntegerField("القيمة", default=0)
+    updated_at = models.DateTimeField("آخر تحديث", auto_now=True)
+
+    class Meta:
+        verbose_name = "عدّاد المنصة"
+        verbose_name_plural = "عدّادات المنصة"
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.value}"
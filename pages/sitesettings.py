@@ -0,0 +1,54 @@
+"""قراءة SiteSetting (Singleton) من ذاكرة العملية بدل get_or_create في كل طلب.
+
+- الكائن يبقى في ذاكرة العملية مع رقم الإصدار الذي بُني عليه
+- كل قراءة تقارن رقم الإصدار في الـ cache المشترك (بدون استعلام قاعدة بيانات)،
+  وحفظ/حذف الإعدادات يرفعه بعد الـ commit، فتعيد كل العمليات (gunicorn workers /
+  خوادم متعددة) التحميل من الطلب التالي
+- بدون كاش مشترك (SHARED_CACHE) لا يصل الرفع لبقية العمليات، فتنتهي النسخة المحلية
+  كل LOCAL_VERSION_FALLBACK_TTL ثانية (accounts.versioning)
+- التحديثات الجماعية (QuerySet.update) يجب أن تستدعي bump_site_settings_version
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.versioning import bump_version, current_version
+
+from .models import SiteSetting
+
+VERSION_KEY = "pages:site_settings:version"
+
+_lock = threading.Lock()
+_state: dict = {"version": None, "obj": None}
+
+
+def bump_site_settings_version() -> None:
+    """إبطال نسخة الإعدادات في كل العمليات."""
+    bump_version(VERSION_KEY)
+    _state["version"] = None
+
+
+def get_site_settings() -> SiteSetting:
+    """نسخة من إعدادات الموقع (تعديلها لا يؤثر على النسخة المشتركة)."""
+    version = current_version(VERSION_KEY)
+    if _state["version"] != version:
+        with _lock:
+            if _state["version"] != version:
+                _state["obj"] = SiteSetting.get_solo()
+                _state["version"] = version
+    return copy.copy(_state["obj"])
+
+
+@receiver(post_save, sender=SiteSetting)
+@receiver(post_delete, sender=SiteSetting)
+def invalidate_site_settings(sender, **kwargs):
+    # هذه العملية تعيد التحميل فورًا، والبقية بعد الـ commit (حتى لا تخزن قيمة
+    # قديمة تحت الإصدار الجديد قبل ظهور التعديل لها)
+    _state["version"] = None
+    transaction.on_commit(bump_site_settings_version)
@@ -0,0 +1,405 @@
+"""مرحلة بناء الملفات الثابتة (collectstatic) وخدمتها.
+
+الحزم (STATIC_BUNDLES):
+- لكل صفحة حزمة CSS وحزمة JS (base + ملف الصفحة) تُدمج وتُصغّر في bundles/<page>.<css|js>
+  قبل مرحلة الـ hashing في ManifestStaticFilesStorage، فتُكتب باسم يحمل بصمة المحتوى
+- مسارات url(...) و @import النسبية في CSS تُعاد كتابتها نسبةً إلى bundles/، ثم
+  تستبدلها مرحلة الـ hashing بأسمائها المبصمة كأي ملف CSS
+- لكل ملف نصي مُبصم تُكتب نسخ مضغوطة مسبقًا .gz و .br (إن وُجدت brotli) بجانبه؛
+  يستخدمها serve_static (أو gzip_static / brotli_static في nginx) مباشرة
+- {% static_bundle %} (pages/templatetags/bundles.py) يكتب وسم الحزمة، أو ملفاتها
+  المصدرية منفردة إذا كان STATIC_BUNDLES_ENABLE معطلًا (التطوير)
+- serve_static: الأسماء المبصمة تُرسل بـ Cache-Control: immutable لسنة كاملة
+
+الصور المتجاوبة (AVIF / WebP) من static/assets/img:
+- لكل صورة مصدر تُولَّد نسخ بعروض RESPONSIVE_IMAGE_WIDTHS (لا تتجاوز عرض الأصل)
+  بأسماء تحمل بصمة المحتوى: assets/img/gov.<hash>.640w.webp
+- responsive-images.json في STATIC_ROOT يحفظ البصمة والأبعاد والنسخ لكل مصدر؛
+  في التشغيل التالي تُتخطى المصادر التي لم تتغير (ولا إعدادات التوليد)
+- {% responsive_img %} (pages/templatetags/responsive.py) يقرأ هذا الملف ليكتب
+  <picture> مع srcset / sizes
+- Pillow من اعتماديات المشروع (requirements.txt)؛ إن لم يتوفر أو بُني بدون
+  ترميز AVIF/WebP تُتخطى المرحلة (أو الصيغة) بتحذير وتُخدم الصور الأصلية
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage,
+    StaticFilesStorage,
+    staticfiles_storage,
+)
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.static import serve
+
+from .compression import brotli, parse_accept_encoding
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # اختياري
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+RESPONSIVE_MANIFEST_NAME = "responsive-images.json"
+_SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def _widths() -> list[int]:
+    return sorted(int(w) for w in getattr(settings, "RESPONSIVE_IMAGE_WIDTHS", [320, 640, 960, 1280]))
+
+
+def _quality() -> int:
+    return int(getattr(settings, "RESPONSIVE_IMAGE_QUALITY", 70))
+
+
+def supported_formats() -> list[str]:
+    """الصيغ المتاحة فعليًا (حسب Pillow المثبت) بترتيب التفضيل."""
+    if Image is None:
+        return []
+    wanted = getattr(settings, "RESPONSIVE_IMAGE_FORMATS", ["avif", "webp"])
+    return [fmt for fmt in wanted if features.check(fmt)]
+
+
+def _fingerprint(data: bytes, formats: list[str]) -> str:
+    params = json.dumps([_widths(), _quality(), formats]).encode()
+    return hashlib.sha256(data + params).hexdigest()[:12]
+
+
+class ResponsiveImagesMixin:
+    responsive_manifest_name = RESPONSIVE_MANIFEST_NAME
+
+    def post_process(self, paths, dry_run=False, **options):
+        parent = getattr(super(), "post_process", None)
+        if parent is not None:
+            yield from parent(paths, dry_run, **options)
+        if dry_run:
+            return
+        formats = supported_formats()
+        if not formats:
+            logger.warning("Responsive images skipped: Pillow with AVIF/WebP support is not installed")
+            return
+
+        prefixes = tuple(getattr(settings, "RESPONSIVE_IMAGE_DIRS", ["assets/img/"]))
+        manifest = self.load_responsive_manifest()
+        updated = {}
+        for name in sorted(paths):
+            if not (name.startswith(prefixes) and name.lower().endswith(_SOURCE_EXTENSIONS)):
+                continue
+            try:
+                entry, generated = self._responsive_variants(name, manifest.get(name), formats)
+            except Exception as exc:
+                yield name, None, exc
+                continue
+            updated[name] = entry
+            if generated:
+                yield name, name, True
+
+        self._save_json(self.responsive_manifest_name, updated)
+        # النسخ مبصمة أصلًا: تُسجل كما هي في manifest الـ hashing حتى يرجعها {% static %}
+        if hasattr(self, "hashed_files"):
+            for entry in updated.values():
+                for variants in entry["variants"].values():
+                    for _, variant in variants:
+                        self.hashed_files[self.hash_key(variant)] = variant
+            self.save_manifest()
+
+    def load_responsive_manifest(self) -> dict:
+        if not self.exists(self.responsive_manifest_name):
+            return {}
+        with self.open(self.responsive_manifest_name) as fh:
+            try:
+                return json.loads(fh.read().decode())
+            except ValueError:
+                return {}
+
+    def _save_json(self, name: str, data: dict) -> None:
+        if self.exists(name):
+            self.delete(name)
+        self.save(name, ContentFile(json.dumps(data, indent=1, sort_keys=True).encode()))
+
+    def _responsive_variants(self, name: str, previous: dict | None, formats: list[str]) -> tuple[dict, bool]:
+        with self.open(name) as fh:
+            data = fh.read()
+        digest = _fingerprint(data, formats)
+        if previous and previous.get("hash") == digest:
+            names = [variant for variants in previous["variants"].values() for _, variant in variants]
+            if all(self.exists(variant) for variant in names):
+                return previous, False
+
+        image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "P") else "RGB")
+        width, height = image.size
+        widths = [w for w in _widths() if w < width] + [min(width, _widths()[-1])]
+
+        root, _ = posixpath.splitext(name)
+        variants: dict[str, list] = {}
+        for fmt in formats:
+            variants[fmt] = []
+            for w in sorted(set(widths)):
+                resized = image if w == width else image.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+                buffer = BytesIO()
+                resized.save(buffer, format=fmt.upper(), quality=_quality())
+                variant = f"{root}.{digest}.{w}w.{fmt}"
+                if self.exists(variant):
+                    self.delete(variant)
+                self.save(variant, ContentFile(buffer.getvalue()))
+                variants[fmt].append([w, variant])
+
+        # حذف نسخ البصمة السابقة
+        if previous:
+            for old in previous.get("variants", {}).values():
+                for _, old_name in old:
+                    if old_name not in {v for items in variants.values() for _, v in items} and self.exists(old_name):
+                        self.delete(old_name)
+
+        return {"hash": digest, "width": width, "height": height, "variants": variants}, True
+
+
+_CSS_TOKEN_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/""", re.DOTALL)
+_CSS_SPACE_RE = re.compile(r"\s*([{};,>])\s*|(:)\s+")
+# بعد هذه المحارف لا يمكن أن تأتي "/" للقسمة، فهي بداية regex
+_JS_REGEX_PREFIX = set("(,=:[!&|?{};+-*%<>~^")
+# مسافة بجانب هذه المحارف لا تغيّر المعنى (+ و - و / مستثناة: a - -b ، regex)
+_JS_PUNCTUATION = set("{}()[];,=:<>?!&|*%^~")
+
+
+def _squeeze_css(text: str) -> str:
+    return _CSS_SPACE_RE.sub(lambda m: m.group(1) or m.group(2), re.sub(r"\s+", " ", text))
+
+
+def minify_css(css: str) -> str:
+    """حذف التعليقات والمسافات الزائدة، مع إبقاء النصوص بين علامات التنصيص كما هي."""
+    parts, pending = [], []
+    last = 0
+    for match in _CSS_TOKEN_RE.finditer(css):
+        pending.append(css[last : match.start()])
+        last = match.end()
+        if match.group(1) is None:  # تعليق
+            pending.append(" ")
+            continue
+        parts += [_squeeze_css("".join(pending)), match.group(1)]
+        pending = []
+    pending.append(css[last:])
+    parts.append(_squeeze_css("".join(pending)))
+    return "".join(parts).replace(";}", "}").strip()
+
+
+def minify_js(source: str) -> str:
+    """تصغير محافظ: حذف التعليقات والمسافات، مع إبقاء الأسطر حيث قد يعتمد عليها ASI.
+
+    لا يعيد تسمية المتغيرات؛ النصوص و template literals وتعابير regex تبقى كما هي.
+    """
+    out: list[str] = []
+    last = ""  # آخر محرف ذي معنى
+    i, n = 0, len(source)
+    while i < n:
+        c = source[i]
+        if c in "\"'`":
+            j = i + 1
+            while j < n and source[j] != c:
+                j += 2 if source[j] == "\\" else 1
+            out.append(source[i : j + 1])
+            last, i = c, j + 1
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = n if end < 0 else end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            if i < n and not source[i].isspace():
+                out.append(" ")
+        elif c == "/" and (not last or last in _JS_REGEX_PREFIX):
+            j, in_class = i + 1, False
+            while j < n and (in_class or source[j] != "/") and source[j] != "\n":
+                if source[j] == "\\":
+                    j += 1
+                elif source[j] in "[]":
+                    in_class = source[j] == "["
+                j += 1
+            out.append(source[i : j + 1])
+            last, i = "/", j + 1
+        elif c.isspace():
+            j = i
+            while j < n and source[j].isspace():
+                j += 1
+            following = source[j] if j < n else ""
+            prev = out[-1][-1] if out else ""
+            if prev and prev not in " \n" and following:
+                if "\n" in source[i:j] and prev not in "{;," and following not in "})],;":
+                    out.append("\n")
+                elif prev not in _JS_PUNCTUATION and following not in _JS_PUNCTUATION:
+                    out.append(" ")
+            i = j
+        else:
+            out.append(c)
+            last, i = c, i + 1
+    return "".join(out).strip()
+
+
+_CSS_URL_RE = re.compile(r"""(url\(\s*)(["']?)(.*?)\2(\s*\))""", re.IGNORECASE)
+_CSS_IMPORT_RE = re.compile(r"""(@import\s+)(["'])(.*?)\2()""", re.IGNORECASE)
+_URL_SCHEME_RE = re.compile(r"^[a-z][a-z0-9+.-]*:", re.IGNORECASE)
+_URL_TAIL_RE = re.compile(r"([^?#]*)(.*)", re.DOTALL)
+
+
+def rebase_css_urls(css: str, source: str, target: str) -> str:
+    """تحويل المسارات النسبية في CSS من مجلد source إلى مجلد target (كلاهما اسم داخل STATIC_ROOT)."""
+
+    def rebase(match):
+        prefix, quote, url, suffix = match.groups()
+        if not url or url.startswith(("/", "#")) or _URL_SCHEME_RE.match(url):
+            return match.group(0)
+        # ?query و #fragment (مثل خطوط woff / svg#id) تبقى كما هي
+        path, tail = _URL_TAIL_RE.match(url).groups()
+        resolved = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+        rebased = posixpath.relpath(resolved, posixpath.dirname(target) or ".")
+        return f"{prefix}{quote}{rebased}{tail}{quote}{suffix}"
+
+    return _CSS_IMPORT_RE.sub(rebase, _CSS_URL_RE.sub(rebase, css))
+
+
+def get_bundles() -> dict[str, dict[str, list[str]]]:
+    return getattr(settings, "STATIC_BUNDLES", {})
+
+
+def bundle_name(bundle: str, kind: str) -> str:
+    return f"bundles/{bundle}.{kind}"
+
+
+_PRECOMPRESS_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".xml", ".html", ".map")
+
+
+class StaticBundlesMixin:
+    """يبني الحزم قبل الـ hashing، ثم يكتب نسخ .gz / .br للملفات المبصمة."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for bundle, kinds in get_bundles().items():
+                for kind, sources in kinds.items():
+                    name = bundle_name(bundle, kind)
+                    self._save_bundle(name, kind, sources)
+                    paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run and getattr(settings, "STATIC_PRECOMPRESS", True):
+            self.precompress(getattr(self, "hashed_files", {}).values())
+
+    def _save_bundle(self, name: str, kind: str, sources: list[str]) -> None:
+        chunks = []
+        for source in sources:
+            with self.open(source) as fh:
+                chunk = fh.read().decode("utf-8")
+            if kind == "css":
+                # الحزمة في bundles/: المسارات النسبية كانت نسبةً إلى مجلد المصدر
+                chunk = rebase_css_urls(chunk, source, name)
+            chunks.append(chunk)
+        if kind == "css":
+            content = "\n".join(minify_css(chunk) for chunk in chunks)
+        else:
+            # كل ملف قد لا ينتهي بـ ";"
+            content = ";\n".join(minify_js(chunk) for chunk in chunks)
+        if self.exists(name):
+            self.delete(name)
+        self.save(name, ContentFile(content.encode("utf-8")))
+
+    def precompress(self, names) -> None:
+        min_size = int(getattr(settings, "COMPRESSION_MIN_SIZE", 860))
+        for name in set(names):
+            if not name.endswith(_PRECOMPRESS_EXTENSIONS) or not self.exists(name):
+                continue
+            # الاسم مبصم: إذا وُجدت النسخ فهي لنفس المحتوى
+            targets = [(f"{name}.gz", lambda data: gzip.compress(data, 9, mtime=0))]
+            if brotli is not None:
+                targets.append((f"{name}.br", lambda data: brotli.compress(data, quality=11)))
+            targets = [(target, fn) for target, fn in targets if not self.exists(target)]
+            if not targets:
+                continue
+            with self.open(name) as fh:
+                data = fh.read()
+            if len(data) < min_size:
+                continue
+            for target, compress in targets:
+                compressed = compress(data)
+                if len(compressed) < len(data):
+                    self.save(target, ContentFile(compressed))
+
+
+class ResponsiveStaticFilesStorage(ResponsiveImagesMixin, StaticFilesStorage):
+    pass
+
+
+class BuildStaticFilesStorage(StaticBundlesMixin, ResponsiveImagesMixin, ManifestStaticFilesStorage):
+    """تخزين الإنتاج: حزم + صور متجاوبة + أسماء مبصمة + نسخ مضغوطة مسبقًا."""
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # لم يُشغَّل collectstatic بعد (الاختبارات / بيئة محلية): الاسم كما هو
+            return name
+
+
+@lru_cache(maxsize=1)
+def get_responsive_manifest() -> dict:
+    """manifest النسخ المتجاوبة (يُقرأ مرة واحدة لكل عملية)."""
+    loader = getattr(staticfiles_storage, "load_responsive_manifest", None)
+    try:
+        return loader() if loader is not None else {}
+    except OSError:
+        return {}
+
+
+# اسم فيه بصمة Manifest (12 محرف hex) أو بصمة الصور المتجاوبة
+_HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.")
+_SIBLING_SUFFIX = {"br": "br", "gzip": "gz"}
+
+
+def _sibling_exists(root: str, path: str, encoding: str) -> bool:
+    try:
+        return os.path.isfile(safe_join(root, f"{path}.{_SIBLING_SUFFIX[encoding]}"))
+    except SuspiciousFileOperation:
+        return False
+
+
+def serve_static(request, path):
+    """خدمة STATIC_ROOT من Django (عند عدم وجود خادم ملفات ثابتة أمامه).
+
+    يختار النسخة المضغوطة مسبقًا حسب Accept-Encoding؛ الأسماء المبصمة لا تتغير أبدًا
+    فتُرسل immutable لسنة، وغيرها بمدة قصيرة.
+    """
+    root = str(settings.STATIC_ROOT)
+    chosen = path
+    siblings = [encoding for encoding in ("br", "gzip") if _sibling_exists(root, path, encoding)]
+    if siblings:
+        accepted = parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        for encoding in siblings:
+            if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                chosen = f"{path}.{_SIBLING_SUFFIX[encoding]}"
+                break
+
+    response = serve(request, chosen, document_root=root)
+    if siblings:
+        patch_vary_headers(response, ("Accept-Encoding",))
+    if _HASHED_NAME_RE.search(posixpath.basename(path)):
+        max_age = int(getattr(settings, "STATIC_MAX_AGE", 31536000))
+        patch_cache_control(response, public=True, max_age=max_age, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=int(getattr(settings, "STATIC_UNHASHED_MAX_AGE", 3600)))
+    return response
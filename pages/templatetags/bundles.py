@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from pages.staticfiles import bundle_name, get_bundles
+
+register = template.Library()
+
+_TAGS = {
+    "css": '<link rel="stylesheet" href="{}" />',
+    "js": '<script src="{}" defer></script>',
+}
+
+
+@register.simple_tag
+def static_bundle(bundle: str, kind: str):
+    """{% static_bundle "landing" "css" %}: الحزمة المبصمة، أو ملفاتها المصدرية في التطوير."""
+    if getattr(settings, "STATIC_BUNDLES_ENABLE", True):
+        return format_html(_TAGS[kind], static(bundle_name(bundle, kind)))
+    return format_html_join("\n", _TAGS[kind], ((static(source),) for source in get_bundles()[bundle][kind]))
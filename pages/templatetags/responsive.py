@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from pages.staticfiles import get_responsive_manifest
+
+register = template.Library()
+
+_MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+
+@register.simple_tag
+def responsive_img(path: str, alt: str = "", sizes: str = "100vw", **attrs):
+    """<picture> بنسخ AVIF / WebP من manifest ما بعد collectstatic، مع <img> الأصلية كاحتياط.
+
+    {% responsive_img "assets/img/gov.jpg" alt="" sizes="(max-width: 600px) 100vw, 360px" class="cardPhoto" %}
+    """
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    entry = get_responsive_manifest().get(path)
+    if entry:
+        attrs.setdefault("width", entry["width"])
+        attrs.setdefault("height", entry["height"])
+
+    img = format_html(
+        '<img src="{}" alt="{}"{}>',
+        static(path),
+        alt,
+        format_html_join("", ' {}="{}"', sorted(attrs.items())),
+    )
+    if not entry:
+        return img
+
+    sources = format_html_join(
+        "",
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (
+                _MIME_TYPES.get(fmt, f"image/{fmt}"),
+                ", ".join(f"{static(name)} {width}w" for width, name in variants),
+                sizes,
+            )
+            for fmt, variants in entry["variants"].items()
+        ),
+    )
+    return format_html("<picture>{}{}</picture>", sources, img)
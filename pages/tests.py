@@ -1,3 +1,401 @@
-from django.test import TestCase
+import gzip
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Role, User
+
+from .cache import invalidate_page_cache, tag_versions
+from .compression import CompressionMiddleware, negotiate
+from .counters import compute_actual, get_platform_stats
+from .loaders import minify_html
+from .models import PlatformCounter, SiteSetting
+from .sitesettings import VERSION_KEY, get_site_settings
+from .staticfiles import get_responsive_manifest, minify_css, minify_js, rebase_css_urls, serve_static
+
+
+class PublicPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_landing_is_served_from_cache(self):
+        url = reverse("landing")
+        first = self.client.get(url)
+        self.assertEqual(first["X-Page-Cache"], "MISS")
+        with self.assertTemplateNotUsed("pages/landing.html"):
+            second = self.client.get(url)
+        self.assertEqual(second["X-Page-Cache"], "HIT")
+        self.assertEqual(first.content, second.content)
+        self.assertIn("Accept-Language", second["Vary"])
+
+    def test_varies_on_language_and_tag_invalidation(self):
+        url = reverse("public_courses")
+        self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT_LANGUAGE="en")["X-Page-Cache"], "MISS")
+        self.assertEqual(self.client.get(url)["X-Page-Cache"], "HIT")
+
+        invalidate_page_cache("catalog")
+        self.assertEqual(self.client.get(url)["X-Page-Cache"], "MISS")
+
+    def test_authenticated_users_and_pending_messages_bypass_cache(self):
+        url = reverse("landing")
+        self.client.get(url)
+
+        self.client.cookies["messages"] = "pending"
+        self.assertNotIn("X-Page-Cache", self.client.get(url))
+        del self.client.cookies["messages"]
+
+        user = User.objects.create_user(email="p@example.com", password="Str0ngPass!234", is_active=True)
+        self.client.force_login(user)
+        res = self.client.get(url)
+        self.assertNotIn("X-Page-Cache", res)
+        self.assertContains(res, "p@example.com")
+
+
+class PlatformCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def beneficiaries(self) -> int:
+        return PlatformCounter.objects.get(name="beneficiaries").value
+
+    def test_beneficiaries_follow_role_and_activation_changes(self):
+        start = self.beneficiaries()
+        user = User.objects.create_user(email="ind@example.com", password="Str0ngPass!234", role=Role.IND, is_active=True)
+        User.objects.create_user(email="staff@example.com", password="Str0ngPass!234", role=Role.TRAINER, is_active=True)
+        self.assertEqual(self.beneficiaries(), start + 1)
+
+        user = User.objects.get(pk=user.pk)
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+        self.assertEqual(self.beneficiaries(), start)
+
+        # حفظ لا يمس الحقول المحسوبة لا يغيّر العدّاد
+        user.save(update_fields=["last_login"])
+        user.save()
+        self.assertEqual(self.beneficiaries(), start)
+
+        user.is_active = True
+        user.save()
+        self.assertEqual(self.beneficiaries(), start + 1)
+        user.delete()
+        self.assertEqual(self.beneficiaries(), start)
+
+    def test_role_change_is_counted_despite_role_group_sync(self):
+        start = self.beneficiaries()
+        user = User.objects.create_user(email="mover@example.com", password="Str0ngPass!234", role=Role.IND, is_active=True)
+        self.assertEqual(self.beneficiaries(), start + 1)
+
+        user = User.objects.get(pk=user.pk)
+        user.role = Role.TRAINER
+        user.save()
+        self.assertEqual(self.beneficiaries(), start)
+
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.beneficiaries(), start)
+        self.assertEqual(self.beneficiaries(), compute_actual("beneficiaries"))
+
+        user.role = Role.IND
+        user.is_active = True
+        user.save()
+        self.assertEqual(self.beneficiaries(), start + 1)
+        self.assertEqual(self.beneficiaries(), compute_actual("beneficiaries"))
+
+    def test_landing_reads_counters_in_one_query_and_caches_them(self):
+        with self.assertNumQueries(1):
+            stats = get_platform_stats()
+        self.assertEqual(set(stats), {"courses", "beneficiaries", "certificates"})
+        with self.assertNumQueries(0):
+            get_platform_stats()
+
+    def test_counter_change_invalidates_the_cached_landing_page(self):
+        before = tag_versions(("stats",))
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(email="ind3@example.com", password="Str0ngPass!234", role=Role.IND, is_active=True)
+        self.assertNotEqual(tag_versions(("stats",)), before)
+
+    def test_reconcile_fixes_drift(self):
+        User.objects.create_user(email="ind2@example.com", password="Str0ngPass!234", role=Role.IND, is_active=True)
+        expected = self.beneficiaries()
+        PlatformCounter.objects.filter(name="beneficiaries").update(value=999)
+
+        call_command("reconcile_counters", stdout=StringIO())
+        self.assertEqual(self.beneficiaries(), expected)
+        self.assertEqual(get_platform_stats()["beneficiaries"], expected)
+
+
+@override_settings(SHARED_CACHE=True)
+class SiteSettingCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_steady_state_reads_hit_no_database(self):
+        get_site_settings()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_site_settings().contact_inbox_email, "support@thqaf.com")
+
+    def test_save_bumps_shared_version_after_commit(self):
+        get_site_settings()
+        version = cache.get(VERSION_KEY)
+        obj = SiteSetting.get_solo()
+        obj.contact_inbox_email = "inbox@example.com"
+        with self.captureOnCommitCallbacks(execute=True):
+            obj.save()
+
+        self.assertEqual(cache.get(VERSION_KEY), version + 1)
+        self.assertEqual(get_site_settings().contact_inbox_email, "inbox@example.com")
+
+    @override_settings(SHARED_CACHE=False, LOCAL_VERSION_FALLBACK_TTL=5)
+    def test_edits_reach_other_workers_after_the_fallback_ttl(self):
+        with mock.patch("accounts.versioning.time.monotonic", return_value=100.0):
+            get_site_settings()
+            # تعديل من عملية أخرى: لا إشارة ولا رفع إصدار يصل هنا
+            SiteSetting.objects.update(contact_inbox_email="other@example.com")
+            with self.assertNumQueries(0):
+                self.assertEqual(get_site_settings().contact_inbox_email, "support@thqaf.com")
+        with mock.patch("accounts.versioning.time.monotonic", return_value=106.0):
+            self.assertEqual(get_site_settings().contact_inbox_email, "other@example.com")
+
+
+class NavigationFragmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_nav_fragment_varies_by_role_and_active_section(self):
+        self.assertContains(self.client.get(reverse("landing")), "بوابة الدخول الموحد")
+
+        admin = User.objects.create_user(email="nav@example.com", password="Str0ngPass!234", role=Role.SYSTEM_ADMIN, is_active=True)
+        self.client.force_login(admin)
+        res = self.client.get(reverse("landing"))
+        self.assertContains(res, "تسجيل خروج")
+        self.assertNotContains(res, "بوابة الدخول الموحد")
+        # قائمة الدورات معطلة حتى تتوفر مساراتها
+        self.assertNotContains(res, 'id="coursesDropdown"')
+
+        self.client.logout()
+        self.assertNotContains(self.client.get(reverse("landing")), 'class="link active"')
+        self.assertContains(self.client.get(reverse("contact")), 'class="link active"')
+
+
+class MinifyingLoaderTests(SimpleTestCase):
+    def test_strips_indentation_and_comments_but_keeps_protected_blocks(self):
+        source = (
+            "<div>\n    <!-- note -->\n    <span>a</span>   <span>b</span>\n\n</div>\n"
+            "<pre>  keep\n    this</pre>\n<textarea>\n  x  </textarea>\n"
+            "<script>\n  var a = 1; // <!-- x -->\n</script>\n"
+            "<!-- {% if x %} -->\n<!--[if IE]>ie<![endif]-->"
+        )
+        self.assertEqual(
+            minify_html(source),
+            "<div>\n<span>a</span> <span>b</span>\n</div>\n"
+            "<pre>  keep\n    this</pre>\n<textarea>\n  x  </textarea>\n"
+            "<script>\n  var a = 1; // <!-- x -->\n</script>\n"
+            "<!-- {% if x %} -->\n<!--[if IE]>ie<![endif]-->",
+        )
+
+    def test_html_templates_are_minified_and_text_templates_are_not(self):
+        ctx = {"obj": None, "ref": "THQAF-000001", "created_at": "", "year": 2026}
+        self.assertNotIn("\n    ", render_to_string("pages/emails/contact_message.html", ctx))
+        text = render_to_string("pages/emails/contact_message.txt", ctx)
+        with open(settings.BASE_DIR / "templates/pages/emails/contact_message.txt", encoding="utf-8") as fh:
+            self.assertEqual(text.count("\n"), fh.read().count("\n"))
+
+
+@override_settings(SHARED_CACHE=True)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SHARED_CACHE=False)
+    def test_disabled_without_a_shared_cache(self):
+        res = self.client.get(reverse("landing"))
+        self.assertFalse(res.has_header("ETag"))
+        self.assertEqual(self.client.get(reverse("landing"), HTTP_IF_NONE_MATCH="*").status_code, 200)
+
+    def test_matching_etag_returns_304_before_the_view_runs(self):
+        url = reverse("landing")
+        first = self.client.get(url)
+        etag = first["ETag"]
+        self.assertIn("no-cache", first["Cache-Control"])
+
+        with self.assertTemplateNotUsed("pages/landing.html"):
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 304)
+
+        invalidate_page_cache("catalog")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_varies_by_language_and_user(self):
+        url = reverse("public_courses")
+        anon = self.client.get(url)["ETag"]
+        self.assertNotEqual(anon, self.client.get(url, HTTP_ACCEPT_LANGUAGE="en")["ETag"])
+
+        user = User.objects.create_user(email="etag@example.com", password="Str0ngPass!234", is_active=True)
+        self.client.force_login(user)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=anon)
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("private", res["Cache-Control"])
+
+    def test_public_pages_revalidate_after_profile_change(self):
+        user = User.objects.create_user(email="nav@example.com", password="Str0ngPass!234", is_active=True)
+        self.client.force_login(user)
+        for url in (reverse("landing"), reverse("public_courses")):
+            etag = self.client.get(url)["ETag"]
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            user.full_name = f"اسم جديد {url}"
+            user.save()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CompressionMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_html_is_gzipped_and_csrf_pages_are_not(self):
+        res = self.client.get(reverse("landing"), HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", res["Vary"])
+        self.assertIn("ثقف".encode(), gzip.decompress(res.content))
+
+        # BREACH: صفحات فيها رمز CSRF تُرسل بدون ضغط
+        for url in (reverse("contact"), reverse("accounts:login")):
+            self.assertFalse(self.client.get(url, HTTP_ACCEPT_ENCODING="gzip").has_header("Content-Encoding"))
+
+    def test_negotiation_respects_q_values(self):
+        self.assertEqual(negotiate("br;q=1, gzip;q=0.5"), "gzip")
+        self.assertIsNone(negotiate("gzip;q=0, identity"))
+        self.assertEqual(negotiate("*"), negotiate("gzip, zstd, br"))
+
+    def test_small_bodies_skipped_and_streams_compressed_incrementally(self):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+        small = CompressionMiddleware(lambda r: HttpResponse("ok"))(request)
+        self.assertFalse(small.has_header("Content-Encoding"))
+
+        chunks = [b"<p>%d</p>" % i * 50 for i in range(5)]
+        response = CompressionMiddleware(lambda r: StreamingHttpResponse(iter(chunks), content_type="text/html"))(request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        parts = list(response.streaming_content)
+        self.assertEqual(len(parts), len(chunks) + 1)
+        self.assertEqual(gzip.decompress(b"".join(parts)), b"".join(chunks))
+
+
+class ResponsiveImageTagTests(SimpleTestCase):
+    template = Template('{% load responsive %}{% responsive_img "assets/img/gov.jpg" alt="" class="cardPhoto" sizes="50vw" %}')
+
+    def tearDown(self):
+        get_responsive_manifest.cache_clear()
+
+    def test_falls_back_to_plain_img_without_manifest(self):
+        with mock.patch("pages.templatetags.responsive.get_responsive_manifest", return_value={}):
+            html = self.template.render(Context())
+        self.assertNotIn("<picture>", html)
+        self.assertIn('src="/static/assets/img/gov.jpg"', html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_picture_with_srcset_from_manifest(self):
+        manifest = {
+            "assets/img/gov.jpg": {
+                "hash": "abc",
+                "width": 1600,
+                "height": 900,
+                "variants": {
+                    "avif": [[320, "assets/img/gov.abc.320w.avif"], [640, "assets/img/gov.abc.640w.avif"]],
+                    "webp": [[320, "assets/img/gov.abc.320w.webp"], [640, "assets/img/gov.abc.640w.webp"]],
+                },
+            }
+        }
+        with mock.patch("pages.templatetags.responsive.get_responsive_manifest", return_value=manifest):
+            html = self.template.render(Context())
+        self.assertTrue(html.startswith('<picture><source type="image/avif"'))
+        self.assertIn('srcset="/static/assets/img/gov.abc.320w.webp 320w, /static/assets/img/gov.abc.640w.webp 640w"', html)
+        self.assertIn('sizes="50vw"', html)
+        self.assertIn('width="1600"', html)
+        self.assertIn('height="900"', html)
+        self.assertIn('class="cardPhoto"', html)
+
+
+class StaticBuildTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.settings_override = self.settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            STATIC_BUNDLES_ENABLE=True,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_minifiers_keep_strings_regex_and_line_breaks(self):
+        self.assertEqual(
+            minify_css('/* x */ a , b > c {\n  content: " , /* kept */ ";\n  color: red ;\n}'),
+            'a,b>c{content:" , /* kept */ ";color:red}',
+        )
+        js = 'const re = /a\\/b[/]/g; // note\nlet s = "// not a comment"\nlet t = `x ${s}`\nreturn a - -b / 2'
+        self.assertEqual(
+            minify_js(js),
+            'const re=/a\\/b[/]/g;let s="// not a comment"\nlet t=`x ${s}`\nreturn a - -b / 2',
+        )
+
+    def test_relative_css_urls_are_rebased_to_the_bundle(self):
+        css = (
+            '@import "parts/grid.css"; .a{background:url(../img/gov.jpg)} '
+            ".b{src:url('../fonts/x.woff2?v=2#iefix')} .c{background:url(data:image/png;base64,AA==)} "
+            ".d{background:url(/static/x.png)} .e{mask:url(#m)} .f{background:url(https://cdn.example/x.png)}"
+        )
+        self.assertEqual(
+            rebase_css_urls(css, "assets/css/landing.css", "bundles/landing.css"),
+            '@import "../assets/css/parts/grid.css"; .a{background:url(../assets/img/gov.jpg)} '
+            ".b{src:url('../assets/fonts/x.woff2?v=2#iefix')} .c{background:url(data:image/png;base64,AA==)} "
+            ".d{background:url(/static/x.png)} .e{mask:url(#m)} .f{background:url(https://cdn.example/x.png)}",
+        )
+
+    def test_collectstatic_writes_hashed_precompressed_bundles(self):
+        call_command("collectstatic", interactive=False, verbosity=0)
+        paths = json.loads((Path(self.root) / "staticfiles.json").read_text())["paths"]
+        hashed = paths["bundles/landing.css"]
+        self.assertRegex(hashed, r"^bundles/landing\.[0-9a-f]{12}\.css$")
+
+        bundle = (Path(self.root) / hashed).read_bytes()
+        self.assertEqual(gzip.decompress((Path(self.root) / f"{hashed}.gz").read_bytes()), bundle)
+        self.assertNotIn(b"\n  ", bundle)
+        self.assertIn(b".illuWrap{", bundle)
+
+        html = Template('{% load bundles %}{% static_bundle "landing" "css" %}').render(Context())
+        self.assertEqual(html, f'<link rel="stylesheet" href="/static/{hashed}" />')
+
+        request = RequestFactory().get(f"/static/{hashed}", HTTP_ACCEPT_ENCODING="gzip, br")
+        response = serve_static(request, hashed)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        plain = serve_static(RequestFactory().get("/"), "bundles/landing.css")
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertNotIn("immutable", plain["Cache-Control"])
+
+    def test_sources_listed_separately_when_bundles_disabled(self):
+        with self.settings(STATIC_BUNDLES_ENABLE=False):
+            html = Template('{% load bundles %}{% static_bundle "contact" "js" %}').render(Context())
+        self.assertEqual(
+            html,
+            '<script src="/static/assets/js/base.js" defer></script>\n'
+            '<script src="/static/assets/js/contact.js" defer></script>',
+        )
@@ -1,17 +1,25 @@
 from django.conf import settings
 from django.contrib import messages
 from django.shortcuts import render, redirect
-from django.template.loader import render_to_string
 from django.utils import timezone
-from django.core.mail import EmailMultiAlternatives
 
+from accounts.ratelimit import ratelimit
+from accounts.transactional import build_email
+
+from .cache import cache_public_page
+from .conditional import conditional_page
+from .counters import get_platform_stats
 from .forms import ContactMessageForm
-from .models import ContactMessage, SiteSetting
+from .models import ContactMessage
+from .sitesettings import get_site_settings
 
 
+# "user:{user_id}": الهيدر يعرض اسم المستخدم المسجل ودوره
+@conditional_page("catalog", "cms", "stats", "user:{user_id}")
+@cache_public_page("catalog", "cms", "stats")
 def landing(request):
     context = {
-        "stats": {"courses": 0, "beneficiaries": 0, "certificates": 0},
+        "stats": get_platform_stats(),
         "audiences": [
             {"icon": "ti ti-users", "title": "الأفراد", "desc": "مستفيدون من الدورات"},
             {"icon": "ti ti-building-community", "title": "جهات حكومية", "desc": "طلب واعتماد الدورات"},
@@ -27,10 +35,14 @@ def landing(request):
     return render(request, "pages/landing.html", context)
 
 
+@conditional_page("catalog", "user:{user_id}")
+@cache_public_page("catalog")
 def public_courses(request):
     return render(request, "pages/public_courses.html")
 
 
+@ratelimit("contact", key="ip", rate="5/10m")
+@ratelimit("contact", key="post:email", rate="3/10m")
 def contact(request):
     if request.method == "POST":
         form = ContactMessageForm(request.POST)
@@ -38,7 +50,7 @@ def contact(request):
             obj: ContactMessage = form.save()
 
             # ✅ الإيميل المستلم من لوحة التحكم (مع fallback للإعداد)
-            settings_obj = SiteSetting.get_solo()
+            settings_obj = get_site_settings()
             inbox_email = (settings_obj.contact_inbox_email or "").strip() or getattr(settings, "CONTACT_TO_EMAIL", None)
 
             try:
@@ -60,18 +72,15 @@ def contact(request):
                     # "logo_url": "https://thqaf.com/static/assets/img/logo.png",
                 }
 
-                # ✅ محتوى نصي احتياطي + HTML
-                text_body = render_to_string("pages/emails/contact_message.txt", ctx)
-                html_body = render_to_string("pages/emails/contact_message.html", ctx)
-
-                email = EmailMultiAlternatives(
+                # ✅ محتوى نصي احتياطي + HTML (قوالب مترجمة مسبقًا)
+                email = build_email(
+                    "contact_message",
+                    ctx,
                     subject=subject,
-                    body=text_body,
                     from_email=settings.DEFAULT_FROM_EMAIL,
                     to=[inbox_email],
                     reply_to=[obj.email],
                 )
-                email.attach_alternative(html_body, "text/html")
                 email.send(fail_silently=False)
 
                 obj.is_sent = True
@@ -95,17 +95,27 @@ INSTALLED_APPS = [
 
 AUTH_USER_MODEL = "accounts.User"
 
+# مدة بقاء المستخدم المسجل في الكاش (ثوانٍ). 0 = تعطيل
+# يُستخدم فقط مع كاش مشترك (SHARED_CACHE)، وإلا يُقرأ المستخدم من القاعدة في كل طلب
+AUTH_USER_CACHE_TTL = env_int("THQAF_AUTH_USER_CACHE_TTL", 60)
+
 
 # =========================
 # الوسطاء (Middleware)
 # =========================
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # ضغط zstd/br/gzip مع استثناءات BREACH (pages/compression.py)
+    "pages.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # بديل AuthenticationMiddleware: المستخدم من كاش قصير بدل SELECT في كل طلب
+    # (مع كاش مشترك فقط؛ بدونه يعمل كـ AuthenticationMiddleware تمامًا)
+    "accounts.middleware.CachedAuthenticationMiddleware",
+    "accounts.middleware.HashingBackpressureMiddleware",
+    "accounts.middleware.SessionMetricsMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -116,22 +126,39 @@ ROOT_URLCONF = "thqaf.urls"
 # =========================
 # القوالب (Templates)
 # =========================
+_TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+# إزالة المسافات غير المهمة وتعليقات HTML من قوالب .html وقت الترجمة (pages/loaders.py)
+TEMPLATE_MINIFY = env_bool("THQAF_TEMPLATE_MINIFY", True)
+if TEMPLATE_MINIFY:
+    _TEMPLATE_LOADERS = [("pages.loaders.MinifyingLoader", _TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],  # templates/base.html ...etc
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "pages.context_processors.navigation",
             ],
+            # الإنتاج: القوالب تُترجم مرة واحدة لكل عملية (cached loader) دائمًا
+            "loaders": _TEMPLATE_LOADERS if DEBUG else [("django.template.loaders.cached.Loader", _TEMPLATE_LOADERS)],
         },
     },
 ]
 
+# fragment cache لشريط التنقل والتذييل في base.html (ثوانٍ). الإصدار يتغير مع كل نشر
+# حتى لا تبقى نسخة قديمة من القالب في Redis بعد تعديله
+TEMPLATE_FRAGMENT_CACHE_TIMEOUT = env_int("THQAF_FRAGMENT_CACHE_TIMEOUT", 3600)
+TEMPLATE_FRAGMENT_CACHE_VERSION = env("THQAF_RELEASE", "1")
+
 WSGI_APPLICATION = "thqaf.wsgi.application"
 
 
@@ -177,6 +204,82 @@ else:
     }
 
 
+# =========================
+# الكاش المشترك
+# =========================
+# في الإنتاج مع أكثر من worker/خادم: THQAF_REDIS_URL=redis://127.0.0.1:6379/1
+# (عدادات تحديد المعدل، كاش الصلاحيات ورموز OTP تعتمد على كاش مشترك بين العمليات)
+REDIS_URL = env("THQAF_REDIS_URL", "")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "thqaf",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "thqaf-default",
+        }
+    }
+
+# LocMemCache نسخة مستقلة لكل عملية: ما يحتاج إبطالًا يراه كل الـ workers (الجلسات،
+# كاش المستخدم المسجل، عدّادات لوحة الفرد) لا يُخزن في الكاش إلا إذا كان مشتركًا
+SHARED_CACHE = bool(REDIS_URL)
+# بدونه: النسخ المحفوظة في ذاكرة العملية بإصدار مشترك (صلاحيات الأدوار، إعدادات الموقع)
+# تنتهي بعد هذه المدة (ثوانٍ) بدل انتظار رفع الإصدار الذي لا يصل لبقية العمليات
+LOCAL_VERSION_FALLBACK_TTL = env_int("THQAF_LOCAL_VERSION_FALLBACK_TTL", 5)
+
+
+# =========================
+# كاش الصفحات العامة (pages.cache)
+# =========================
+PAGE_CACHE_ENABLE = env_bool("THQAF_PAGE_CACHE_ENABLE", True)
+PAGE_CACHE_TIMEOUT = env_int("THQAF_PAGE_CACHE_TIMEOUT", 600)
+
+# وسم -> نماذج يبطل حفظها/حذفها الصفحات الموسومة به (النماذج غير الموجودة تُتجاهل)
+PAGE_CACHE_TAG_MODELS = {
+    "catalog": ["courses.Course", "courses.Enrollment"],
+    "cms": ["cms.Page", "cms.Block"],
+}
+
+# ضغط الاستجابات (pages/compression.py)
+# zstd / br يتطلبان تثبيت zstandard / brotli، وإلا يُستخدم gzip فقط
+COMPRESSION_ENABLE = env_bool("THQAF_COMPRESSION_ENABLE", True)
+COMPRESSION_MIN_SIZE = env_int("THQAF_COMPRESSION_MIN_SIZE", 860)
+COMPRESSION_GZIP_LEVEL = env_int("THQAF_COMPRESSION_GZIP_LEVEL", 6)
+COMPRESSION_BROTLI_QUALITY = env_int("THQAF_COMPRESSION_BROTLI_QUALITY", 5)
+COMPRESSION_ZSTD_LEVEL = env_int("THQAF_COMPRESSION_ZSTD_LEVEL", 3)
+# صفحات تجمع سرًا (CSRF/OTP) مع مدخلات المستخدم: لا تُضغط (BREACH)
+COMPRESSION_EXCLUDE_PATHS = ["/accounts/", "/admin/"]
+
+# GET المشروط (ETag / 304) للصفحات العامة ولوحة الفرد (pages/conditional.py)؛
+# يعمل فقط مع SHARED_CACHE (إصدارات الوسوم يجب أن تصل لكل العمليات)
+CONDITIONAL_PAGES_ENABLE = env_bool("THQAF_CONDITIONAL_PAGES_ENABLE", True)
+
+# نماذج بيانات المستخدم (حقل user_id) التي يبطل حفظها وسم "user:<id>" في الـ ETag
+CONDITIONAL_USER_TAG_MODELS = [
+    AUTH_USER_MODEL,
+    "individuals.IndividualProfile",
+    "courses.Enrollment",
+    "certificates.Certificate",
+]
+
+
+# =========================
+# تحديد معدل الطلبات (accounts.ratelimit) — عدادات في الـ cache المشترك
+# =========================
+RATELIMIT_ENABLE = env_bool("THQAF_RATELIMIT_ENABLE", True)
+# فعّلها فقط خلف Proxy موثوق يضبط X-Forwarded-For
+RATELIMIT_TRUST_X_FORWARDED_FOR = env_bool("THQAF_RATELIMIT_TRUST_X_FORWARDED_FOR", False)
+# عدد الـ Proxies الموثوقة أمام التطبيق: عنوان العميل هو المدخل رقم N من يمين X-Forwarded-For
+RATELIMIT_TRUSTED_PROXY_COUNT = env_int("THQAF_RATELIMIT_TRUSTED_PROXY_COUNT", 1)
+
+
 # =========================
 # تحقق كلمات المرور
 # =========================
@@ -187,6 +290,22 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
+# خوارزمية التجزئة المفضلة: pbkdf2 (افتراضي) أو scrypt
+# عند التبديل تُعاد تجزئة كلمة مرور كل مستخدم تلقائيًا عند أول دخول ناجح.
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+if (env("THQAF_PASSWORD_HASHER", "pbkdf2") or "").strip().lower() == "scrypt":
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop())
+
+# مجمّع خيوط التجزئة (accounts.hashing): 0 = عدد الأنوية / عدد الخيوط × 8
+PASSWORD_HASHING_WORKERS = env_int("THQAF_PASSWORD_HASHING_WORKERS", 0)
+PASSWORD_HASHING_MAX_QUEUE = env_int("THQAF_PASSWORD_HASHING_MAX_QUEUE", 0)
+
 
 # =========================
 # الدولية والتعريب
@@ -214,6 +333,37 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 # للتطوير فقط (لا تجعلها في الإنتاج إذا تستخدم collectstatic)
 STATICFILES_DIRS = [BASE_DIR / "static"] if (BASE_DIR / "static").exists() else []
 
+# collectstatic (pages/staticfiles.py):
+# - حزم CSS/JS لكل صفحة مصغّرة، بأسماء مبصمة (manifest) ونسخ .gz/.br بجانبها
+# - نسخ AVIF / WebP متجاوبة لصور assets/img (تتطلب Pillow بدعم AVIF/WebP، وإلا تُتخطى)
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "pages.staticfiles.BuildStaticFilesStorage"},
+}
+STATIC_BUNDLES = {
+    "site": {"css": ["assets/css/base.css"], "js": ["assets/js/base.js"]},
+    "landing": {
+        "css": ["assets/css/base.css", "assets/css/landing.css"],
+        "js": ["assets/js/base.js", "assets/js/landing.js"],
+    },
+    "contact": {
+        "css": ["assets/css/base.css", "assets/css/contact.css"],
+        "js": ["assets/js/base.js", "assets/js/contact.js"],
+    },
+}
+# في التطوير تُحمّل الملفات المصدرية منفردة (بدون collectstatic)
+STATIC_BUNDLES_ENABLE = env_bool("THQAF_STATIC_BUNDLES_ENABLE", not DEBUG)
+STATIC_PRECOMPRESS = True
+# خدمة STATIC_ROOT من Django مع Cache-Control: immutable للأسماء المبصمة؛
+# عطّلها إذا كان nginx يخدم /static/ (مع gzip_static / brotli_static و expires max)
+STATIC_SERVE = env_bool("THQAF_STATIC_SERVE", not DEBUG)
+STATIC_MAX_AGE = 31536000
+STATIC_UNHASHED_MAX_AGE = 3600
+RESPONSIVE_IMAGE_DIRS = ["assets/img/"]
+RESPONSIVE_IMAGE_WIDTHS = [320, 640, 960, 1280]
+RESPONSIVE_IMAGE_FORMATS = ["avif", "webp"]
+RESPONSIVE_IMAGE_QUALITY = env_int("THQAF_RESPONSIVE_IMAGE_QUALITY", 70)
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
@@ -227,6 +377,23 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # =========================
 # جلسات + Cookies (تحسينات أمان)
 # =========================
+# THQAF_SESSION_STORE:
+# - db: القاعدة فقط (الافتراضي بدون كاش مشترك)
+# - cached_db (الافتراضي مع Redis): قراءة من الكاش وكتابة إلى القاعدة
+# - cache: الكاش فقط (بدون أي كتابة على django_session)
+# cache و cached_db يتطلبان كاشًا مشتركًا (THQAF_REDIS_URL): مع LocMemCache لكل worker
+# نسخته من الجلسة، فالخروج أو flush()/cycle_key() في worker لا يراه الباقون؛ لذلك
+# بدونه نستخدم db دائمًا
+# تنظيف الجلسات المنتهية من القاعدة: python manage.py sweep_sessions
+SESSION_STORE = (env("THQAF_SESSION_STORE", "cached_db" if SHARED_CACHE else "db") or "db").strip().lower()
+if SESSION_STORE in ("cache", "cached_db") and not SHARED_CACHE:
+    SESSION_STORE = "db"
+
+SESSION_ENGINE = {
+    "cache": "django.contrib.sessions.backends.cache",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+}.get(SESSION_STORE, "django.contrib.sessions.backends.db")
+
 SESSION_COOKIE_HTTPONLY = True
 CSRF_COOKIE_HTTPONLY = False  # Django يحتاج JS أحياناً لقراءة CSRF عند استخدام AJAX
 
@@ -236,7 +403,8 @@ CSRF_COOKIE_SAMESITE = "Lax"
 # =========================
 # Email (SMTP - Hostinger)
 # =========================
-EMAIL_BACKEND = env("DJANGO_EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+# اتصالات SMTP دائمة لكل خيط + مهلات + قاطع دائرة (accounts/mail.py)
+EMAIL_BACKEND = env("DJANGO_EMAIL_BACKEND", "accounts.mail.PooledSMTPBackend")
 
 EMAIL_HOST = env("THQAF_EMAIL_HOST", "smtp.hostinger.com")
 EMAIL_PORT = env_int("THQAF_EMAIL_PORT", 465)
@@ -253,12 +421,35 @@ if EMAIL_USE_SSL and EMAIL_USE_TLS:
     # نرجّح SSL ونوقف TLS
     EMAIL_USE_TLS = False
 
+# مهلة الاتصال/المصافحة ثم مهلة كل عملية SMTP بعدها (ثوانٍ)
+EMAIL_TIMEOUT = env_int("THQAF_EMAIL_TIMEOUT", 10)
+EMAIL_SEND_TIMEOUT = env_int("THQAF_EMAIL_SEND_TIMEOUT", 30)
+
+# قاطع الدائرة: بعد N فشلًا متتاليًا يُرفض الإرسال فورًا لمدة X ثانية وتُحفظ الرسائل
+# في DeferredEmail (إعادة الإرسال: python manage.py retry_deferred_emails --loop)
+EMAIL_CIRCUIT_FAILURE_THRESHOLD = env_int("THQAF_EMAIL_CIRCUIT_FAILURES", 5)
+EMAIL_CIRCUIT_RESET_SECONDS = env_int("THQAF_EMAIL_CIRCUIT_RESET_SECONDS", 60)
+EMAIL_DEFERRED_MAX_ATTEMPTS = env_int("THQAF_EMAIL_DEFERRED_MAX_ATTEMPTS", 10)
+# مهلة حجز دفعة retry_deferred_emails (ثوانٍ): بعدها تُستعاد رسالة توقف عاملها
+EMAIL_DEFERRED_CLAIM_SECONDS = env_int("THQAF_EMAIL_DEFERRED_CLAIM_SECONDS", 300)
+
 DEFAULT_FROM_EMAIL = f"بوابة ثقف <{EMAIL_HOST_USER}>"
 SERVER_EMAIL = DEFAULT_FROM_EMAIL
 
 # إلى أين تصل رسائل "تواصل معنا"
 CONTACT_TO_EMAIL = env("CONTACT_TO_EMAIL", EMAIL_HOST_USER)
 
+# رموز التفعيل تُرسل من عامل منفصل: python manage.py deliver_otp_emails --loop
+OTP_DELIVERY_MAX_ATTEMPTS = env_int("THQAF_OTP_DELIVERY_MAX_ATTEMPTS", 5)
+# مهلة حجز الدفعة (ثوانٍ): بعدها يُستعاد الرمز الذي توقف عامله قبل تحديث حالته
+OTP_DELIVERY_CLAIM_SECONDS = env_int("THQAF_OTP_DELIVERY_CLAIM_SECONDS", 300)
+
+# مخزن رموز التحقق: accounts.otp.DatabaseOTPStore (افتراضي) أو accounts.otp.CacheOTPStore
+# تنظيف الجدول دوريًا: python manage.py purge_email_otps
+OTP_STORE = env("THQAF_OTP_STORE", "accounts.otp.DatabaseOTPStore")
+OTP_TTL_MINUTES = env_int("THQAF_OTP_TTL_MINUTES", 10)
+OTP_MAX_ATTEMPTS = env_int("THQAF_OTP_MAX_ATTEMPTS", 5)
+
 
 # =========================
 # أمان إضافي للإنتاج
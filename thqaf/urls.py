@@ -1,8 +1,10 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from pages.staticfiles import serve_static
+
 
 admin.site.site_header = " لوحة تحكم بوابة ثقف إدارة النظام "
 admin.site.site_title = "THQAF Admin"
@@ -21,3 +23,7 @@ urlpatterns = [
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# الملفات الثابتة المبنية (حزم مبصمة + .gz/.br) عند عدم وجود خادم ملفات ثابتة أمام Django
+if getattr(settings, "STATIC_SERVE", False):
+    urlpatterns += [re_path(rf"^{settings.STATIC_URL.strip('/')}/(?P<path>.+)$", serve_static)]